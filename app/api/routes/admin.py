@@ -1,8 +1,37 @@
 """
 Rutas administrativas.
 """
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+
+from app.config import Config
+from app.database.models import get_clusters_duplicados
+from app.api.middleware import require_auth
 
 bp = Blueprint('admin', __name__)
 
-# Rutas admin aquí
+
+@bp.route('/duplicados', methods=['GET'])
+@require_auth
+def get_duplicados():
+    """
+    Clusters de ensayos casi duplicados en todo el corpus (índice MinHash/LSH).
+    
+    Query params:
+        umbral: Similitud de Jaccard estimada mínima (por defecto DUPLICADOS_UMBRAL)
+    """
+    try:
+        umbral = request.args.get('umbral', Config.DUPLICADOS_UMBRAL, type=float)
+        if not 0 < umbral <= 1:
+            return jsonify({'error': 'El umbral debe estar entre 0 y 1'}), 400
+        
+        clusters = get_clusters_duplicados(umbral)
+        return jsonify({
+            'umbral': umbral,
+            'total_clusters': len(clusters),
+            'total_ensayos': sum(len(cluster['ensayos']) for cluster in clusters),
+            'clusters': clusters
+        })
+        
+    except Exception as e:
+        print(f"Error al buscar duplicados: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -11,22 +11,47 @@ from flask import Blueprint, request, jsonify, send_file, current_app
 from sqlalchemy import or_
 
 from app.database.connection import db
-from app.database.models import Ensayo, CriterioPersonalizado, EvaluacionJurado
+from app.database.models import (
+    Ensayo, CriterioPersonalizado, EvaluacionJurado, UsoLLM, guardar_uso_llm, resumir_uso_llm
+)
 from app.api.middleware import require_auth
 from app.utils.report_generator import ReportGenerator
+from app.core.evaluator import EvaluadorEnsayos
+from app.core.rubrica import rubrica_desde_criterios_personalizados, hash_rubrica
+from app.core.contabilidad import invocar_con_uso, registros_evaluacion
+from app.core.gobernador import usar_carril
 
 # Para el chat con LangChain
-from langchain_openai import ChatOpenAI
+from app.core.llm import crear_llm
 from langchain_core.prompts import ChatPromptTemplate
 
 bp = Blueprint('essays', __name__)
 
 # Inicializar LLM para el chat
-chat_llm = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.7,
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+MODELO_CHAT = "gpt-4o"
+chat_llm = crear_llm(MODELO_CHAT, 0.7)
+
+# Evaluadores con las rúbricas personalizadas de los jurados, por hash de
+# rúbrica: las cadenas y el grafo se compilan una sola vez por rúbrica
+evaluadores_personalizados = {}
+MAX_EVALUADORES_PERSONALIZADOS = 32
+
+
+def obtener_evaluador_personalizado(criterios):
+    """Devuelve el evaluador de una rúbrica personalizada, creándolo si no existe."""
+    rubrica = rubrica_desde_criterios_personalizados(criterios)
+    clave = hash_rubrica(rubrica)
+    
+    evaluador = evaluadores_personalizados.get(clave)
+    if evaluador is None:
+        if len(evaluadores_personalizados) >= MAX_EVALUADORES_PERSONALIZADOS:
+            # Descartar el más antiguo (los dicts conservan el orden de inserción)
+            evaluadores_personalizados.pop(next(iter(evaluadores_personalizados)))
+        # El jurado espera la respuesta: sus llamadas van por el carril interactivo
+        evaluador = EvaluadorEnsayos(rubrica=rubrica, carril="interactivo")
+        evaluadores_personalizados[clave] = evaluador
+    
+    return evaluador, rubrica
 
 
 # ============= RUTAS DE LISTADO Y CRUD =============
@@ -376,10 +401,12 @@ Ensayos a comparar:
         ])
         
         chain = prompt | chat_llm
-        comparacion = chain.invoke({
-            "contexto": contexto_comparacion,
-            "num_ensayos": len(ensayos)
-        })
+        with usar_carril("interactivo"):
+            comparacion, registro = invocar_con_uso(chain, {
+                "contexto": contexto_comparacion,
+                "num_ensayos": len(ensayos)
+            }, "comparacion", MODELO_CHAT)
+        guardar_uso_llm([registro], 'comparacion', ensayos_ids=[ensayo.id for ensayo in ensayos])
         
         return jsonify({
             'comparacion': comparacion.content,
@@ -522,10 +549,16 @@ Responde la siguiente consulta del usuario de manera profesional y útil, citand
         ])
         
         chain = prompt | chat_llm
-        respuesta = chain.invoke({
-            "contexto": contexto_evaluacion,
-            "mensaje": message
-        })
+        with usar_carril("interactivo"):
+            respuesta, registro = invocar_con_uso(chain, {
+                "contexto": contexto_evaluacion,
+                "mensaje": message
+            }, "chat", MODELO_CHAT)
+        guardar_uso_llm(
+            [registro], 'chat',
+            ensayo_id=ensayos[0].id if len(ensayos) == 1 else None,
+            ensayos_ids=[ensayo.id for ensayo in ensayos]
+        )
         
         return jsonify({'response': respuesta.content})
         
@@ -534,6 +567,69 @@ Responde la siguiente consulta del usuario de manera profesional y útil, citand
         return jsonify({'error': f'Error al procesar la consulta: {str(e)}'}), 500
 
 
+# ============= RUTAS DE USO DEL LLM =============
+
+@bp.route('/essays/<int:essay_id>/uso-llm', methods=['GET'])
+@require_auth
+def get_essay_uso_llm(essay_id):
+    """Llamadas al LLM de un ensayo con tokens, latencia y costo, agregadas por nodo."""
+    try:
+        ensayo = Ensayo.query.get(essay_id)
+        if not ensayo:
+            return jsonify({'error': 'Ensayo no encontrado'}), 404
+        
+        query = UsoLLM.query.filter_by(ensayo_id=essay_id)
+        registros = query.order_by(UsoLLM.fecha).all()
+        por_nodo = resumir_uso_llm(query, UsoLLM.nodo)
+        
+        return jsonify({
+            'ensayo_id': essay_id,
+            'por_nodo': por_nodo,
+            'total': {
+                'llamadas': len(registros),
+                'tokens_entrada': sum(r.tokens_entrada for r in registros),
+                'tokens_salida': sum(r.tokens_salida for r in registros),
+                'tokens_cacheados': sum(r.tokens_cacheados for r in registros),
+                'costo_usd': round(sum(r.costo_usd or 0 for r in registros), 6)
+            },
+            'registros': [registro.to_dict() for registro in registros]
+        })
+        
+    except Exception as e:
+        print(f"Error al obtener uso del LLM: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/uso-llm/resumen', methods=['GET'])
+@require_auth
+def get_resumen_uso_llm():
+    """
+    Uso agregado del LLM por nodo, por operación y ensayos más caros.
+    
+    Query params:
+        operacion: Filtrar por operación (evaluacion, limpieza_pdf, chat...)
+        limite: Número de ensayos más caros a devolver (por defecto 10)
+    """
+    try:
+        query = UsoLLM.query
+        operacion = request.args.get('operacion')
+        if operacion:
+            query = query.filter_by(operacion=operacion)
+        limite = request.args.get('limite', 10, type=int)
+        
+        return jsonify({
+            'por_nodo': resumir_uso_llm(query, UsoLLM.nodo),
+            'por_operacion': resumir_uso_llm(query, UsoLLM.operacion),
+            'ensayos_mas_caros': resumir_uso_llm(
+                query.filter(UsoLLM.ensayo_id.isnot(None)), UsoLLM.ensayo_id, limite=limite
+            )
+        })
+        
+    except Exception as e:
+        print(f"Error al resumir uso del LLM: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 # ============= RUTAS DE CRITERIOS PERSONALIZADOS =============
 
 @bp.route('/criterios', methods=['GET'])
@@ -715,22 +811,32 @@ def evaluar_con_criterios(ensayo_id):
         if not criterios:
             return jsonify({'error': 'No se proporcionaron criterios'}), 400
         
+        # La rúbrica se arma a partir de los criterios del jurado; el evaluador
+        # (cadenas y grafo) se reutiliza mientras la rúbrica no cambie
+        evaluador, rubrica = obtener_evaluador_personalizado(criterios)
+        evaluacion = evaluador.evaluar(ensayo.texto_completo, anexo_ia=ensayo.texto_anexo)
+        guardar_uso_llm(registros_evaluacion(evaluacion, evaluador.model_name),
+                        'evaluacion_personalizada', ensayo_id=ensayo_id)
+        
         evaluaciones = []
         
-        for criterio in criterios:
-            puntuacion_sugerida = criterio['peso'] * 0.8
+        for criterio, definicion in zip(criterios, rubrica):
+            resultado = evaluacion.criterios[definicion.clave]
             
+            # La calificación 1-5 se escala a los puntos del criterio (su peso)
             evaluaciones.append({
                 'criterio_id': criterio['id'],
                 'nombre': criterio['nombre'],
-                'puntuacion': round(puntuacion_sugerida, 2),
-                'comentario': f"Evaluación basada en {criterio['nombre']}: El ensayo cumple con los estándares esperados."
+                'calificacion': resultado.calificacion,
+                'puntuacion': round(resultado.calificacion / 5 * criterio['peso'], 2),
+                'comentario': resultado.comentario
             })
         
         return jsonify({
             'success': True,
             'ensayo_id': ensayo_id,
-            'evaluacion': evaluaciones
+            'evaluacion': evaluaciones,
+            'comentario_general': evaluacion.comentario_general
         })
         
     except Exception as e:
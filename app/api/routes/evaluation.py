@@ -5,7 +5,6 @@ Incluye ThreadPoolExecutor para evaluaciones en background.
 import os
 import uuid
 import hashlib
-import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
@@ -14,10 +13,18 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.config import Config
 from app.database.connection import db
-from app.database.models import Ensayo
+from app.database.models import (
+    Ensayo, ArchivoPDF, buscar_casi_duplicados, guardar_uso_llm,
+    indexar_firma_minhash, registrar_archivo_pdf
+)
 from app.api.middleware import require_auth
-from app.core.evaluator import EvaluadorEnsayos
+from app.core.cache import CacheEvaluaciones
+from app.core.checkpoints import crear_checkpointer
+from app.core.gobernador import obtener_gobernador
+from app.core.contabilidad import registros_evaluacion
+from app.core.evaluator import EvaluadorEnsayos, CRITERIOS
 from app.utils.pdf_processor import PDFProcessor
 from app.utils.attachment_matcher import obtener_anexo_ia, tiene_anexo_ia
 from app.utils.logger import get_evaluation_logger
@@ -26,7 +33,23 @@ bp = Blueprint('evaluation', __name__)
 logger = get_evaluation_logger()
 
 # Inicializar componentes
-evaluador = EvaluadorEnsayos()
+evaluador = EvaluadorEnsayos(
+    modo=Config.EVALUACION_MODO,
+    contexto_sintesis=Config.CONTEXTO_SINTESIS,
+    cobertura=Config.LLM_COBERTURA,
+    percentil_cobertura=Config.LLM_PERCENTIL_COBERTURA,
+    plazo_nodo=Config.LLM_PLAZO_NODO or None,
+    presupuesto_tokens=Config.EVALUACION_PRESUPUESTO_TOKENS or None,
+    tokens_fragmento=Config.EVALUACION_TOKENS_FRAGMENTO,
+    cascada=Config.EVALUACION_CASCADA,
+    modelo_cascada=Config.MODELO_CASCADA,
+    confianza_minima_cascada=Config.CASCADA_CONFIANZA_MINIMA,
+    calificaciones_escalar=Config.CASCADA_CALIFICACIONES_ESCALAR,
+    rutas_modelos=Config.RUTAS_MODELOS,
+    checkpointer=crear_checkpointer(Config.CHECKPOINTS_EVALUACION_PATH) if Config.CHECKPOINTS_EVALUACION else None,
+    reintentos_nodo=Config.LLM_REINTENTOS_NODO,
+    cache=CacheEvaluaciones(Config.CACHE_EVALUACIONES_PATH) if Config.CACHE_EVALUACIONES else None
+)
 pdf_processor = PDFProcessor()
 
 # ThreadPoolExecutor para procesamiento asíncrono (3 workers)
@@ -35,6 +58,11 @@ executor = ThreadPoolExecutor(max_workers=3)
 # Dict para tracking de jobs en proceso
 processing_jobs = {}
 
+# Progreso del job durante la evaluación: 10% al empezar, cada criterio
+# terminado suma su parte hasta llegar a 60% con el comentario general
+PROGRESO_INICIO_EVALUACION = 10
+PROGRESO_FIN_EVALUACION = 60
+
 
 def limpiar_jobs_antiguos():
     """
@@ -51,19 +79,131 @@ def limpiar_jobs_antiguos():
                 jobs_a_eliminar.append(job_id)
     
     for job_id in jobs_a_eliminar:
-        del processing_jobs[job_id]
+        job = processing_jobs.pop(job_id)
+        if job['status'] == 'error':
+            # Ya no se puede reintentar: su checkpoint no se va a reanudar
+            try:
+                evaluador.descartar_checkpoint(job_id)
+            except Exception as e:
+                logger.warning(f"Error deleting checkpoint of job {job_id}: {e}")
         logger.debug(f"Job {job_id} removed from cache (TTL 5 minutes)")
     
     return len(jobs_a_eliminar)
 
 
-def procesar_ensayo_fondo(job_id, filepath, permanent_pdf_path, texto, texto_hash,
+def guardar_pdf_direccionado(archivo, carpeta, tamano_bloque=1024 * 1024):
+    """
+    Guarda el PDF subido en `carpeta` con su SHA-256 como nombre, en una sola pasada.
+    
+    El stream se copia por bloques a un archivo temporal de la misma carpeta
+    mientras se calcula el hash, y al terminar se enlaza (os.link, atómico) como
+    <sha256>.pdf y se borra el temporal. Si ese archivo ya existe, el enlace
+    falla y la subida lo reutiliza: el mismo PDF se guarda una sola vez. En
+    sistemas de archivos sin enlaces duros, el nombre se reserva con
+    O_CREAT | O_EXCL y el temporal lo reemplaza con os.replace. Los
+    archivos de hasta Config.PDF_BUFFER_MAXIMO bytes se conservan además en
+    memoria para extraer el texto sin releerlos.
+    
+    Returns:
+        Tupla (ruta, pdf_hash, contenido o None, creado)
+    """
+    sha256 = hashlib.sha256()
+    bloques = []
+    en_memoria = 0
+    temporal = carpeta / f".{uuid.uuid4()}.part"
+    
+    try:
+        with open(temporal, 'wb') as destino:
+            for bloque in iter(lambda: archivo.stream.read(tamano_bloque), b''):
+                sha256.update(bloque)
+                destino.write(bloque)
+                if bloques is not None:
+                    en_memoria += len(bloque)
+                    bloques.append(bloque)
+                    if en_memoria > Config.PDF_BUFFER_MAXIMO:
+                        bloques = None
+        
+        pdf_hash = sha256.hexdigest()
+        ruta = carpeta / f"{pdf_hash}.pdf"
+        # os.link falla si el destino ya existe: saber si esta subida lo creó es
+        # atómico, así dos subidas simultáneas del mismo PDF no lo creen ambas
+        try:
+            os.link(temporal, ruta)
+            creado = True
+        except FileExistsError:
+            creado = False
+        except OSError:
+            # Sin enlaces duros (p. ej. EPERM en algunos montajes): O_EXCL
+            # decide igual de forma atómica qué subida crea el archivo
+            try:
+                os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                creado = True
+            except FileExistsError:
+                creado = False
+            if creado:
+                os.replace(temporal, ruta)
+    finally:
+        if temporal.exists():
+            os.remove(temporal)
+    
+    contenido = b''.join(bloques) if bloques is not None else None
+    return ruta, pdf_hash, contenido, creado
+
+
+def resultado_ensayo_existente(ensayo, mensaje_cache):
+    """Resultado para el frontend de un ensayo ya evaluado (cache hit)."""
+    return {
+        'id': ensayo.id,
+        'texto_ensayo': ensayo.texto_completo[:500] + '...' if len(ensayo.texto_completo) > 500 else ensayo.texto_completo,
+        'texto_completo': ensayo.texto_completo,
+        'puntuacion_total': ensayo.puntuacion_total,
+        'calidad_tecnica': ensayo.calidad_tecnica,
+        'creatividad': ensayo.creatividad,
+        'vinculacion_tematica': ensayo.vinculacion_tematica,
+        'bienestar_colectivo': ensayo.bienestar_colectivo,
+        'uso_responsable_ia': ensayo.uso_responsable_ia,
+        'potencial_impacto': ensayo.potencial_impacto,
+        'comentario_general': ensayo.comentario_general,
+        'tiene_anexo': ensayo.tiene_anexo,
+        'cache_hit': True,
+        'mensaje_cache': mensaje_cache
+    }
+
+
+def crear_callback_progreso(job_id):
+    """
+    Crea el callback que publica en processing_jobs cada criterio en cuanto
+    el evaluador lo termina, para que el frontend muestre resultados parciales.
+    """
+    avance_por_paso = (PROGRESO_FIN_EVALUACION - PROGRESO_INICIO_EVALUACION) / (len(CRITERIOS) + 1)
+    
+    def al_progresar(nombre, resultado):
+        job = processing_jobs.get(job_id)
+        if job is None:
+            return
+        
+        job['parcial'][nombre] = resultado
+        job['progress'] = min(
+            PROGRESO_FIN_EVALUACION,
+            int(PROGRESO_INICIO_EVALUACION + avance_por_paso * len(job['parcial']))
+        )
+    
+    return al_progresar
+
+
+def procesar_ensayo_fondo(app, job_id, permanent_pdf_path, texto, texto_hash,
                            original_filename, tiene_anexo_verificado, texto_anexo,
-                           nombre_autor_anexo, usuario_id):
+                           nombre_autor_anexo, usuario_id, registros_limpieza=None, pdf_hash=None):
     """
     Función para procesar ensayo en background.
     Actualiza processing_jobs con el progreso y resultado.
     
+    Se ejecuta en un hilo del ThreadPoolExecutor, por lo que necesita la
+    instancia de la app para abrir su propio contexto de base de datos.
+    
+    La evaluación usa el job_id como thread de los checkpoints: si falla, al
+    reintentar el job (/api/job-retry) solo se evalúan los criterios pendientes.
+    
     Estados del job:
     - queued: En cola, esperando worker disponible
     - processing: Evaluando con OpenAI
@@ -73,11 +213,16 @@ def procesar_ensayo_fondo(job_id, filepath, permanent_pdf_path, texto, texto_has
     try:
         # Actualizar estado: procesando
         processing_jobs[job_id]['status'] = 'processing'
-        processing_jobs[job_id]['progress'] = 10
+        processing_jobs[job_id]['progress'] = PROGRESO_INICIO_EVALUACION
         
-        # Evaluar el ensayo con OpenAI
-        evaluacion = evaluador.evaluar(texto, anexo_ia=texto_anexo)
-        processing_jobs[job_id]['progress'] = 60
+        # Evaluar el ensayo con OpenAI, publicando cada criterio al terminar
+        evaluacion = evaluador.evaluar(
+            texto,
+            anexo_ia=texto_anexo,
+            al_progresar=crear_callback_progreso(job_id),
+            job_id=job_id
+        )
+        processing_jobs[job_id]['progress'] = PROGRESO_FIN_EVALUACION
         
         if not evaluacion:
             processing_jobs[job_id]['status'] = 'error'
@@ -85,42 +230,54 @@ def procesar_ensayo_fondo(job_id, filepath, permanent_pdf_path, texto, texto_has
             processing_jobs[job_id]['completed_at'] = datetime.now()
             return
         
-        # Guardar en la base de datos
-        nuevo_ensayo = Ensayo(
-            texto_completo=texto,
-            texto_hash=texto_hash,
-            nombre_archivo_original=original_filename,
-            puntuacion_total=evaluacion['puntuacion_total'],
-            calidad_tecnica=evaluacion['calidad_tecnica'],
-            creatividad=evaluacion['creatividad'],
-            vinculacion_tematica=evaluacion['vinculacion_tematica'],
-            bienestar_colectivo=evaluacion['bienestar_colectivo'],
-            uso_responsable_ia=evaluacion['uso_responsable_ia'],
-            potencial_impacto=evaluacion['potencial_impacto'],
-            comentario_general=evaluacion['comentario_general'],
-            tiene_anexo=tiene_anexo_verificado,
-            pdf_path=str(permanent_pdf_path),
-            nombre_autor_anexo=nombre_autor_anexo,
-            usuario_id=usuario_id
-        )
+        criterios = {criterio: getattr(evaluacion, criterio).model_dump() for criterio in CRITERIOS}
+        
+        # Guardar en la base de datos (el hilo del executor necesita su propio contexto)
+        with app.app_context():
+            nuevo_ensayo = Ensayo(
+                nombre_archivo=Path(permanent_pdf_path).name,
+                nombre_archivo_original=original_filename,
+                autor=nombre_autor_anexo,
+                texto_completo=texto,
+                texto_hash=texto_hash,
+                puntuacion_total=evaluacion.puntuacion_total,
+                comentario_general=evaluacion.comentario_general,
+                tiene_anexo=tiene_anexo_verificado,
+                texto_anexo=texto_anexo,
+                **criterios
+            )
+            
+            try:
+                db.session.add(nuevo_ensayo)
+                db.session.flush()
+                
+                # Uso de cada llamada al LLM (limpieza del PDF y nodos de la evaluación)
+                guardar_uso_llm(registros_limpieza or [], 'limpieza_pdf',
+                                ensayo_id=nuevo_ensayo.id, commit=False)
+                guardar_uso_llm(registros_evaluacion(evaluacion, evaluador.model_name), 'evaluacion',
+                                ensayo_id=nuevo_ensayo.id, commit=False)
+                # Una nueva subida del mismo PDF devolverá este ensayo sin procesarlo
+                if pdf_hash:
+                    registrar_archivo_pdf(pdf_hash, texto, ensayo_id=nuevo_ensayo.id, commit=False)
+                # Firma MinHash para detectar casi duplicados en próximas subidas
+                indexar_firma_minhash(nuevo_ensayo.id, texto, commit=False)
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                raise
+            
+            ensayo_id = nuevo_ensayo.id
         
-        db.session.add(nuevo_ensayo)
-        db.session.commit()
         processing_jobs[job_id]['progress'] = 90
         
         # Preparar resultado para el frontend
         resultado = {
-            'id': nuevo_ensayo.id,
+            'id': ensayo_id,
             'texto_ensayo': texto[:500] + '...' if len(texto) > 500 else texto,
             'texto_completo': texto,
-            'puntuacion_total': evaluacion['puntuacion_total'],
-            'calidad_tecnica': evaluacion['calidad_tecnica'],
-            'creatividad': evaluacion['creatividad'],
-            'vinculacion_tematica': evaluacion['vinculacion_tematica'],
-            'bienestar_colectivo': evaluacion['bienestar_colectivo'],
-            'uso_responsable_ia': evaluacion['uso_responsable_ia'],
-            'potencial_impacto': evaluacion['potencial_impacto'],
-            'comentario_general': evaluacion['comentario_general'],
+            'puntuacion_total': evaluacion.puntuacion_total,
+            **criterios,
+            'comentario_general': evaluacion.comentario_general,
             'tiene_anexo': tiene_anexo_verificado,
             'cache_hit': False
         }
@@ -132,26 +289,12 @@ def procesar_ensayo_fondo(job_id, filepath, permanent_pdf_path, texto, texto_has
         processing_jobs[job_id]['completed_at'] = datetime.now()
         
         logger.info(f"Job {job_id} completed successfully")
-        
-        # Limpiar archivo temporal
-        try:
-            filepath = Path(filepath)
-            if filepath.exists():
-                os.remove(filepath)
-        except Exception as e:
-            logger.warning(f"Error deleting temporary file: {e}")
             
     except Exception as e:
         processing_jobs[job_id]['status'] = 'error'
         processing_jobs[job_id]['error'] = str(e)
         processing_jobs[job_id]['completed_at'] = datetime.now()
         logger.error(f"Error processing essay (job {job_id}): {e}", exc_info=True)
-        
-        # Rollback si hay error de BD
-        try:
-            db.session.rollback()
-        except:
-            pass
 
 
 @bp.route('/evaluate', methods=['POST'])
@@ -161,10 +304,14 @@ def evaluate():
     Endpoint principal para evaluar un ensayo.
     
     Flujo:
-    1. Recibe PDF, extrae texto
-    2. Verifica hash para caché (evita re-evaluar duplicados)
-    3. Si es nuevo, crea job y envía a ThreadPoolExecutor
-    4. Retorna job_id para polling desde frontend
+    1. Recibe el PDF en streaming directo a data/pdfs/<sha256>.pdf, calculando
+       el hash al vuelo: si el mismo archivo ya se evaluó, retorna ese ensayo
+       sin extraer ni limpiar el texto
+    2. Extrae y limpia el texto (o lo toma de la caché por hash del PDF)
+    3. Verifica hash del texto para caché (evita re-evaluar duplicados) y
+       busca casi duplicados en el índice MinHash/LSH
+    4. Si es nuevo, crea job y envía a ThreadPoolExecutor
+    5. Retorna job_id para polling desde frontend
     
     Returns:
         - 200 con resultado si hay cache hit
@@ -185,40 +332,50 @@ def evaluate():
             return jsonify({'error': 'El archivo debe ser un PDF'}), 400
         
         # Configuración de carpetas
-        upload_folder = Path(current_app.config.get('UPLOAD_FOLDER', 'data/uploads'))
         pdf_folder = Path(current_app.config.get('PERMANENT_PDF_FOLDER', 'data/pdfs'))
         anexo_folder = Path(current_app.config.get('PERMANENT_ANEXO_FOLDER', 'data/anexos'))
         
-        # Asegurar que existen
-        upload_folder.mkdir(parents=True, exist_ok=True)
+        # Asegurar que existe
         pdf_folder.mkdir(parents=True, exist_ok=True)
         
-        # Generar nombre único con UUID para evitar colisiones
         original_filename = secure_filename(file.filename)
-        extension = os.path.splitext(original_filename)[1]
-        unique_filename = f"{uuid.uuid4()}{extension}"
         
-        # Guardar el archivo temporalmente para procesar
-        filepath = upload_folder / unique_filename
-        file.save(filepath)
+        # Guardar en la ubicación permanente (para el visor), nombrado por su hash.
+        # Sin copia temporal: la extracción lee este archivo o los bytes en memoria
+        permanent_pdf_path, pdf_hash, contenido, pdf_creado = guardar_pdf_direccionado(file, pdf_folder)
         
-        # Guardar copia permanente para el visor
-        permanent_pdf_path = pdf_folder / unique_filename
+        def descartar_pdf():
+            # Solo se borra si esta subida lo creó: si ya existía, es de otro ensayo
+            if pdf_creado and permanent_pdf_path.exists():
+                os.remove(permanent_pdf_path)
+        
+        # CACHE POR BYTES: el mismo PDF ya subido se resuelve antes de cualquier extracción
+        archivo_pdf = ArchivoPDF.query.filter_by(pdf_hash=pdf_hash).first()
+        
+        if archivo_pdf is not None and archivo_pdf.ensayo is not None:
+            print(f"⚡ CACHE HIT (PDF): archivo idéntico ya evaluado (ID: {archivo_pdf.ensayo_id})")
+            descartar_pdf()
+            return jsonify(resultado_ensayo_existente(
+                archivo_pdf.ensayo,
+                f'Evaluacion recuperada del cache (mismo PDF que {archivo_pdf.ensayo.nombre_archivo_original})'
+            ))
         
         try:
-            # Copiar a ubicación permanente
-            shutil.copy2(filepath, permanent_pdf_path)
             print(f"PDF guardado permanentemente en: {permanent_pdf_path}")
             
-            # Extraer texto del PDF
-            texto = pdf_processor.procesar_pdf(str(filepath), limpiar=True)
+            # Extraer texto del PDF (el uso de la limpieza se guarda con el ensayo).
+            # Si el archivo ya se procesó (p. ej. su evaluación falló), se reutiliza el texto
+            registros_limpieza = []
+            if archivo_pdf is not None:
+                print(f"CACHE HIT (PDF): texto limpio reutilizado (hash {pdf_hash[:16]}...)")
+                texto = archivo_pdf.texto_limpio
+            else:
+                texto = pdf_processor.procesar_pdf(
+                    str(permanent_pdf_path), limpiar=True, registros=registros_limpieza, contenido=contenido
+                )
             
             if not texto or len(texto.strip()) < 100:
-                # Limpiar archivos
-                if filepath.exists():
-                    os.remove(filepath)
-                if permanent_pdf_path.exists():
-                    os.remove(permanent_pdf_path)
+                descartar_pdf()
                 return jsonify({
                     'error': 'No se pudo extraer suficiente texto del PDF'
                 }), 400
@@ -232,30 +389,40 @@ def evaluate():
                 print(f"   Hash: {texto_hash[:16]}...")
                 print(f"   Archivo original: {ensayo_existente.nombre_archivo_original}")
                 
-                # Limpiar archivos temporales
-                if filepath.exists():
-                    os.remove(filepath)
-                if permanent_pdf_path.exists():
-                    os.remove(permanent_pdf_path)
+                descartar_pdf()
+                
+                # La próxima subida de este mismo archivo se resuelve por sus bytes
+                registrar_archivo_pdf(pdf_hash, texto, ensayo_id=ensayo_existente.id)
                 
                 # Retornar evaluación existente sin llamar a OpenAI
-                resultado = {
-                    'id': ensayo_existente.id,
-                    'texto_ensayo': ensayo_existente.texto_completo[:500] + '...' if len(ensayo_existente.texto_completo) > 500 else ensayo_existente.texto_completo,
-                    'texto_completo': ensayo_existente.texto_completo,
-                    'puntuacion_total': ensayo_existente.puntuacion_total,
-                    'calidad_tecnica': ensayo_existente.calidad_tecnica,
-                    'creatividad': ensayo_existente.creatividad,
-                    'vinculacion_tematica': ensayo_existente.vinculacion_tematica,
-                    'bienestar_colectivo': ensayo_existente.bienestar_colectivo,
-                    'uso_responsable_ia': ensayo_existente.uso_responsable_ia,
-                    'potencial_impacto': ensayo_existente.potencial_impacto,
-                    'comentario_general': ensayo_existente.comentario_general,
-                    'tiene_anexo': ensayo_existente.tiene_anexo,
-                    'cache_hit': True,
-                    'mensaje_cache': f'Evaluacion recuperada del cache (archivo original: {ensayo_existente.nombre_archivo_original})'
-                }
-                return jsonify(resultado)
+                return jsonify(resultado_ensayo_existente(
+                    ensayo_existente,
+                    f'Evaluacion recuperada del cache (archivo original: {ensayo_existente.nombre_archivo_original})'
+                ))
+            
+            # CASI DUPLICADOS: mismo ensayo con otros espacios, ruido de OCR o limpieza
+            if Config.DUPLICADOS_DETECCION:
+                casi_duplicados = buscar_casi_duplicados(texto, Config.DUPLICADOS_UMBRAL, limite=1)
+                if casi_duplicados:
+                    ensayo_similar, similitud = casi_duplicados[0]
+                    print(f"⚡ CACHE HIT (MinHash): casi duplicado de ID {ensayo_similar.id} "
+                          f"(similitud {similitud:.2f})")
+                    
+                    descartar_pdf()
+                    
+                    registrar_archivo_pdf(pdf_hash, texto, ensayo_id=ensayo_similar.id)
+                    
+                    resultado = resultado_ensayo_existente(
+                        ensayo_similar,
+                        f'Evaluacion recuperada del cache (casi duplicado de '
+                        f'{ensayo_similar.nombre_archivo_original}, similitud {similitud:.0%})'
+                    )
+                    resultado['similitud'] = round(similitud, 3)
+                    return jsonify(resultado)
+            
+            # El texto limpio queda en caché aunque la evaluación falle
+            if archivo_pdf is None:
+                registrar_archivo_pdf(pdf_hash, texto)
             
             print(f"CACHE MISS: Evaluando nuevo ensayo con OpenAI")
             print(f"   Hash: {texto_hash[:16]}...")
@@ -274,8 +441,7 @@ def evaluate():
                 if ruta_anexo.exists():
                     try:
                         if nombre_anexo.lower().endswith('.pdf'):
-                            from app.utils.pdf_processor import extraer_texto_pdf
-                            texto_anexo = extraer_texto_pdf(str(ruta_anexo))
+                            texto_anexo = pdf_processor.extraer_texto(str(ruta_anexo))
                             print(f"Anexo de IA PDF cargado: {nombre_anexo}")
                         else:
                             with open(ruta_anexo, 'r', encoding='utf-8') as f:
@@ -293,22 +459,26 @@ def evaluate():
             job_id = str(uuid.uuid4())
             usuario_id = getattr(request, 'user_id', None)
             
+            # Argumentos de la tarea, guardados para poder reintentar el job
+            argumentos = (
+                job_id, str(permanent_pdf_path), texto, texto_hash,
+                original_filename, tiene_anexo_verificado, texto_anexo,
+                nombre_autor_anexo, usuario_id, registros_limpieza, pdf_hash
+            )
+            
             # Inicializar tracking del job
             processing_jobs[job_id] = {
                 'status': 'queued',
                 'progress': 0,
                 'created_at': datetime.now(),
                 'result': None,
-                'error': None
+                'parcial': {},
+                'error': None,
+                'argumentos': argumentos
             }
             
             # Enviar tarea al ThreadPoolExecutor
-            executor.submit(
-                procesar_ensayo_fondo,
-                job_id, str(filepath), str(permanent_pdf_path), texto, texto_hash,
-                original_filename, tiene_anexo_verificado, texto_anexo,
-                nombre_autor_anexo, usuario_id
-            )
+            executor.submit(procesar_ensayo_fondo, current_app._get_current_object(), *argumentos)
             
             print(f"Job {job_id} enviado a procesamiento en background")
             
@@ -321,10 +491,7 @@ def evaluate():
             
         except Exception as e:
             # Si hay error antes de enviar al executor, limpiar archivos
-            if filepath.exists():
-                os.remove(filepath)
-            if permanent_pdf_path.exists():
-                os.remove(permanent_pdf_path)
+            descartar_pdf()
             raise e
     
     except Exception as e:
@@ -345,6 +512,7 @@ def job_status(job_id):
         {
             status: 'queued' | 'processing' | 'completed' | 'error',
             progress: 0-100,
+            parcial: {criterio: {calificacion, comentario}} ya evaluados si processing,
             result: {...} si completed,
             error: string si error
         }
@@ -360,7 +528,9 @@ def job_status(job_id):
         'created_at': job['created_at'].isoformat()
     }
     
-    if job['status'] == 'completed':
+    if job['status'] == 'processing':
+        response['parcial'] = dict(job.get('parcial', {}))
+    elif job['status'] == 'completed':
         response['result'] = job['result']
         response['completed_at'] = job['completed_at'].isoformat()
     elif job['status'] == 'error':
@@ -371,6 +541,42 @@ def job_status(job_id):
     return jsonify(response)
 
 
+@bp.route('/job-retry/<job_id>', methods=['POST'])
+@require_auth
+def job_retry(job_id):
+    """
+    Reintenta un job que terminó en error.
+    
+    El job conserva su id, así que la evaluación se reanuda desde su
+    checkpoint: los criterios que ya se evaluaron no se vuelven a pedir al LLM.
+    
+    Returns:
+        202 con el job_id, 404 si el job no existe y 409 si no está en error
+    """
+    job = processing_jobs.get(job_id)
+    
+    if not job:
+        return jsonify({'error': 'Job no encontrado'}), 404
+    if job['status'] != 'error':
+        return jsonify({'error': f"Solo se pueden reintentar jobs con error (estado: {job['status']})"}), 409
+    
+    job.update({
+        'status': 'queued',
+        'progress': 0,
+        'error': None
+    })
+    job.pop('completed_at', None)
+    
+    executor.submit(procesar_ensayo_fondo, current_app._get_current_object(), *job['argumentos'])
+    logger.info(f"Job {job_id} resubmitted (resuming from checkpoint)")
+    
+    return jsonify({
+        'job_id': job_id,
+        'message': 'Job reenviado; se reanudará desde los criterios ya evaluados',
+        'status': 'queued'
+    }), 202
+
+
 @bp.route('/cleanup-jobs', methods=['POST'])
 def cleanup_jobs():
     """
@@ -408,4 +614,13 @@ def jobs_stats():
         if status in stats:
             stats[status] += 1
     
+    # Latencia reciente por nodo del evaluador y solicitudes de respaldo
+    stats['latencias'] = evaluador.latencias.resumen()
+    stats['respaldos'] = {
+        'enviados': evaluador.total_respaldos,
+        'ganadores': evaluador.respaldos_ganadores
+    }
+    stats['cascada'] = evaluador.estadisticas_cascada()
+    stats['gobernador'] = obtener_gobernador().estadisticas()
+    
     return jsonify(stats)
@@ -2,6 +2,7 @@
 Configuración centralizada de la aplicación.
 """
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -32,8 +33,105 @@ class Config:
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     
+    # Backend del LLM: "openai" o "simulado" (local, sin red, para pruebas de carga)
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai')
+    LLM_SIMULADO_LATENCIA_MS = float(os.getenv('LLM_SIMULADO_LATENCIA_MS', 800))  # Mediana
+    LLM_SIMULADO_DISPERSION = float(os.getenv('LLM_SIMULADO_DISPERSION', 0.5))    # Sigma log-normal
+    LLM_SIMULADO_TASA_ERROR = float(os.getenv('LLM_SIMULADO_TASA_ERROR', 0))      # Errores 500
+    LLM_SIMULADO_TASA_429 = float(os.getenv('LLM_SIMULADO_TASA_429', 0))          # Errores 429
+    LLM_SIMULADO_TOKENS_SALIDA = int(os.getenv('LLM_SIMULADO_TOKENS_SALIDA', 250))
+    LLM_SIMULADO_MS_POR_TOKEN_SALIDA = float(os.getenv('LLM_SIMULADO_MS_POR_TOKEN_SALIDA', 0))  # Generación
+    
+    # Pool HTTP compartido por todos los clientes de OpenAI (conexiones keep-alive)
+    LLM_HTTP_MAX_CONEXIONES = int(os.getenv('LLM_HTTP_MAX_CONEXIONES', 100))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv('LLM_HTTP_MAX_KEEPALIVE', 20))
+    LLM_HTTP_KEEPALIVE_SEGUNDOS = float(os.getenv('LLM_HTTP_KEEPALIVE_SEGUNDOS', 60))
+    LLM_HTTP_TIMEOUT = float(os.getenv('LLM_HTTP_TIMEOUT', 120))
+    
+    # Gobernador de concurrencia: solicitudes al proveedor en vuelo en todo el
+    # proceso y por carril ("interactivo": chat y comparación; "carga": ensayos
+    # subidos; "lote": scripts masivos). Con cola, los turnos libres se reparten
+    # por round-robin según el peso de cada carril
+    LLM_CONCURRENCIA_MAX = int(os.getenv('LLM_CONCURRENCIA_MAX', 32))
+    LLM_CONCURRENCIA_INTERACTIVO = int(os.getenv('LLM_CONCURRENCIA_INTERACTIVO', 8))
+    LLM_CONCURRENCIA_CARGA = int(os.getenv('LLM_CONCURRENCIA_CARGA', 24))
+    LLM_CONCURRENCIA_LOTE = int(os.getenv('LLM_CONCURRENCIA_LOTE', 16))
+    LLM_PESO_INTERACTIVO = int(os.getenv('LLM_PESO_INTERACTIVO', 6))
+    LLM_PESO_CARGA = int(os.getenv('LLM_PESO_CARGA', 3))
+    LLM_PESO_LOTE = int(os.getenv('LLM_PESO_LOTE', 1))
+    
+    # Evaluación: "preciso" (7 llamadas) o "fusionado" (1 llamada)
+    EVALUACION_MODO = os.getenv('EVALUACION_MODO', 'preciso')
+    
+    # Contexto del ensayo para el comentario general: "completo", "extracto" o "ninguno"
+    CONTEXTO_SINTESIS = os.getenv('CONTEXTO_SINTESIS', 'completo')
+    
+    # Cascada: cada criterio se evalúa primero con un modelo económico y se repite con
+    # el modelo completo si la calificación está entre las indicadas, la salida no es
+    # válida o el modelo económico reporta una confianza menor que la mínima (1-5)
+    EVALUACION_CASCADA = os.getenv('EVALUACION_CASCADA', 'False').lower() == 'true'
+    MODELO_CASCADA = os.getenv('MODELO_CASCADA', 'gpt-4o-mini')
+    CASCADA_CONFIANZA_MINIMA = int(os.getenv('CASCADA_CONFIANZA_MINIMA', 4))
+    CASCADA_CALIFICACIONES_ESCALAR = [
+        int(calificacion) for calificacion in os.getenv('CASCADA_CALIFICACIONES_ESCALAR', '4,5').split(',')
+        if calificacion.strip()
+    ]
+    
+    # Rutas de modelo por nodo (JSON): p. ej. {"creatividad": {"modelo": "gpt-4o-mini",
+    # "max_tokens": 400}, "comentario_general": {"temperatura": 0.5}}. Claves válidas:
+    # las de los criterios, "comentario_general", "fusionado" y "condensacion"
+    RUTAS_MODELOS = json.loads(os.getenv('RUTAS_MODELOS', '{}'))
+    
+    # Presupuesto de tokens de ensayo + anexo por llamada: los textos más largos se
+    # dividen en fragmentos que se condensan en paralelo antes de evaluar (0 = sin límite)
+    EVALUACION_PRESUPUESTO_TOKENS = int(os.getenv('EVALUACION_PRESUPUESTO_TOKENS', 16000))
+    EVALUACION_TOKENS_FRAGMENTO = int(os.getenv('EVALUACION_TOKENS_FRAGMENTO', 4000))
+    
+    # Límites del proveedor para cargas masivas (ajustar según el tier de la cuenta)
+    LLM_RPM = int(os.getenv('LLM_RPM', 500))          # Solicitudes por minuto
+    LLM_TPM = int(os.getenv('LLM_TPM', 30000))        # Tokens por minuto
+    LOTE_CONCURRENCIA = int(os.getenv('LOTE_CONCURRENCIA', 10))  # Ensayos simultáneos por lote
+    
+    # Latencia de cola: solicitud de respaldo (hedging) si un nodo supera el percentil
+    # indicado de su latencia reciente, y plazo máximo por nodo en segundos (0 = sin plazo)
+    LLM_COBERTURA = os.getenv('LLM_COBERTURA', 'False').lower() == 'true'
+    LLM_PERCENTIL_COBERTURA = float(os.getenv('LLM_PERCENTIL_COBERTURA', 0.95))
+    LLM_PLAZO_NODO = float(os.getenv('LLM_PLAZO_NODO', 0))
+    
+    # Caché persistente de resultados por criterio (texto, prompt, modelo y temperatura)
+    CACHE_EVALUACIONES = os.getenv('CACHE_EVALUACIONES', 'True').lower() == 'true'
+    CACHE_EVALUACIONES_PATH = DATA_DIR / 'cache_evaluaciones.db'
+    
+    # Checkpoints del grafo por job: un job fallido se reanuda desde los criterios
+    # ya evaluados. Cada llamada al LLM se intenta hasta LLM_REINTENTOS_NODO veces
+    # ante 5xx o errores de conexión; el grafo no vuelve a reintentar el nodo
+    CHECKPOINTS_EVALUACION = os.getenv('CHECKPOINTS_EVALUACION', 'True').lower() == 'true'
+    CHECKPOINTS_EVALUACION_PATH = DATA_DIR / 'checkpoints_evaluacion.db'
+    LLM_REINTENTOS_NODO = int(os.getenv('LLM_REINTENTOS_NODO', 3))
+    
+    # Casi duplicados (índice MinHash/LSH): un ensayo nuevo cuya similitud de Jaccard
+    # estimada con uno ya evaluado alcanza DUPLICADOS_UMBRAL reutiliza esa evaluación
+    DUPLICADOS_DETECCION = os.getenv('DUPLICADOS_DETECCION', 'True').lower() == 'true'
+    DUPLICADOS_UMBRAL = float(os.getenv('DUPLICADOS_UMBRAL', 0.85))
+    
+    # Extracción de PDFs con pdfplumber repartida por rangos de páginas en un pool
+    # de procesos (solo PDFs con al menos 2 * PDF_PAGINAS_POR_PROCESO páginas)
+    PDF_EXTRACCION_PARALELA = os.getenv('PDF_EXTRACCION_PARALELA', 'True').lower() == 'true'
+    PDF_PROCESOS_EXTRACCION = int(os.getenv('PDF_PROCESOS_EXTRACCION', os.cpu_count() or 1))
+    PDF_PAGINAS_POR_PROCESO = int(os.getenv('PDF_PAGINAS_POR_PROCESO', 4))
+    
+    # Limpieza del texto extraído: "reglas" (local y determinista; solo los párrafos
+    # ilegibles van al LLM) o "llm" (todo el texto a gpt-4o-mini)
+    PDF_LIMPIEZA = os.getenv('PDF_LIMPIEZA', 'reglas')
+    # Lo que va al LLM se limpia en fragmentos paralelos de hasta N tokens estimados,
+    # cada uno con las últimas oraciones del anterior como contexto (solape)
+    PDF_LIMPIEZA_TOKENS_FRAGMENTO = int(os.getenv('PDF_LIMPIEZA_TOKENS_FRAGMENTO', 1500))
+    PDF_LIMPIEZA_SOLAPE_TOKENS = int(os.getenv('PDF_LIMPIEZA_SOLAPE_TOKENS', 60))
+    
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Los PDFs subidos de hasta este tamaño se extraen desde memoria, sin releer el archivo
+    PDF_BUFFER_MAXIMO = int(os.getenv('PDF_BUFFER_MAXIMO', 4 * 1024 * 1024))
     UPLOAD_FOLDER = BASE_DIR / 'data' / 'uploads'
     PERMANENT_PDF_FOLDER = BASE_DIR / 'data' / 'pdfs'
     PERMANENT_ANEXO_FOLDER = BASE_DIR / 'data' / 'anexos'
@@ -76,7 +174,7 @@ class ProductionConfig(Config):
         Config.init_app(app)
         
         # Validar que exista API key
-        if not cls.OPENAI_API_KEY:
+        if not cls.OPENAI_API_KEY and cls.LLM_BACKEND == 'openai':
             raise ValueError("OPENAI_API_KEY debe estar configurada en producción")
         
         if cls.SECRET_KEY == 'dev-secret-key-change-in-production':
@@ -0,0 +1,128 @@
+"""
+Caché persistente de resultados por criterio.
+
+Cada resultado se guarda bajo la clave (texto_hash, criterio, hash de la
+plantilla del prompt, modelo, temperatura). Si se edita el prompt de un
+solo criterio, solo cambia su clave: al reevaluar, el resto de los nodos
+reutiliza su resultado y solo se paga la llamada del criterio modificado
+y la síntesis final.
+
+Los nodos del evaluador comparten un event loop de fondo: desde código
+asíncrono se usan aobtener/aguardar, que hacen la consulta y el commit en un
+hilo aparte para no bloquear las llamadas al LLM de los demás jobs.
+"""
+import json
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+def calcular_hash(*partes: str) -> str:
+    """Calcula el SHA-256 de la concatenación de las partes (separadas por \\x00)."""
+    return hashlib.sha256("\x00".join(partes).encode("utf-8")).hexdigest()
+
+
+class CacheEvaluaciones:
+    """Caché de resultados de nodos del evaluador respaldada por SQLite."""
+
+    def __init__(self, ruta: Union[str, Path]):
+        """
+        Inicializa la caché, creando la base de datos si no existe.
+
+        Args:
+            ruta: Ruta del archivo SQLite (":memory:" para una caché volátil)
+        """
+        if str(ruta) != ":memory:":
+            Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+
+        # Los nodos se ejecutan en el event loop de fondo, pero la caché puede
+        # compartirse entre hilos: el lock serializa el acceso a la conexión
+        self._conexion = sqlite3.connect(str(ruta), check_same_thread=False)
+        self._lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+
+        with self._lock:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS resultados_criterio (
+                    texto_hash TEXT NOT NULL,
+                    criterio TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    temperatura REAL NOT NULL,
+                    resultado TEXT NOT NULL,
+                    creado_en TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (texto_hash, criterio, prompt_hash, modelo, temperatura)
+                )
+            """)
+            self._conexion.commit()
+
+    def obtener(self, texto_hash: str, criterio: str, prompt_hash: str,
+                modelo: str, temperatura: float) -> Optional[Dict[str, Any]]:
+        """Devuelve el resultado guardado para la clave, o None si no existe."""
+        with self._lock:
+            fila = self._conexion.execute(
+                """SELECT resultado FROM resultados_criterio
+                   WHERE texto_hash = ? AND criterio = ? AND prompt_hash = ?
+                     AND modelo = ? AND temperatura = ?""",
+                (texto_hash, criterio, prompt_hash, modelo, temperatura)
+            ).fetchone()
+
+            if fila is None:
+                self.fallos += 1
+                return None
+
+            self.aciertos += 1
+            return json.loads(fila[0])
+
+    async def aobtener(self, texto_hash: str, criterio: str, prompt_hash: str,
+                       modelo: str, temperatura: float) -> Optional[Dict[str, Any]]:
+        """Versión asíncrona de obtener: consulta SQLite fuera del event loop."""
+        return await asyncio.to_thread(self.obtener, texto_hash, criterio, prompt_hash, modelo, temperatura)
+
+    def guardar(self, texto_hash: str, criterio: str, prompt_hash: str,
+                modelo: str, temperatura: float, resultado: Dict[str, Any]):
+        """Guarda (o reemplaza) el resultado de un criterio."""
+        with self._lock:
+            self._conexion.execute(
+                """INSERT OR REPLACE INTO resultados_criterio
+                   (texto_hash, criterio, prompt_hash, modelo, temperatura, resultado)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (texto_hash, criterio, prompt_hash, modelo, temperatura,
+                 json.dumps(resultado, ensure_ascii=False))
+            )
+            self._conexion.commit()
+
+    async def aguardar(self, texto_hash: str, criterio: str, prompt_hash: str,
+                       modelo: str, temperatura: float, resultado: Dict[str, Any]):
+        """Versión asíncrona de guardar: el commit no bloquea el event loop."""
+        await asyncio.to_thread(self.guardar, texto_hash, criterio, prompt_hash, modelo, temperatura, resultado)
+
+    def invalidar(self, criterio: Optional[str] = None) -> int:
+        """
+        Elimina entradas de la caché.
+
+        Args:
+            criterio: Si se indica, solo elimina las entradas de ese criterio
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            if criterio:
+                cursor = self._conexion.execute(
+                    "DELETE FROM resultados_criterio WHERE criterio = ?", (criterio,)
+                )
+            else:
+                cursor = self._conexion.execute("DELETE FROM resultados_criterio")
+            self._conexion.commit()
+            return cursor.rowcount
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,58 @@
+"""
+Checkpoints del grafo de evaluación por job.
+
+Con un checkpointer, LangGraph guarda el estado del grafo al terminar cada
+paso y las escrituras de cada nodo completado, con el job id como thread.
+Si un criterio falla (p. ej. un 500 del proveedor), al reintentar el mismo
+job solo se ejecutan los nodos que faltan; los criterios ya evaluados se
+toman del checkpoint.
+
+El checkpointer SQLite (langgraph-checkpoint-sqlite) sobrevive a reinicios
+del proceso. Si no está instalado se usa uno en memoria, que solo permite
+reanudar dentro del mismo proceso.
+"""
+from pathlib import Path
+from typing import Union
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.event_loop import ejecutar_sincrono
+
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    CHECKPOINT_SQLITE_AVAILABLE = True
+except ImportError:
+    CHECKPOINT_SQLITE_AVAILABLE = False
+
+
+async def _abrir_checkpointer_sqlite(ruta: Path) -> BaseCheckpointSaver:
+    """Abre la conexión y crea las tablas (dentro del event loop que la usará)."""
+    conexion = await aiosqlite.connect(str(ruta), check_same_thread=False)
+    checkpointer = AsyncSqliteSaver(conexion)
+    await checkpointer.setup()
+    return checkpointer
+
+
+def crear_checkpointer(ruta: Union[str, Path]) -> BaseCheckpointSaver:
+    """
+    Crea el checkpointer del evaluador.
+
+    La conexión asíncrona queda ligada al event loop compartido, el mismo en
+    el que se ejecutan todas las evaluaciones.
+
+    Args:
+        ruta: Archivo SQLite de los checkpoints
+
+    Returns:
+        AsyncSqliteSaver, o InMemorySaver si el paquete SQLite no está instalado
+    """
+    if not CHECKPOINT_SQLITE_AVAILABLE:
+        print("WARN: langgraph-checkpoint-sqlite no está instalado; los checkpoints "
+              "de evaluación se guardan en memoria y no sobreviven a un reinicio")
+        return InMemorySaver()
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    return ejecutar_sincrono(_abrir_checkpointer_sqlite(ruta))
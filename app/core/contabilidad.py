@@ -0,0 +1,113 @@
+"""
+Contabilidad de las llamadas al LLM: tokens, latencia, modelo y costo.
+
+Cada llamada (nodos del grafo de evaluación, limpieza de PDFs, comparación
+y chat) produce un registro con la misma forma. Las rutas los guardan en la
+tabla uso_llm asociados al ensayo, para encontrar los criterios y ensayos
+más caros y medir el efecto de cada optimización.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Precios en USD por millón de tokens: (entrada, entrada cacheada, salida)
+PRECIOS_MODELOS = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+}
+
+
+def extraer_uso_tokens(mensaje: Any) -> Dict[str, int]:
+    """Extrae los tokens de entrada, salida y cacheados reportados por el proveedor."""
+    uso = getattr(mensaje, "usage_metadata", None) or {}
+    detalles = uso.get("input_token_details") or {}
+    return {
+        "tokens_entrada": uso.get("input_tokens", 0),
+        "tokens_salida": uso.get("output_tokens", 0),
+        "tokens_cacheados": detalles.get("cache_read", 0) or 0
+    }
+
+
+def calcular_costo(modelo: str, tokens_entrada: int, tokens_salida: int,
+                   tokens_cacheados: int = 0) -> Optional[float]:
+    """
+    Costo en USD de una llamada según PRECIOS_MODELOS.
+
+    Los tokens cacheados son parte de los de entrada y se cobran a su tarifa.
+
+    Returns:
+        Costo en USD, o None si el modelo no tiene precio registrado
+    """
+    # Los nombres con fecha (p. ej. gpt-4o-2024-08-06) usan el precio del modelo base
+    base = max((nombre for nombre in PRECIOS_MODELOS if modelo.startswith(nombre)), key=len, default=None)
+    if base is None:
+        return None
+
+    precio_entrada, precio_cacheado, precio_salida = PRECIOS_MODELOS[base]
+    costo = (
+        (tokens_entrada - tokens_cacheados) * precio_entrada
+        + tokens_cacheados * precio_cacheado
+        + tokens_salida * precio_salida
+    ) / 1_000_000
+    return round(costo, 6)
+
+
+def registro_uso(nodo: str, modelo: str, uso: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construye el registro de una llamada a partir del uso de tokens de un nodo.
+
+    Args:
+        nodo: Nombre del nodo o de la operación (p. ej. "creatividad", "limpieza_pdf")
+        modelo: Modelo que atendió la llamada
+        uso: Dict con tokens_entrada, tokens_salida, tokens_cacheados y,
+            opcionalmente, latencia_ms
+
+    Returns:
+        Dict con nodo, modelo, tokens, latencia_ms y costo_usd
+    """
+    tokens_entrada = uso.get("tokens_entrada", 0)
+    tokens_salida = uso.get("tokens_salida", 0)
+    tokens_cacheados = uso.get("tokens_cacheados", 0)
+    return {
+        "nodo": nodo,
+        "modelo": modelo,
+        "tokens_entrada": tokens_entrada,
+        "tokens_salida": tokens_salida,
+        "tokens_cacheados": tokens_cacheados,
+        "latencia_ms": uso.get("latencia_ms", 0),
+        "costo_usd": calcular_costo(modelo, tokens_entrada, tokens_salida, tokens_cacheados)
+    }
+
+
+def registros_evaluacion(evaluacion: Any, modelo: str) -> list:
+    """Registros de todos los nodos de una evaluación (EvaluacionEnsayo o EvaluacionRubrica)."""
+    return [
+        registro_uso(nodo, uso.get("modelo", modelo), uso)
+        for nodo, uso in evaluacion.uso_tokens.items()
+    ]
+
+
+def invocar_con_uso(chain: Any, entradas: Dict[str, Any], nodo: str,
+                    modelo: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Invoca una cadena que termina en un chat model y mide su uso.
+
+    Returns:
+        Tupla (respuesta del modelo, registro de la llamada)
+    """
+    inicio = time.perf_counter()
+    respuesta = chain.invoke(entradas)
+    uso = extraer_uso_tokens(respuesta)
+    uso["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+    return respuesta, registro_uso(nodo, modelo, uso)
+
+
+async def ainvocar_con_uso(chain: Any, entradas: Dict[str, Any], nodo: str,
+                           modelo: str) -> Tuple[Any, Dict[str, Any]]:
+    """Versión asíncrona de invocar_con_uso."""
+    inicio = time.perf_counter()
+    respuesta = await chain.ainvoke(entradas)
+    uso = extraer_uso_tokens(respuesta)
+    uso["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+    return respuesta, registro_uso(nodo, modelo, uso)
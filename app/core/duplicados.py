@@ -0,0 +1,158 @@
+"""
+Detección de ensayos casi duplicados con MinHash y LSH.
+
+El hash exacto del texto no reconoce dos envíos del mismo ensayo que solo
+difieren en espacios, ruido de OCR o en la limpieza (no determinista) del
+LLM. Aquí cada texto se resume en una firma MinHash: la fracción de
+posiciones iguales entre dos firmas estima la similitud de Jaccard entre sus
+conjuntos de shingles (n-gramas de palabras del texto normalizado).
+
+Para no comparar contra todo el corpus, la firma se divide en bandas (LSH):
+dos textos son candidatos si coinciden por completo en al menos una banda.
+Con 16 bandas de 8 filas, un par con similitud 0.85 es candidato con
+probabilidad > 99 % y uno con similitud 0.5 solo con ~6 %. La base de datos
+guarda el hash de cada banda indexado, así que buscar candidatos es una
+consulta por igualdad y los candidatos se verifican con la firma completa.
+"""
+import re
+import random
+import hashlib
+import unicodedata
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+NUM_PERMUTACIONES = 128
+NUM_BANDAS = 16
+FILAS_POR_BANDA = NUM_PERMUTACIONES // NUM_BANDAS
+TAMANO_SHINGLE = 3
+
+# Primo de Mersenne 2^61 - 1: las permutaciones son (a * x + b) mod PRIMO
+_PRIMO = (1 << 61) - 1
+
+# Semilla fija: las firmas guardadas en la base de datos deben seguir siendo
+# comparables entre procesos y reinicios
+_aleatorio = random.Random(20240611)
+_PERMUTACIONES = [
+    (_aleatorio.randrange(1, _PRIMO), _aleatorio.randrange(0, _PRIMO))
+    for _ in range(NUM_PERMUTACIONES)
+]
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar_texto(texto: str) -> List[str]:
+    """Palabras del texto en minúsculas, sin acentos ni puntuación."""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto).split()
+
+
+def _hash_64(valor: str) -> int:
+    return int.from_bytes(hashlib.blake2b(valor.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingles(texto: str, tamano: int = TAMANO_SHINGLE) -> Set[int]:
+    """Conjunto de hashes de los n-gramas de palabras del texto normalizado."""
+    palabras = normalizar_texto(texto)
+    if len(palabras) < tamano:
+        return {_hash_64(' '.join(palabras))} if palabras else set()
+    return {
+        _hash_64(' '.join(palabras[i:i + tamano]))
+        for i in range(len(palabras) - tamano + 1)
+    }
+
+
+def calcular_firma(texto: str) -> List[int]:
+    """
+    Firma MinHash del texto.
+
+    Returns:
+        Lista de NUM_PERMUTACIONES enteros, o lista vacía si el texto no tiene palabras
+    """
+    conjunto = [x % _PRIMO for x in shingles(texto)]
+    if not conjunto:
+        return []
+    return [min((a * x + b) % _PRIMO for x in conjunto) for a, b in _PERMUTACIONES]
+
+
+def bandas_lsh(firma: Sequence[int]) -> List[Tuple[int, str]]:
+    """Hash de cada banda de la firma como pares (banda, valor)."""
+    return [
+        (banda, hashlib.blake2b(
+            ','.join(map(str, firma[inicio:inicio + FILAS_POR_BANDA])).encode('ascii'),
+            digest_size=8
+        ).hexdigest())
+        for banda, inicio in enumerate(range(0, len(firma), FILAS_POR_BANDA))
+    ]
+
+
+def similitud_estimada(firma_a: Sequence[int], firma_b: Sequence[int]) -> float:
+    """Similitud de Jaccard estimada: fracción de posiciones iguales de las firmas."""
+    if not firma_a or len(firma_a) != len(firma_b):
+        return 0.0
+    return sum(1 for a, b in zip(firma_a, firma_b) if a == b) / len(firma_a)
+
+
+class IndiceLSH:
+    """
+    Índice LSH en memoria, el equivalente de las tablas de bandas para textos
+    que aún no están en la base de datos (p. ej. los pendientes de una carga).
+    """
+
+    def __init__(self):
+        self._firmas: Dict[Hashable, List[int]] = {}
+        self._bandas: Dict[Tuple[int, str], List[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._firmas)
+
+    def agregar(self, clave: Hashable, firma: Sequence[int]):
+        """Indexa la firma de un texto con su clave (una firma vacía no se indexa)."""
+        if not firma:
+            return
+        self._firmas[clave] = list(firma)
+        for banda in bandas_lsh(firma):
+            self._bandas.setdefault(banda, []).append(clave)
+
+    def candidatos(self, firma: Sequence[int]) -> Set[Hashable]:
+        """Claves que comparten al menos una banda con la firma."""
+        return {clave for banda in bandas_lsh(firma) for clave in self._bandas.get(banda, ())}
+
+    def mas_similar(self, firma: Sequence[int], umbral: float) -> Optional[Tuple[Hashable, float]]:
+        """
+        Candidato más similar verificado con la firma completa.
+
+        Returns:
+            Tupla (clave, similitud) si alcanza el umbral, o None
+        """
+        similar = max(
+            ((clave, similitud_estimada(firma, self._firmas[clave])) for clave in self.candidatos(firma)),
+            key=lambda par: par[1], default=None
+        )
+        return similar if similar and similar[1] >= umbral else None
+
+
+def agrupar_pares(pares: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """
+    Agrupa pares de duplicados en clusters (componentes conexas, union-find).
+
+    Returns:
+        Clusters como listas de ids ordenadas, de mayor a menor tamaño
+    """
+    padre: Dict[int, int] = {}
+
+    def raiz(x: int) -> int:
+        padre.setdefault(x, x)
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    for a, b in pares:
+        raiz_a, raiz_b = raiz(a), raiz(b)
+        if raiz_a != raiz_b:
+            padre[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+    clusters: Dict[int, List[int]] = {}
+    for x in padre:
+        clusters.setdefault(raiz(x), []).append(x)
+    return sorted((sorted(miembros) for miembros in clusters.values()), key=lambda c: (-len(c), c[0]))
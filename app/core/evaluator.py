@@ -3,28 +3,88 @@ Agente evaluador de ensayos usando LangGraph y LangChain.
 """
 import os
 import re
-from typing import Dict, Any, Annotated, TypedDict, Optional
+import time
+import asyncio
+from collections import Counter
+from typing import Dict, Any, Annotated, TypedDict, Optional, Tuple, List, Union, Callable
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
+import openai
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 
-from app.core.models import EstadoEvaluacion, EvaluacionEnsayo, EvaluacionCriterio
+from app.core.cache import CacheEvaluaciones, calcular_hash
+from app.core.contabilidad import extraer_uso_tokens, calcular_costo
+from app.core.event_loop import ejecutar_sincrono
+from app.core.gobernador import CARRILES, usar_carril
+from app.core.extracto import construir_extracto, dividir_en_fragmentos
+from app.core.latencia import RegistroLatencias
+from app.core.llm import crear_llm
+from app.core.rate_limiter import LimitadorTasa, estimar_tokens
+from app.core.models import (
+    EstadoEvaluacion,
+    EvaluacionEnsayo,
+    EvaluacionCriterio,
+    EvaluacionCriterioConConfianza,
+    EvaluacionRubrica,
+    CriterioRubrica,
+    RutaModelo
+)
+from app.core.rubrica import RUBRICA_OFICIAL, es_rubrica_oficial
 from app.core.prompts import (
     PROMPT_SISTEMA,
-    PROMPT_CALIDAD_TECNICA,
-    PROMPT_CREATIVIDAD,
-    PROMPT_VINCULACION_TEMATICA,
-    PROMPT_BIENESTAR_COLECTIVO,
-    PROMPT_USO_RESPONSABLE_IA,
-    PROMPT_POTENCIAL_IMPACTO,
-    PROMPT_COMENTARIO_GENERAL
+    PROMPT_CONTEXTO_ENSAYO,
+    PROMPT_CONTEXTO_EXTRACTO,
+    PROMPT_COMENTARIO_GENERAL,
+    PROMPT_EVALUACION_FUSIONADA,
+    PROMPT_CONDENSAR_FRAGMENTO,
+    ENCABEZADO_TEXTO_CONDENSADO
 )
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Modos de evaluación disponibles:
+# - "preciso": grafo con un nodo por criterio + síntesis (7 llamadas al LLM)
+# - "fusionado": una sola llamada con structured output de EvaluacionEnsayo
+MODOS_EVALUACION = ("preciso", "fusionado")
+
+# Contexto del ensayo que recibe el paso de síntesis (comentario general):
+# - "completo": el ensayo y el anexo completos (mismo prefijo que los criterios)
+# - "extracto": párrafos iniciales y frases citadas por los criterios, calculado localmente
+# - "ninguno": solo las evaluaciones previas
+MODOS_CONTEXTO_SINTESIS = ("completo", "extracto", "ninguno")
+
+# Criterios de la rúbrica oficial, con el nombre del campo en EvaluacionEnsayo
+CRITERIOS = tuple(criterio.clave for criterio in RUBRICA_OFICIAL)
+
+# Tokens que se suman a la estimación de cada llamada: instrucciones fijas del
+# prompt más la respuesta esperada del modelo
+TOKENS_FIJOS_POR_LLAMADA = 1500
+
+# Los errores transitorios (5xx, conexión) se reintentan en una sola capa, la
+# de cada llamada: el cliente de OpenAI o, con limitador, _invocar. El grafo no
+# vuelve a reintentar el nodo, porque multiplicaría esos reintentos; un job que
+# aun así falla se reanuda desde su checkpoint con /api/job-retry
+
+# Fracción del presupuesto de tokens que puede ocupar el anexo de IA cuando
+# ensayo + anexo no caben; el resto queda para el ensayo
+FRACCION_PRESUPUESTO_ANEXO = 0.25
+
+# Rondas máximas de condensación (si una ronda no basta, se condensa el resultado)
+MAX_RONDAS_CONDENSACION = 3
+
+# Palabras por token aproximadas, para pedir al modelo una extensión en palabras
+PALABRAS_POR_TOKEN = 0.75
+
+# Nodos del evaluador que no son criterios y admiten una ruta de modelo propia
+NODOS_AUXILIARES = ("comentario_general", "fusionado", "condensacion")
+
+# Uso de tokens registrado para los nodos resueltos desde la caché
+USO_SIN_LLAMADA = {"tokens_entrada": 0, "tokens_salida": 0, "tokens_cacheados": 0}
+
 
 def merge_dicts(left: Optional[Dict], right: Optional[Dict]) -> Dict:
     """Reducer para combinar diccionarios de múltiples nodos."""
@@ -35,226 +95,719 @@ def merge_dicts(left: Optional[Dict], right: Optional[Dict]) -> Dict:
     return {**left, **right}
 
 
+def separar_salida_estructurada(salida: Dict[str, Any]) -> Tuple[Any, Dict[str, int]]:
+    """
+    Separa la salida de un LLM con structured output e include_raw=True.
+    
+    Returns:
+        Tupla (objeto parseado, uso de tokens del mensaje crudo)
+    """
+    if salida.get("parsed") is None:
+        raise salida.get("parsing_error") or ValueError(
+            "El modelo no devolvió una salida estructurada válida"
+        )
+    return salida["parsed"], extraer_uso_tokens(salida.get("raw"))
+
+
+def leer_retry_after(error: Exception) -> Optional[float]:
+    """Obtiene los segundos de la cabecera Retry-After de un error 429, si existe."""
+    respuesta = getattr(error, "response", None)
+    if respuesta is None:
+        return None
+    try:
+        return float(respuesta.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def hash_prompt(instrucciones: str) -> str:
+    """Hash de la plantilla completa de un nodo (sistema + contexto + instrucciones)."""
+    return calcular_hash(PROMPT_SISTEMA, PROMPT_CONTEXTO_ENSAYO, instrucciones)
+
+
+def construir_prompt(instrucciones: str) -> ChatPromptTemplate:
+    """
+    Construye un prompt con el prefijo compartido (sistema + ensayo + anexo)
+    seguido de las instrucciones propias del nodo.
+    
+    Todas las llamadas de un mismo ensayo comparten así el mismo prefijo,
+    lo que permite al proveedor reutilizarlo desde su caché de prompts.
+    """
+    return ChatPromptTemplate.from_messages([
+        ("system", PROMPT_SISTEMA),
+        ("user", PROMPT_CONTEXTO_ENSAYO),
+        ("user", instrucciones)
+    ])
+
+
+def construir_prompt_sintesis(contexto: str) -> ChatPromptTemplate:
+    """Construye el prompt del comentario general según el contexto elegido."""
+    if contexto == "completo":
+        return construir_prompt(PROMPT_COMENTARIO_GENERAL)
+    
+    mensajes = [("system", PROMPT_SISTEMA)]
+    if contexto == "extracto":
+        mensajes.append(("user", PROMPT_CONTEXTO_EXTRACTO))
+    mensajes.append(("user", PROMPT_COMENTARIO_GENERAL))
+    return ChatPromptTemplate.from_messages(mensajes)
+
+
 # Definir el estado del grafo con reducer para actualizaciones concurrentes
 class EstadoGrafo(TypedDict):
     """Estado del grafo de evaluación con soporte para actualizaciones concurrentes."""
     ensayo: str
     anexo_ia: str
+    texto_hash: str
+    contexto_sintesis: str
     paso_actual: str
-    evaluacion: Optional[EvaluacionEnsayo]
-    # Usar Annotated con un reducer personalizado para combinar actualizaciones
-    calidad_tecnica: Annotated[Optional[Dict[str, Any]], merge_dicts]
-    creatividad: Annotated[Optional[Dict[str, Any]], merge_dicts]
-    vinculacion_tematica: Annotated[Optional[Dict[str, Any]], merge_dicts]
-    bienestar_colectivo: Annotated[Optional[Dict[str, Any]], merge_dicts]
-    uso_responsable_ia: Annotated[Optional[Dict[str, Any]], merge_dicts]
-    potencial_impacto: Annotated[Optional[Dict[str, Any]], merge_dicts]
+    evaluacion: Optional[Union[EvaluacionEnsayo, EvaluacionRubrica]]
+    # Resultado de cada criterio: {clave: {calificacion, comentario}}. Usa un
+    # reducer para combinar las actualizaciones concurrentes del fan-out
+    criterios: Annotated[Optional[Dict[str, Dict[str, Any]]], merge_dicts]
+    # Uso por nodo: {nodo: {tokens_entrada, tokens_salida, tokens_cacheados, latencia_ms}}
+    uso_tokens: Annotated[Optional[Dict[str, Dict[str, int]]], merge_dicts]
 
 
 class EvaluadorEnsayos:
     """Agente evaluador de ensayos basado en LangGraph."""
     
-    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.3):
+    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.3,
+                 modo: str = "preciso", limitador: Optional[LimitadorTasa] = None,
+                 max_reintentos_429: int = 5, cache: Optional[CacheEvaluaciones] = None,
+                 contexto_sintesis: str = "completo",
+                 rubrica: Optional[List[CriterioRubrica]] = None,
+                 cobertura: bool = False, percentil_cobertura: float = 0.95,
+                 plazo_nodo: Optional[float] = None,
+                 presupuesto_tokens: Optional[int] = 16000, tokens_fragmento: int = 4000,
+                 cascada: bool = False, modelo_cascada: str = "gpt-4o-mini",
+                 confianza_minima_cascada: int = 4,
+                 calificaciones_escalar: Tuple[int, ...] = (4, 5),
+                 rutas_modelos: Optional[Dict[str, Union[RutaModelo, Dict[str, Any]]]] = None,
+                 checkpointer: Optional[BaseCheckpointSaver] = None,
+                 reintentos_nodo: int = 3, carril: str = "carga"):
         """
         Inicializa el evaluador.
         
         Args:
             model_name: Nombre del modelo de OpenAI a usar
             temperature: Temperatura para la generación
+            modo: Modo por defecto, "preciso" (grafo de 7 llamadas) o
+                "fusionado" (una sola llamada para todos los criterios)
+            limitador: Limitador de RPM/TPM compartido por todas las llamadas (opcional)
+            max_reintentos_429: Reintentos por llamada ante respuestas 429 (solo con limitador)
+            cache: Caché persistente de resultados por criterio (opcional)
+            contexto_sintesis: Contexto del ensayo para el comentario general:
+                "completo", "extracto" o "ninguno"
+            rubrica: Criterios a evaluar (por defecto, la rúbrica oficial). Con otra
+                rúbrica el resultado es una EvaluacionRubrica
+            cobertura: Si es True, un nodo que no responde dentro del percentil
+                `percentil_cobertura` de su latencia reciente recibe una solicitud
+                duplicada y gana la primera respuesta (hedging)
+            percentil_cobertura: Percentil (0-1) de latencia que dispara el respaldo
+            plazo_nodo: Segundos máximos por nodo antes de fallar con TimeoutError (opcional)
+            presupuesto_tokens: Tokens estimados máximos de ensayo + anexo por llamada.
+                Un texto más largo se divide en fragmentos de `tokens_fragmento`
+                tokens que se condensan en paralelo antes de evaluar (None = sin límite)
+            tokens_fragmento: Tamaño máximo de cada fragmento a condensar
+            cascada: Si es True (modo "preciso"), cada criterio se evalúa primero con
+                `modelo_cascada` y solo se repite con `model_name` si la calificación
+                está en `calificaciones_escalar`, la salida no es válida o la confianza
+                reportada es menor que `confianza_minima_cascada`
+            modelo_cascada: Modelo económico de la primera pasada
+            confianza_minima_cascada: Confianza (1-5) mínima para aceptar la primera pasada
+            calificaciones_escalar: Calificaciones que siempre se confirman con el modelo
+                completo (por defecto las altas, que deciden los primeros lugares)
+            rutas_modelos: Modelo, temperatura y max_tokens por nodo ({clave del
+                criterio o "comentario_general"/"fusionado"/"condensacion": RutaModelo
+                o dict}). Los nodos sin ruta usan `model_name` y `temperature`
+            checkpointer: Checkpointer de LangGraph (opcional). Con él, una evaluación
+                con job_id guarda cada criterio completado y, si falla, al repetirla
+                con el mismo job_id solo se ejecutan los nodos que faltan
+            reintentos_nodo: Intentos de cada llamada al LLM ante errores transitorios
+                del proveedor (5xx, conexión) antes de dar el nodo por fallido
+            carril: Carril del gobernador de concurrencia de todas sus llamadas
+                ("interactivo", "carga" o "lote")
         """
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=temperature,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        if modo not in MODOS_EVALUACION:
+            raise ValueError(f"Modo no válido: {modo}. Usa 'preciso' o 'fusionado'")
+        if contexto_sintesis not in MODOS_CONTEXTO_SINTESIS:
+            raise ValueError(f"Contexto de síntesis no válido: {contexto_sintesis}. "
+                             f"Usa {', '.join(MODOS_CONTEXTO_SINTESIS)}")
+        if carril not in CARRILES:
+            raise ValueError(f"Carril no válido: {carril}. Usa {', '.join(CARRILES)}")
+        self.modo = modo
+        self.contexto_sintesis = contexto_sintesis
+        self.model_name = model_name
+        self.temperature = temperature
+        self.limitador = limitador
+        self.cache = cache
+        self.max_reintentos_429 = max_reintentos_429
+        self.cobertura = cobertura
+        self.percentil_cobertura = percentil_cobertura
+        self.plazo_nodo = plazo_nodo
+        self.presupuesto_tokens = presupuesto_tokens
+        self.tokens_fragmento = tokens_fragmento
+        self.cascada = cascada
+        self.modelo_cascada = modelo_cascada
+        self.confianza_minima_cascada = confianza_minima_cascada
+        self.calificaciones_escalar = tuple(calificaciones_escalar)
+        self.checkpointer = checkpointer
+        if reintentos_nodo < 1:
+            raise ValueError("reintentos_nodo debe ser al menos 1")
+        self.reintentos_nodo = reintentos_nodo
+        self.carril = carril
+        
+        # Estadísticas de la cascada: criterios evaluados, escalados por motivo y
+        # costo real frente al de evaluar todo con el modelo completo
+        self.cascada_criterios = 0
+        self.cascada_escalados = Counter()
+        self.cascada_costo_usd = 0.0
+        self.cascada_costo_sin_cascada_usd = 0.0
+        
+        # Latencias recientes por nodo: fijan el umbral de las solicitudes de respaldo
+        self.latencias = RegistroLatencias()
+        self.total_respaldos = 0
+        self.respaldos_ganadores = 0
+        
+        # Con limitador, los 429 se gestionan aquí (backoff adaptativo) y no en el cliente
+        self._reintentos_cliente = 0 if limitador else reintentos_nodo - 1
+        
+        self.rubrica = list(rubrica or RUBRICA_OFICIAL)
+        claves = [criterio.clave for criterio in self.rubrica]
+        if len(set(claves)) != len(claves):
+            raise ValueError(f"Claves de criterio repetidas en la rúbrica: {claves}")
+        self.rubrica_oficial = es_rubrica_oficial(self.rubrica)
+        
+        # Tabla de rutas: cada nodo con su modelo, temperatura y max_tokens
+        self.rutas_modelos = {
+            nodo: ruta if isinstance(ruta, RutaModelo) else RutaModelo(**ruta)
+            for nodo, ruta in (rutas_modelos or {}).items()
+        }
+        desconocidos = set(self.rutas_modelos) - set(claves) - set(NODOS_AUXILIARES)
+        if desconocidos:
+            raise ValueError(f"Rutas de modelo para nodos inexistentes: {sorted(desconocidos)}")
         
-        # LLM con structured output para extraer calificaciones
-        self.llm_structured = ChatOpenAI(
-            model=model_name,
-            temperature=temperature,
-            api_key=os.getenv("OPENAI_API_KEY")
-        ).with_structured_output(EvaluacionCriterio)
+        # Un cliente por configuración distinta de (modelo, temperatura, max_tokens):
+        # los nodos con la misma ruta comparten cliente y pool de conexiones
+        self._clientes = {}
+        
+        self.llm = self._llm_para("comentario_general")
+        
+        # LLM con structured output de la evaluación completa (modo fusionado)
+        self.llm_fusionado = self._llm_para("fusionado", EvaluacionEnsayo)
+        
+        # Cadenas compiladas una sola vez: una por criterio, la fusionada y
+        # una por contexto de síntesis
+        self._cadenas_criterio = {}
+        self._cadenas_cascada = {}
+        self._hash_prompts = {}
+        for criterio in self.rubrica:
+            prompt = construir_prompt(criterio.prompt)
+            faltantes = set(prompt.input_variables) - set(criterio.entradas)
+            if faltantes:
+                raise ValueError(f"El prompt de '{criterio.clave}' usa entradas no declaradas: {faltantes}")
+            self._cadenas_criterio[criterio.clave] = prompt | self._llm_para(criterio.clave, EvaluacionCriterio)
+            # Primera pasada económica de la cascada, que además reporta su confianza
+            self._cadenas_cascada[criterio.clave] = prompt | self._cliente(
+                RutaModelo(modelo=modelo_cascada, temperatura=self.ruta(criterio.clave).temperatura),
+                EvaluacionCriterioConConfianza
+            )
+            self._hash_prompts[criterio.clave] = hash_prompt(criterio.prompt)
+        
+        self._cadena_fusionada = construir_prompt(PROMPT_EVALUACION_FUSIONADA) | self.llm_fusionado
+        self._cadenas_sintesis = {
+            contexto: construir_prompt_sintesis(contexto) | self.llm
+            for contexto in MODOS_CONTEXTO_SINTESIS
+        }
+        self._cadena_condensacion = (
+            ChatPromptTemplate.from_messages([("user", PROMPT_CONDENSAR_FRAGMENTO)])
+            | self._llm_para("condensacion")
+        )
         
         self.graph = self._construir_grafo()
+        # Las evaluaciones con job_id usan una copia con checkpoints, para que
+        # las demás no paguen la escritura del estado en cada paso
+        self._grafo_checkpoints = self._construir_grafo(checkpointer) if checkpointer else None
+    
+    def ruta(self, nodo: str) -> RutaModelo:
+        """Ruta efectiva de un nodo, con los valores del evaluador por defecto."""
+        ruta = self.rutas_modelos.get(nodo) or RutaModelo()
+        return RutaModelo(
+            modelo=ruta.modelo or self.model_name,
+            temperatura=ruta.temperatura if ruta.temperatura is not None else self.temperature,
+            max_tokens=ruta.max_tokens
+        )
+    
+    def _cliente(self, ruta: RutaModelo, esquema: Optional[type] = None):
+        """Cliente compartido para una ruta (con structured output si se indica esquema)."""
+        clave = (ruta.modelo, ruta.temperatura, ruta.max_tokens, esquema)
+        if clave not in self._clientes:
+            if esquema is None:
+                self._clientes[clave] = crear_llm(
+                    ruta.modelo, ruta.temperatura,
+                    max_retries=self._reintentos_cliente, max_tokens=ruta.max_tokens
+                )
+            else:
+                self._clientes[clave] = self._cliente(ruta).with_structured_output(
+                    esquema, include_raw=True
+                )
+        return self._clientes[clave]
+    
+    def _llm_para(self, nodo: str, esquema: Optional[type] = None):
+        """Cliente del nodo según la tabla de rutas."""
+        return self._cliente(self.ruta(nodo), esquema)
     
-    def _evaluar_calidad_tecnica(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalúa calidad técnica y rigor académico."""
-        print(" Evaluando: Calidad técnica y rigor académico...")
+    def _modelo_cache(self, nodo: str) -> str:
+        """
+        Identificador del modelo de un nodo para las claves de caché: incluye
+        max_tokens y, para criterios en cascada, la configuración de la cascada,
+        cuyos resultados no equivalen a los del modelo completo.
+        """
+        ruta = self.ruta(nodo)
+        identificador = ruta.modelo
+        if ruta.max_tokens:
+            identificador += f":max_tokens={ruta.max_tokens}"
+        if self._usa_cascada(nodo):
+            identificador = (f"cascada:{self.modelo_cascada}>{identificador}:{self.confianza_minima_cascada}:"
+                             f"{','.join(map(str, self.calificaciones_escalar))}")
+        return identificador
+    
+    def _usa_cascada(self, nodo: str) -> bool:
+        """Un criterio usa la cascada si está activa y su modelo no es ya el económico."""
+        return (self.cascada and nodo in self._cadenas_cascada
+                and self.ruta(nodo).modelo != self.modelo_cascada)
+    
+    async def _invocar(self, chain, entradas: Dict[str, Any],
+                       config: Optional[RunnableConfig] = None) -> Any:
+        """
+        Invoca una cadena respetando el limitador de tasa, si lo hay.
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_CALIDAD_TECNICA)
-        ])
+        Ante un 429 el limitador reduce la tasa y pausa las solicitudes, y la
+        llamada se reintenta hasta max_reintentos_429 veces.
+        """
+        if self.limitador is None:
+            return await chain.ainvoke(entradas, config=config)
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({"ensayo": state["ensayo"]})
+        tokens_estimados = (
+            estimar_tokens("".join(str(valor) for valor in entradas.values()))
+            + TOKENS_FIJOS_POR_LLAMADA
+        )
         
-        return {
-            "calidad_tecnica": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
-        }
+        reintentos_429 = 0
+        reintentos_transitorios = 0
+        
+        while True:
+            await self.limitador.adquirir(tokens_estimados)
+            try:
+                salida = await chain.ainvoke(entradas, config=config)
+            except openai.RateLimitError as e:
+                self.limitador.registrar_429(leer_retry_after(e))
+                if reintentos_429 == self.max_reintentos_429:
+                    raise
+                reintentos_429 += 1
+                print(f"WARN: 429 del proveedor, reintento {reintentos_429}/{self.max_reintentos_429} "
+                      f"(tasa al {self.limitador.factor:.0%})")
+                continue
+            except (openai.APIConnectionError, openai.InternalServerError):
+                # El cliente no reintenta cuando hay limitador: los errores
+                # transitorios se reintentan aquí, sin penalizar la tasa
+                if reintentos_transitorios == self.reintentos_nodo - 1:
+                    raise
+                reintentos_transitorios += 1
+                await asyncio.sleep(0.5 * 2 ** reintentos_transitorios)
+                continue
+            
+            self.limitador.registrar_exito()
+            uso = extraer_uso_tokens(salida.get("raw") if isinstance(salida, dict) else salida)
+            tokens_reales = uso["tokens_entrada"] + uso["tokens_salida"]
+            if tokens_reales:
+                self.limitador.corregir(tokens_estimados, tokens_reales)
+            return salida
     
-    def _evaluar_creatividad(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalua creatividad y originalidad."""
-        print("Evaluando: Creatividad y originalidad...")
+    async def _invocar_nodo(self, nodo: str, chain, entradas: Dict[str, Any],
+                            config: Optional[RunnableConfig] = None) -> Any:
+        """
+        Invoca la cadena de un nodo con plazo y solicitud de respaldo opcionales.
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_CREATIVIDAD)
-        ])
+        Si la cobertura está activa y el nodo no responde dentro del percentil
+        configurado de su latencia reciente, se lanza una segunda solicitud
+        idéntica y se usa la primera respuesta; la otra se cancela. Si hay
+        plazo y ninguna responde a tiempo, se cancela todo y se lanza
+        asyncio.TimeoutError.
+        """
+        inicio = time.perf_counter()
+        limite = inicio + self.plazo_nodo if self.plazo_nodo else None
+        umbral = self.latencias.umbral(nodo, self.percentil_cobertura) if self.cobertura else None
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({"ensayo": state["ensayo"]})
+        tareas = []
         
-        return {
-            "creatividad": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
-        }
+        def lanzar():
+            # La tarea copia el contexto al crearse: sus llamadas usan el carril del evaluador
+            with usar_carril(self.carril):
+                tarea = asyncio.create_task(self._invocar(chain, entradas, config=config))
+            tareas.append(tarea)
+            return tarea
+        
+        principal = lanzar()
+        pendientes = {principal}
+        respaldo = None
+        error = None
+        
+        try:
+            while pendientes:
+                ahora = time.perf_counter()
+                esperas = []
+                if respaldo is None and umbral is not None:
+                    esperas.append(max(0.0, inicio + umbral - ahora))
+                if limite is not None:
+                    esperas.append(max(0.0, limite - ahora))
+                
+                hechas, pendientes = await asyncio.wait(
+                    pendientes,
+                    timeout=min(esperas) if esperas else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        # La latencia es la del nodo (desde `inicio`, igual que el
+                        # umbral), gane la solicitud que gane: medirla desde el
+                        # respaldo bajaría el percentil y adelantaría la cobertura
+                        self.latencias.registrar(nodo, time.perf_counter() - inicio)
+                        if tarea is respaldo:
+                            self.respaldos_ganadores += 1
+                        return tarea.result()
+                    error = tarea.exception()
+                
+                if hechas:
+                    # Falló una solicitud: si queda otra en vuelo, se espera a esa
+                    continue
+                
+                if limite is not None and time.perf_counter() >= limite:
+                    raise asyncio.TimeoutError(
+                        f"El nodo '{nodo}' superó su plazo de {self.plazo_nodo:.1f}s"
+                    )
+                
+                if respaldo is None and umbral is not None:
+                    print(f"   {nodo}: sin respuesta tras {umbral:.1f}s "
+                          f"(p{self.percentil_cobertura * 100:.0f}), enviando solicitud de respaldo")
+                    respaldo = lanzar()
+                    pendientes.add(respaldo)
+                    self.total_respaldos += 1
+            
+            raise error
+        finally:
+            for tarea in tareas:
+                if not tarea.done():
+                    tarea.cancel()
     
-    def _evaluar_vinculacion(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalúa vinculación con ejes temáticos."""
-        print("Evaluando: Vinculacion con ejes tematicos...")
+    async def _condensar(self, texto: str, max_tokens: int, documento: str) -> Tuple[str, List[Dict[str, int]]]:
+        """
+        Condensa un texto hasta `max_tokens` tokens estimados (paso "map").
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_VINCULACION_TEMATICA)
-        ])
+        El texto se divide en fragmentos por párrafos y todos se condensan en
+        paralelo, así que la latencia depende del fragmento más lento y no de
+        la longitud del texto. Si una ronda no basta, se condensa el resultado.
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({"ensayo": state["ensayo"]})
+        Returns:
+            Tupla (texto condensado, uso de tokens de cada llamada)
+        """
+        palabras_originales = len(texto.split())
+        usos = []
         
-        return {
-            "vinculacion_tematica": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
-        }
+        for _ in range(MAX_RONDAS_CONDENSACION):
+            if estimar_tokens(texto) <= max_tokens:
+                break
+            
+            fragmentos = dividir_en_fragmentos(texto, self.tokens_fragmento)
+            palabras = max(50, int(max_tokens / len(fragmentos) * PALABRAS_POR_TOKEN))
+            print(f"   Condensando {documento}: {len(fragmentos)} fragmentos, "
+                  f"máximo {palabras} palabras cada uno")
+            
+            respuestas = await asyncio.gather(*(
+                self._invocar_nodo("condensacion", self._cadena_condensacion, {
+                    "fragmento": fragmento,
+                    "numero": numero,
+                    "total": len(fragmentos),
+                    "documento": documento,
+                    "palabras": palabras
+                })
+                for numero, fragmento in enumerate(fragmentos, 1)
+            ))
+            usos.extend(extraer_uso_tokens(respuesta) for respuesta in respuestas)
+            
+            condensado = "\n\n".join(respuesta.content.strip() for respuesta in respuestas)
+            if len(condensado) >= len(texto):
+                # El modelo no redujo el texto: no tiene sentido otra ronda
+                break
+            texto = condensado
+        
+        if usos:
+            texto = ENCABEZADO_TEXTO_CONDENSADO.format(
+                documento=documento, palabras=palabras_originales
+            ) + texto
+        return texto, usos
     
-    def _evaluar_bienestar(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalúa reflexión sobre bienestar colectivo."""
-        print("Evaluando: Bienestar colectivo y responsabilidad social...")
+    async def _ajustar_al_presupuesto(self, ensayo: str, anexo_ia: str) -> Tuple[str, str, Optional[Dict[str, int]]]:
+        """
+        Reduce ensayo y anexo al presupuesto de tokens por llamada, si lo superan.
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_BIENESTAR_COLECTIVO)
-        ])
+        El anexo puede ocupar hasta FRACCION_PRESUPUESTO_ANEXO del presupuesto;
+        el ensayo, el resto. Ambos se condensan a la vez.
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({"ensayo": state["ensayo"]})
+        Returns:
+            Tupla (ensayo, anexo, uso del nodo "condensacion" o None si no hizo falta)
+        """
+        if not self.presupuesto_tokens:
+            return ensayo, anexo_ia, None
         
-        return {
-            "bienestar_colectivo": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
-        }
+        tokens_ensayo = estimar_tokens(ensayo)
+        tokens_anexo = estimar_tokens(anexo_ia)
+        if tokens_ensayo + tokens_anexo <= self.presupuesto_tokens:
+            return ensayo, anexo_ia, None
+        
+        print(f"Texto de ~{tokens_ensayo + tokens_anexo} tokens supera el presupuesto de "
+              f"{self.presupuesto_tokens}: se condensará antes de evaluar")
+        
+        clave = (calcular_hash(ensayo, anexo_ia), "condensacion",
+                 calcular_hash(PROMPT_CONDENSAR_FRAGMENTO, str(self.presupuesto_tokens),
+                               str(self.tokens_fragmento)),
+                 self._modelo_cache("condensacion"), self.ruta("condensacion").temperatura)
+        
+        resultado = await self.cache.aobtener(*clave) if self.cache is not None else None
+        if resultado is not None:
+            print("   condensacion: resultado tomado de la caché")
+            return resultado["ensayo"], resultado["anexo_ia"], dict(USO_SIN_LLAMADA)
+        
+        max_anexo = min(tokens_anexo, int(self.presupuesto_tokens * FRACCION_PRESUPUESTO_ANEXO))
+        max_ensayo = self.presupuesto_tokens - max_anexo
+        
+        inicio = time.perf_counter()
+        (ensayo, usos_ensayo), (anexo_ia, usos_anexo) = await asyncio.gather(
+            self._condensar(ensayo, max_ensayo, "un ensayo"),
+            self._condensar(anexo_ia, max_anexo, "un anexo de uso de IA")
+        )
+        
+        uso = dict(USO_SIN_LLAMADA)
+        for uso_llamada in usos_ensayo + usos_anexo:
+            for campo in uso:
+                uso[campo] += uso_llamada[campo]
+        uso["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+        uso["modelo"] = self.ruta("condensacion").modelo
+        
+        if self.cache is not None:
+            await self.cache.aguardar(*clave, {"ensayo": ensayo, "anexo_ia": anexo_ia})
+        
+        return ensayo, anexo_ia, uso
     
-    def _evaluar_uso_ia(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalúa uso responsable y reflexivo de herramientas de IA."""
-        print("Evaluando: Uso responsable y reflexivo de herramientas de IA...")
+    async def _evaluar_criterio(self, criterio: CriterioRubrica,
+                                state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evalúa un criterio con su cadena precompilada, reutilizando el
+        resultado de la caché si existe.
         
-        # Obtener el anexo de IA si está disponible
-        anexo_ia = state.get("anexo_ia", "[NO SE PROPORCIONÓ ANEXO DE IA]")
+        Returns:
+            Actualización del estado con el criterio y su uso de tokens
+        """
+        print(f"Evaluando: {criterio.titulo.capitalize()}...")
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_USO_RESPONSABLE_IA)
-        ])
+        clave = (state["texto_hash"], criterio.clave, self._hash_prompts[criterio.clave],
+                 self._modelo_cache(criterio.clave), self.ruta(criterio.clave).temperatura)
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({
-            "ensayo": state["ensayo"],
-            "anexo_ia": anexo_ia
-        })
+        if self.cache is not None:
+            resultado = await self.cache.aobtener(*clave)
+            if resultado is not None:
+                print(f"   {criterio.clave}: resultado tomado de la caché")
+                return {
+                    "criterios": {criterio.clave: resultado},
+                    "uso_tokens": {criterio.clave: dict(USO_SIN_LLAMADA)}
+                }
         
-        return {
-            "uso_responsable_ia": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
+        entradas = {entrada: state[entrada] for entrada in criterio.entradas}
+        if self._usa_cascada(criterio.clave):
+            evaluacion, usos = await self._evaluar_en_cascada(criterio, entradas)
+        else:
+            evaluacion, uso = await self._evaluar_con_modelo_completo(criterio, entradas)
+            usos = {criterio.clave: uso}
+        
+        resultado = {
+            "calificacion": evaluacion.calificacion,
+            "comentario": evaluacion.comentario
         }
+        if self.cache is not None:
+            await self.cache.aguardar(*clave, resultado)
+        
+        return {"criterios": {criterio.clave: resultado}, "uso_tokens": usos}
     
-    def _evaluar_impacto(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Nodo: Evalúa potencial de impacto."""
-        print("Evaluando: Potencial de impacto y publicacion...")
+    async def _evaluar_con_modelo_completo(self, criterio: CriterioRubrica,
+                                           entradas: Dict[str, Any]) -> Tuple[EvaluacionCriterio, Dict[str, Any]]:
+        """Evalúa un criterio con el modelo de su ruta."""
+        inicio = time.perf_counter()
+        evaluacion, uso = separar_salida_estructurada(await self._invocar_nodo(
+            criterio.clave, self._cadenas_criterio[criterio.clave], entradas
+        ))
+        uso["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+        uso["modelo"] = self.ruta(criterio.clave).modelo
+        return evaluacion, uso
+    
+    async def _evaluar_en_cascada(self, criterio: CriterioRubrica,
+                                  entradas: Dict[str, Any]) -> Tuple[EvaluacionCriterio, Dict[str, Dict[str, Any]]]:
+        """
+        Evalúa un criterio con el modelo económico y escala al modelo completo
+        si la calificación es decisiva, la salida no es válida o la confianza
+        reportada es baja.
+        
+        Returns:
+            Tupla (evaluación final, uso por nodo). Si hubo escalamiento, el intento
+            descartado se registra como "<criterio>:<modelo económico>"
+        """
+        nodo_economico = f"{criterio.clave}:{self.modelo_cascada}"
+        modelo_completo = self.ruta(criterio.clave).modelo
+        motivo = None
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_POTENCIAL_IMPACTO)
-        ])
+        inicio = time.perf_counter()
+        try:
+            previa, uso_economico = separar_salida_estructurada(await self._invocar_nodo(
+                nodo_economico, self._cadenas_cascada[criterio.clave], entradas
+            ))
+            if previa.calificacion in self.calificaciones_escalar:
+                motivo = "calificacion"
+            elif previa.confianza < self.confianza_minima_cascada:
+                motivo = "confianza"
+        except (openai.APIError, asyncio.TimeoutError) as e:
+            print(f"   {criterio.clave}: error del modelo {self.modelo_cascada} ({type(e).__name__})")
+            motivo, uso_economico = "error", dict(USO_SIN_LLAMADA)
+        except Exception as e:
+            # Structured output inválido (parsing o validación del esquema)
+            print(f"   {criterio.clave}: salida no válida de {self.modelo_cascada} ({type(e).__name__})")
+            motivo, uso_economico = "salida_invalida", dict(USO_SIN_LLAMADA)
+        uso_economico["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+        uso_economico["modelo"] = self.modelo_cascada
         
-        chain = prompt | self.llm_structured
-        evaluacion = chain.invoke({"ensayo": state["ensayo"]})
+        self.cascada_criterios += 1
+        self.cascada_costo_usd += self._costo(uso_economico, self.modelo_cascada)
         
+        if motivo is None:
+            # Sin cascada, la misma llamada la habría atendido el modelo completo
+            self.cascada_costo_sin_cascada_usd += self._costo(uso_economico, modelo_completo)
+            evaluacion = EvaluacionCriterio(calificacion=previa.calificacion, comentario=previa.comentario)
+            return evaluacion, {criterio.clave: uso_economico}
+        
+        print(f"   {criterio.clave}: escalando a {modelo_completo} (motivo: {motivo})")
+        self.cascada_escalados[motivo] += 1
+        
+        evaluacion, uso = await self._evaluar_con_modelo_completo(criterio, entradas)
+        costo_completo = self._costo(uso, modelo_completo)
+        self.cascada_costo_usd += costo_completo
+        self.cascada_costo_sin_cascada_usd += costo_completo
+        
+        return evaluacion, {criterio.clave: uso, nodo_economico: uso_economico}
+    
+    @staticmethod
+    def _costo(uso: Dict[str, Any], modelo: str) -> float:
+        """Costo en USD del uso de una llamada (0 si el modelo no tiene precio)."""
+        return calcular_costo(
+            modelo, uso["tokens_entrada"], uso["tokens_salida"], uso["tokens_cacheados"]
+        ) or 0.0
+    
+    def estadisticas_cascada(self) -> Dict[str, Any]:
+        """Tasa de escalamiento por motivo y ahorro estimado de la cascada."""
+        escalados = sum(self.cascada_escalados.values())
         return {
-            "potencial_impacto": {
-                "calificacion": evaluacion.calificacion,
-                "comentario": evaluacion.comentario
-            }
+            'activa': self.cascada,
+            'modelo_economico': self.modelo_cascada,
+            'criterios': self.cascada_criterios,
+            'escalados': escalados,
+            'tasa_escalamiento': round(escalados / self.cascada_criterios, 3) if self.cascada_criterios else None,
+            'motivos': dict(self.cascada_escalados),
+            'costo_usd': round(self.cascada_costo_usd, 6),
+            'costo_sin_cascada_usd': round(self.cascada_costo_sin_cascada_usd, 6),
+            'ahorro_usd': round(self.cascada_costo_sin_cascada_usd - self.cascada_costo_usd, 6)
         }
     
-    def _generar_comentario_general(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def _crear_nodo_criterio(self, criterio: CriterioRubrica) -> Callable:
+        """Crea la función de nodo del grafo para un criterio de la rúbrica."""
+        async def nodo(state: Dict[str, Any]) -> Dict[str, Any]:
+            return await self._evaluar_criterio(criterio, state)
+        
+        return nodo
+    
+    async def _generar_comentario_general(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Nodo: Genera comentario general y ensambla evaluacion final."""
         print("Generando comentario general...")
         
-        # Preparar resumen de evaluaciones previas
-        evaluaciones_previas = f"""
-            1. CALIDAD TÉCNICA Y RIGOR ACADÉMICO: {state['calidad_tecnica']['calificacion']}/5
-            {state['calidad_tecnica']['comentario']}
-
-            2. CREATIVIDAD Y ORIGINALIDAD: {state['creatividad']['calificacion']}/5
-            {state['creatividad']['comentario']}
-
-            3. VINCULACIÓN TEMÁTICA: {state['vinculacion_tematica']['calificacion']}/5
-            {state['vinculacion_tematica']['comentario']}
-
-            4. BIENESTAR COLECTIVO: {state['bienestar_colectivo']['calificacion']}/5
-            {state['bienestar_colectivo']['comentario']}
-
-            5. USO RESPONSABLE DE IA: {state['uso_responsable_ia']['calificacion']}/5
-            {state['uso_responsable_ia']['comentario']}
-
-            6. POTENCIAL DE IMPACTO: {state['potencial_impacto']['calificacion']}/5
-            {state['potencial_impacto']['comentario']}
-            """
+        criterios = state["criterios"]
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", PROMPT_SISTEMA),
-            ("user", PROMPT_COMENTARIO_GENERAL)
-        ])
+        # Preparar resumen de evaluaciones previas en el orden de la rúbrica
+        evaluaciones_previas = "\n".join(
+            f"{i}. {criterio.titulo}: {criterios[criterio.clave]['calificacion']}/5\n"
+            f"{criterios[criterio.clave]['comentario']}\n"
+            for i, criterio in enumerate(self.rubrica, 1)
+        )
         
-        chain = prompt | self.llm
-        respuesta = chain.invoke({
-            "evaluaciones_previas": evaluaciones_previas,
-            "ensayo": state["ensayo"]
-        })
+        contexto = state.get("contexto_sintesis") or self.contexto_sintesis
         
-        comentario_general = respuesta.content.strip()
+        # La síntesis depende de las evaluaciones previas y del contexto elegido:
+        # si alguno cambió, cambia su clave
+        clave = (state["texto_hash"], "comentario_general",
+                 calcular_hash(hash_prompt(PROMPT_COMENTARIO_GENERAL), contexto, evaluaciones_previas),
+                 self._modelo_cache("comentario_general"), self.ruta("comentario_general").temperatura)
+        
+        resultado = await self.cache.aobtener(*clave) if self.cache is not None else None
+        if resultado is not None:
+            print("   comentario_general: resultado tomado de la caché")
+            comentario_general = resultado["comentario"]
+            uso_comentario = dict(USO_SIN_LLAMADA)
+        else:
+            entradas = {"evaluaciones_previas": evaluaciones_previas}
+            if contexto == "completo":
+                entradas.update(ensayo=state["ensayo"], anexo_ia=state["anexo_ia"])
+            elif contexto == "extracto":
+                entradas["extracto"] = construir_extracto(
+                    state["ensayo"],
+                    [resultado["comentario"] for resultado in criterios.values()]
+                )
+            
+            inicio = time.perf_counter()
+            respuesta = await self._invocar_nodo(
+                "comentario_general", self._cadenas_sintesis[contexto], entradas
+            )
+            
+            comentario_general = respuesta.content.strip()
+            uso_comentario = extraer_uso_tokens(respuesta)
+            uso_comentario["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+            uso_comentario["modelo"] = self.ruta("comentario_general").modelo
+            print(f"   comentario_general (contexto {contexto}): "
+                  f"{uso_comentario['tokens_salida']} tokens de salida, {uso_comentario['latencia_ms']} ms")
+            if self.cache is not None:
+                await self.cache.aguardar(*clave, {"comentario": comentario_general})
         
         # Ensamblar evaluación completa
-        evaluacion = EvaluacionEnsayo(
-            calidad_tecnica=EvaluacionCriterio(**state["calidad_tecnica"]),
-            creatividad=EvaluacionCriterio(**state["creatividad"]),
-            vinculacion_tematica=EvaluacionCriterio(**state["vinculacion_tematica"]),
-            bienestar_colectivo=EvaluacionCriterio(**state["bienestar_colectivo"]),
-            uso_responsable_ia=EvaluacionCriterio(**state["uso_responsable_ia"]),
-            potencial_impacto=EvaluacionCriterio(**state["potencial_impacto"]),
-            comentario_general=comentario_general
-        )
+        if self.rubrica_oficial:
+            evaluacion = EvaluacionEnsayo(
+                **{clave: EvaluacionCriterio(**resultado) for clave, resultado in criterios.items()},
+                comentario_general=comentario_general
+            )
+        else:
+            evaluacion = EvaluacionRubrica(
+                criterios={clave: EvaluacionCriterio(**resultado) for clave, resultado in criterios.items()},
+                ponderaciones={criterio.clave: criterio.peso for criterio in self.rubrica},
+                comentario_general=comentario_general
+            )
         
         # Calcular puntuación total
         evaluacion.calcular_puntuacion_total()
         
+        uso_tokens = {**(state.get("uso_tokens") or {}), "comentario_general": uso_comentario}
+        evaluacion.registrar_uso_tokens(uso_tokens)
+        
         return {
             "evaluacion": evaluacion,
-            "paso_actual": "finalizado"
+            "paso_actual": "finalizado",
+            "uso_tokens": {"comentario_general": uso_tokens["comentario_general"]}
         }
     
-    def _construir_grafo(self) -> StateGraph:
+    def _construir_grafo(self, checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
         """Construye el grafo de evaluacion con LangGraph.
         
         OPTIMIZACION: Los criterios se evaluan en paralelo para reducir
@@ -263,76 +816,290 @@ class EvaluadorEnsayos:
         # Crear el grafo con el estado tipado
         workflow = StateGraph(EstadoGrafo)
         
-        # Agregar nodos
+        # Agregar nodos: uno por criterio de la rúbrica
         workflow.add_node("inicio", lambda x: x)  # Nodo dummy para paralelizacion
-        workflow.add_node("calidad_tecnica", self._evaluar_calidad_tecnica)
-        workflow.add_node("creatividad", self._evaluar_creatividad)
-        workflow.add_node("vinculacion", self._evaluar_vinculacion)
-        workflow.add_node("bienestar", self._evaluar_bienestar)
-        workflow.add_node("uso_ia", self._evaluar_uso_ia)
-        workflow.add_node("impacto", self._evaluar_impacto)
+        for criterio in self.rubrica:
+            workflow.add_node(criterio.clave, self._crear_nodo_criterio(criterio))
         workflow.add_node("comentario_general", self._generar_comentario_general)
         
         # PARALELIZACION: Todos los criterios se evaluan simultaneamente
         workflow.set_entry_point("inicio")
         
-        # Desde inicio, lanzar todas las evaluaciones en paralelo
-        workflow.add_edge("inicio", "calidad_tecnica")
-        workflow.add_edge("inicio", "creatividad")
-        workflow.add_edge("inicio", "vinculacion")
-        workflow.add_edge("inicio", "bienestar")
-        workflow.add_edge("inicio", "uso_ia")
-        workflow.add_edge("inicio", "impacto")
-        
-        # Todos los criterios convergen al comentario general
-        workflow.add_edge("calidad_tecnica", "comentario_general")
-        workflow.add_edge("creatividad", "comentario_general")
-        workflow.add_edge("vinculacion", "comentario_general")
-        workflow.add_edge("bienestar", "comentario_general")
-        workflow.add_edge("uso_ia", "comentario_general")
-        workflow.add_edge("impacto", "comentario_general")
+        # Desde inicio se lanzan todas las evaluaciones en paralelo, y todas
+        # convergen al comentario general
+        for criterio in self.rubrica:
+            workflow.add_edge("inicio", criterio.clave)
+            workflow.add_edge(criterio.clave, "comentario_general")
         
         workflow.add_edge("comentario_general", END)
         
-        # Compilar el grafo
-        return workflow.compile()
+        # Compilar el grafo (con checkpointer, el estado se guarda por job tras cada paso)
+        return workflow.compile(checkpointer=checkpointer)
     
-    def evaluar(self, ensayo: str, anexo_ia: str = None) -> EvaluacionEnsayo:
+    async def _evaluar_fusionado(self, ensayo: str, anexo_ia: str, texto_hash: str,
+                                 config: Optional[RunnableConfig] = None) -> EvaluacionEnsayo:
+        """
+        Evalúa los 6 criterios y el comentario general en una sola llamada.
+        
+        `texto_hash` es el hash del texto original: la caché no depende de si
+        `ensayo` y `anexo_ia` llegan condensados.
         """
-        Evalúa un ensayo completo.
+        print("Evaluando: 6 criterios y comentario general en una sola llamada...")
+        
+        clave = (texto_hash, "fusionado",
+                 hash_prompt(PROMPT_EVALUACION_FUSIONADA), self._modelo_cache("fusionado"),
+                 self.ruta("fusionado").temperatura)
+        
+        resultado = await self.cache.aobtener(*clave) if self.cache is not None else None
+        if resultado is not None:
+            print("   fusionado: resultado tomado de la caché")
+            evaluacion, uso = EvaluacionEnsayo(**resultado), dict(USO_SIN_LLAMADA)
+        else:
+            inicio = time.perf_counter()
+            evaluacion, uso = separar_salida_estructurada(await self._invocar_nodo(
+                "fusionado",
+                self._cadena_fusionada,
+                {"ensayo": ensayo, "anexo_ia": anexo_ia},
+                config=config
+            ))
+            uso["latencia_ms"] = round((time.perf_counter() - inicio) * 1000)
+            uso["modelo"] = self.ruta("fusionado").modelo
+            if self.cache is not None:
+                await self.cache.aguardar(*clave, evaluacion.model_dump(exclude={"puntuacion_total"}))
+        
+        # La puntuación total nunca se toma del modelo
+        evaluacion.calcular_puntuacion_total()
+        evaluacion.registrar_uso_tokens({"fusionado": uso})
+        
+        return evaluacion
+    
+    async def aevaluar(self, ensayo: str, anexo_ia: str = None, modo: Optional[str] = None,
+                       config: Optional[RunnableConfig] = None,
+                       al_progresar: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                       contexto_sintesis: Optional[str] = None,
+                       job_id: Optional[str] = None) -> EvaluacionEnsayo:
+        """
+        Evalúa un ensayo completo de forma asíncrona.
+        
+        Todos los nodos usan ainvoke, por lo que un mismo event loop puede
+        mantener en vuelo las llamadas de muchos ensayos a la vez.
         
         Args:
             ensayo: Texto del ensayo a evaluar
             anexo_ia: Texto del anexo de IA (opcional)
+            modo: "preciso" o "fusionado" (por defecto, el modo del evaluador)
+            config: Configuración de LangChain para la ejecución (callbacks, tags, etc.)
+            al_progresar: Callback (nombre, resultado) que se llama en cuanto termina
+                cada criterio ({"calificacion", "comentario"}) y, al final, con
+                "comentario_general" ({"comentario"})
+            contexto_sintesis: Contexto del comentario general en modo "preciso"
+                (por defecto, el del evaluador)
+            job_id: Identificador del job para los checkpoints (modo "preciso" y
+                evaluador con checkpointer). Si un intento anterior con el mismo
+                job_id falló, se reanuda desde los criterios ya completados
             
         Returns:
-            Objeto EvaluacionEnsayo con todos los criterios evaluados
+            EvaluacionEnsayo con todos los criterios evaluados (EvaluacionRubrica
+            si el evaluador usa una rúbrica distinta de la oficial)
         """
+        modo = modo or self.modo
+        if modo not in MODOS_EVALUACION:
+            raise ValueError(f"Modo no válido: {modo}. Usa 'preciso' o 'fusionado'")
+        contexto_sintesis = contexto_sintesis or self.contexto_sintesis
+        if contexto_sintesis not in MODOS_CONTEXTO_SINTESIS:
+            raise ValueError(f"Contexto de síntesis no válido: {contexto_sintesis}. "
+                             f"Usa {', '.join(MODOS_CONTEXTO_SINTESIS)}")
+        
         print("\n" + "="*60)
-        print("INICIANDO EVALUACION DE ENSAYO")
+        print(f"INICIANDO EVALUACION DE ENSAYO (modo {modo})")
         if anexo_ia:
             print("Anexo de IA detectado y sera incluido en la evaluacion")
         print("="*60 + "\n")
         
-        # Estado inicial con todos los campos requeridos
-        estado_inicial = {
-            "ensayo": ensayo,
-            "anexo_ia": anexo_ia if anexo_ia else "[NO SE PROPORCIONÓ ANEXO DE IA]",
-            "paso_actual": "inicio",
-            "evaluacion": None,
-            "calidad_tecnica": None,
-            "creatividad": None,
-            "vinculacion_tematica": None,
-            "bienestar_colectivo": None,
-            "uso_responsable_ia": None,
-            "potencial_impacto": None
-        }
+        anexo_ia = anexo_ia if anexo_ia else "[NO SE PROPORCIONÓ ANEXO DE IA]"
         
-        # Ejecutar el grafo
-        resultado = self.graph.invoke(estado_inicial)
+        if modo == "fusionado" and not self.rubrica_oficial:
+            raise ValueError("El modo fusionado solo admite la rúbrica oficial")
+        
+        # La caché de criterios usa el texto original; los nodos reciben el
+        # texto condensado si el original no cabe en el presupuesto
+        texto_hash = calcular_hash(ensayo, anexo_ia)
+        ensayo, anexo_ia, uso_condensacion = await self._ajustar_al_presupuesto(ensayo, anexo_ia)
+        
+        if modo == "fusionado":
+            evaluacion = await self._evaluar_fusionado(ensayo, anexo_ia, texto_hash, config=config)
+            
+            # En una sola llamada todos los criterios terminan a la vez
+            if al_progresar:
+                for criterio in CRITERIOS:
+                    al_progresar(criterio, getattr(evaluacion, criterio).model_dump())
+                al_progresar("comentario_general", {"comentario": evaluacion.comentario_general})
+        else:
+            # Estado inicial con todos los campos requeridos
+            estado_inicial = {
+                "ensayo": ensayo,
+                "anexo_ia": anexo_ia,
+                "texto_hash": texto_hash,
+                "contexto_sintesis": contexto_sintesis,
+                "paso_actual": "inicio",
+                "evaluacion": None,
+                "criterios": None,
+                "uso_tokens": None
+            }
+            
+            grafo, entrada = self.graph, estado_inicial
+            reportados = set()
+            if job_id and self._grafo_checkpoints is not None:
+                grafo = self._grafo_checkpoints
+                config = {
+                    **(config or {}),
+                    "configurable": {**((config or {}).get("configurable") or {}), "thread_id": job_id}
+                }
+                previo = await grafo.aget_state(config)
+                if previo.next:
+                    # Un intento anterior quedó a medias: sin entrada, el grafo
+                    # continúa desde el checkpoint y solo ejecuta los nodos pendientes
+                    print(f"Reanudando job {job_id} desde su checkpoint (pendientes: {', '.join(previo.next)})")
+                    entrada = None
+                    # Los criterios ya completados no vuelven a ejecutarse: se
+                    # notifican aquí en lugar de esperar a que el grafo los repita
+                    for clave, resultado in (previo.values.get("criterios") or {}).items():
+                        reportados.add(clave)
+                        if al_progresar:
+                            al_progresar(clave, resultado)
+                elif previo.values:
+                    # Un hilo terminado que no se borró: empezar de cero en lugar
+                    # de mezclar la nueva entrada con sus criterios
+                    await self.checkpointer.adelete_thread(job_id)
+            
+            # Ejecutar el grafo recibiendo la actualización de cada nodo al terminar
+            evaluacion = None
+            async for actualizaciones in grafo.astream(
+                entrada, config=config, stream_mode="updates"
+            ):
+                for actualizacion in actualizaciones.values():
+                    if not actualizacion:
+                        continue
+                    
+                    for clave, resultado in (actualizacion.get("criterios") or {}).items():
+                        if clave in reportados:
+                            continue
+                        reportados.add(clave)
+                        if al_progresar:
+                            al_progresar(clave, resultado)
+                    
+                    if actualizacion.get("evaluacion") is not None:
+                        evaluacion = actualizacion["evaluacion"]
+                        if al_progresar:
+                            al_progresar("comentario_general", {"comentario": evaluacion.comentario_general})
+            
+            if grafo is self._grafo_checkpoints:
+                # Evaluación completa: el checkpoint del job ya no hace falta
+                await self.checkpointer.adelete_thread(job_id)
+        
+        if uso_condensacion is not None:
+            evaluacion.registrar_uso_tokens({"condensacion": uso_condensacion})
+        
+        uso = evaluacion.resumen_uso_tokens()
+        porcentaje_cache = (
+            100 * uso["tokens_cacheados"] / uso["tokens_entrada"] if uso["tokens_entrada"] else 0
+        )
         
         print("\n" + "="*60)
         print("EVALUACIÓN COMPLETADA")
+        print(f"Tokens: {uso['tokens_entrada']} entrada ({uso['tokens_cacheados']} cacheados, "
+              f"{porcentaje_cache:.0f}%), {uso['tokens_salida']} salida")
         print("="*60 + "\n")
         
-        return resultado["evaluacion"]
+        return evaluacion
+    
+    def evaluar(self, ensayo: str, anexo_ia: str = None, modo: Optional[str] = None,
+                config: Optional[RunnableConfig] = None,
+                al_progresar: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                contexto_sintesis: Optional[str] = None,
+                job_id: Optional[str] = None) -> EvaluacionEnsayo:
+        """
+        Evalúa un ensayo completo (envoltorio síncrono de aevaluar).
+        
+        La corrutina se ejecuta en el event loop compartido de fondo, de modo
+        que los hilos que llaman a este método solo esperan el resultado.
+        
+        Args:
+            ensayo: Texto del ensayo a evaluar
+            anexo_ia: Texto del anexo de IA (opcional)
+            modo: "preciso" o "fusionado" (por defecto, el modo del evaluador)
+            config: Configuración de LangChain para la ejecución (callbacks, tags, etc.)
+            al_progresar: Callback (nombre, resultado) por cada criterio terminado;
+                se llama desde el hilo del event loop de fondo
+            contexto_sintesis: "completo", "extracto" o "ninguno" (por defecto, el del evaluador)
+            job_id: Identificador del job para reanudar desde su checkpoint
+            
+        Returns:
+            Objeto EvaluacionEnsayo con todos los criterios evaluados
+        """
+        return ejecutar_sincrono(self.aevaluar(
+            ensayo, anexo_ia=anexo_ia, modo=modo, config=config,
+            al_progresar=al_progresar, contexto_sintesis=contexto_sintesis, job_id=job_id
+        ))
+    
+    def descartar_checkpoint(self, job_id: str):
+        """Elimina el checkpoint de un job que no se va a reanudar."""
+        if self.checkpointer is not None:
+            ejecutar_sincrono(self.checkpointer.adelete_thread(job_id))
+    
+    async def aevaluar_lote(
+        self,
+        ensayos: List[Union[str, Dict[str, Optional[str]]]],
+        concurrencia: int = 10,
+        modo: Optional[str] = None,
+        al_completar: Optional[Callable[[int, Any], None]] = None
+    ) -> List[Union[EvaluacionEnsayo, Exception]]:
+        """
+        Evalúa un lote de ensayos con concurrencia acotada.
+        
+        Con un limitador configurado, todas las llamadas del lote comparten el
+        mismo presupuesto de RPM/TPM, de modo que el lote avanza al ritmo máximo
+        que permite el proveedor.
+        
+        Args:
+            ensayos: Lista de textos o de dicts {"ensayo": ..., "anexo_ia": ...,
+                "job_id": ...}; con job_id, cada ensayo se reanuda desde su checkpoint
+            concurrencia: Número máximo de ensayos evaluándose a la vez
+            modo: "preciso" o "fusionado" (por defecto, el modo del evaluador)
+            al_completar: Callback (indice, resultado) al terminar cada ensayo
+            
+        Returns:
+            Lista en el mismo orden que `ensayos` con la EvaluacionEnsayo de cada
+            uno, o la excepción que impidió evaluarlo
+        """
+        semaforo = asyncio.Semaphore(concurrencia)
+        
+        async def evaluar_uno(indice: int, item: Union[str, Dict[str, Optional[str]]]):
+            if isinstance(item, str):
+                ensayo, anexo_ia, job_id = item, None, None
+            else:
+                ensayo, anexo_ia, job_id = item["ensayo"], item.get("anexo_ia"), item.get("job_id")
+            
+            async with semaforo:
+                try:
+                    resultado = await self.aevaluar(ensayo, anexo_ia=anexo_ia, modo=modo, job_id=job_id)
+                except Exception as e:
+                    resultado = e
+            
+            if al_completar:
+                al_completar(indice, resultado)
+            return resultado
+        
+        return await asyncio.gather(*(evaluar_uno(i, item) for i, item in enumerate(ensayos)))
+    
+    def evaluar_lote(
+        self,
+        ensayos: List[Union[str, Dict[str, Optional[str]]]],
+        concurrencia: int = 10,
+        modo: Optional[str] = None,
+        al_completar: Optional[Callable[[int, Any], None]] = None
+    ) -> List[Union[EvaluacionEnsayo, Exception]]:
+        """Evalúa un lote de ensayos (envoltorio síncrono de aevaluar_lote)."""
+        return ejecutar_sincrono(self.aevaluar_lote(
+            ensayos, concurrencia=concurrencia, modo=modo, al_completar=al_completar
+        ))
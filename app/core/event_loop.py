@@ -0,0 +1,58 @@
+"""
+Event loop compartido para ejecutar corrutinas desde código síncrono.
+
+Las rutas Flask y los workers del ThreadPoolExecutor son síncronos. En lugar
+de crear un event loop por llamada (asyncio.run), todas las corrutinas se
+envían a un único loop que vive en un hilo de fondo. Así los clientes HTTP
+asíncronos quedan ligados siempre al mismo loop y un solo hilo mantiene en
+vuelo las llamadas al LLM de todos los ensayos en proceso.
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_bucle: Optional[asyncio.AbstractEventLoop] = None
+_bucle_lock = threading.Lock()
+
+
+def obtener_bucle() -> asyncio.AbstractEventLoop:
+    """Devuelve el event loop de fondo, creándolo la primera vez."""
+    global _bucle
+
+    with _bucle_lock:
+        if _bucle is None or _bucle.is_closed():
+            _bucle = asyncio.new_event_loop()
+            hilo = threading.Thread(
+                target=_bucle.run_forever,
+                name="event-loop-llm",
+                daemon=True
+            )
+            hilo.start()
+
+    return _bucle
+
+
+def ejecutar_sincrono(corrutina: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Ejecuta una corrutina en el event loop de fondo y espera su resultado.
+
+    Args:
+        corrutina: Corrutina a ejecutar
+
+    Returns:
+        El valor devuelto por la corrutina (o relanza su excepción)
+    """
+    bucle = obtener_bucle()
+
+    try:
+        en_bucle = asyncio.get_running_loop() is bucle
+    except RuntimeError:
+        en_bucle = False
+
+    if en_bucle:
+        corrutina.close()
+        raise RuntimeError(
+            "No se puede esperar de forma síncrona dentro del event loop de fondo; usa la versión async"
+        )
+
+    return asyncio.run_coroutine_threadsafe(corrutina, bucle).result()
@@ -0,0 +1,119 @@
+"""
+Extracto local del ensayo para el paso de síntesis.
+
+El comentario general resume sobre todo las evaluaciones de los criterios,
+así que no necesita el ensayo completo: basta con los párrafos iniciales y
+las frases que los comentarios de los criterios citan textualmente. El
+extracto se calcula sin llamar al LLM.
+"""
+import re
+from typing import List
+
+from app.core.rate_limiter import CARACTERES_POR_TOKEN, estimar_tokens
+
+# Fragmentos entre comillas tipográficas, angulares o rectas
+_PATRON_CITA = re.compile(r'“([^”]{8,})”|«([^»]{8,})»|"([^"]{8,})"')
+_PATRON_ORACION = re.compile(r'(?<=[.!?…])\s+')
+
+SEPARADOR_EXTRACTO = "\n[...]\n"
+
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas y espacios colapsados, para comparar citas con el ensayo."""
+    return re.sub(r'\s+', ' ', texto).strip().lower()
+
+
+def dividir_parrafos(texto: str) -> List[str]:
+    """Divide un texto en párrafos no vacíos."""
+    return [p.strip() for p in re.split(r'\n\s*\n', texto) if p.strip()]
+
+
+def dividir_oraciones(texto: str) -> List[str]:
+    """Divide un texto en oraciones (aproximado, por puntuación final)."""
+    return [o.strip() for o in _PATRON_ORACION.split(texto) if o.strip()]
+
+
+def extraer_citas(comentarios: List[str]) -> List[str]:
+    """Devuelve los fragmentos citados entre comillas en los comentarios."""
+    citas = []
+    for comentario in comentarios:
+        for coincidencia in _PATRON_CITA.finditer(comentario or ""):
+            cita = next(grupo for grupo in coincidencia.groups() if grupo)
+            citas.append(cita.strip(' .,;:…'))
+    return citas
+
+
+def construir_extracto(ensayo: str, comentarios: List[str], parrafos_iniciales: int = 2,
+                       max_caracteres: int = 4000) -> str:
+    """
+    Construye un extracto del ensayo con los párrafos iniciales y las
+    oraciones que contienen alguna de las citas de los comentarios.
+
+    Args:
+        ensayo: Texto completo del ensayo
+        comentarios: Comentarios de los criterios ya evaluados
+        parrafos_iniciales: Número de párrafos iniciales a incluir
+        max_caracteres: Longitud máxima aproximada del extracto
+
+    Returns:
+        Extracto con los fragmentos en el orden en que aparecen en el ensayo
+    """
+    parrafos = dividir_parrafos(ensayo)
+    inicio = parrafos[:parrafos_iniciales]
+
+    citas = [_normalizar(cita) for cita in extraer_citas(comentarios)]
+    citadas = []
+    if citas:
+        for parrafo in parrafos[parrafos_iniciales:]:
+            for oracion in dividir_oraciones(parrafo):
+                normalizada = _normalizar(oracion)
+                if any(cita in normalizada for cita in citas) and oracion not in citadas:
+                    citadas.append(oracion)
+
+    fragmentos = []
+    longitud = 0
+    for fragmento in inicio + citadas:
+        if fragmentos and longitud + len(fragmento) > max_caracteres:
+            break
+        fragmentos.append(fragmento)
+        longitud += len(fragmento)
+
+    # Los párrafos iniciales van seguidos; las oraciones citadas, separadas
+    extracto = "\n\n".join(fragmentos[:len(inicio)])
+    if len(fragmentos) > len(inicio):
+        extracto += SEPARADOR_EXTRACTO + SEPARADOR_EXTRACTO.join(fragmentos[len(inicio):])
+    return extracto
+
+
+def dividir_en_fragmentos(texto: str, max_tokens: int) -> List[str]:
+    """
+    Divide un texto en fragmentos de a lo sumo `max_tokens` tokens estimados,
+    cortando en límites de párrafo (o de oración, si un párrafo no cabe).
+
+    Returns:
+        Fragmentos en el orden del texto
+    """
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+
+    # Unidades que caben en un fragmento: párrafos, o sus oraciones si el
+    # párrafo es demasiado largo (o trozos de la oración, en último caso)
+    unidades = []
+    for parrafo in dividir_parrafos(texto):
+        if estimar_tokens(parrafo) <= max_tokens:
+            unidades.append(parrafo)
+            continue
+        for oracion in dividir_oraciones(parrafo):
+            unidades.extend(
+                oracion[i:i + max_caracteres] for i in range(0, len(oracion), max_caracteres)
+            )
+
+    fragmentos = []
+    actual = []
+    for unidad in unidades:
+        if actual and estimar_tokens("\n\n".join(actual + [unidad])) > max_tokens:
+            fragmentos.append("\n\n".join(actual))
+            actual = []
+        actual.append(unidad)
+    if actual:
+        fragmentos.append("\n\n".join(actual))
+    return fragmentos
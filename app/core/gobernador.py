@@ -0,0 +1,236 @@
+"""
+Gobernador global de concurrencia de las llamadas al LLM.
+
+Todas las solicitudes al proveedor del proceso (evaluador, limpieza de PDFs,
+comparación y chat, síncronas o asíncronas) piden un turno antes de salir.
+El gobernador limita las solicitudes en vuelo en total y por carril, y
+cuando hay cola reparte los turnos libres entre carriles por round-robin
+ponderado, para que una carga masiva no deje sin turno al chat:
+
+- "interactivo": chat y comparación, con un usuario esperando la respuesta
+- "carga": ensayos subidos por la API (limpieza del PDF y evaluación)
+- "lote": cargas masivas y reprocesamientos desde scripts
+
+El carril de una llamada se toma de una ContextVar: el código que inicia una
+operación la fija con usar_carril() y la heredan las tareas asyncio que crea.
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from app.config import Config
+
+CARRILES = ("interactivo", "carga", "lote")
+
+_carril_actual: ContextVar[str] = ContextVar("carril_llm", default="carga")
+
+
+def carril_actual() -> str:
+    """Carril de las llamadas al LLM del contexto actual."""
+    return _carril_actual.get()
+
+
+@contextmanager
+def usar_carril(carril: str):
+    """Asigna `carril` a las llamadas al LLM hechas dentro del bloque."""
+    if carril not in CARRILES:
+        raise ValueError(f"Carril no válido: {carril}. Usa {', '.join(CARRILES)}")
+    token = _carril_actual.set(carril)
+    try:
+        yield
+    finally:
+        _carril_actual.reset(token)
+
+
+class _Espera:
+    """Solicitud en cola: se despierta con un Event (hilos) o un Future (asyncio)."""
+
+    __slots__ = ("carril", "concedida", "evento", "futuro", "bucle", "encolada")
+
+    def __init__(self, carril: str, bucle: Optional[asyncio.AbstractEventLoop] = None):
+        self.carril = carril
+        self.concedida = False
+        self.encolada = time.monotonic()
+        self.bucle = bucle
+        self.evento = None if bucle else threading.Event()
+        self.futuro = bucle.create_future() if bucle else None
+
+
+class GobernadorLLM:
+    """Semáforo global con carriles, límites por carril y cola ponderada."""
+
+    def __init__(self, limite_total: int, limites: Dict[str, int], pesos: Dict[str, int]):
+        """
+        Inicializa el gobernador.
+
+        Args:
+            limite_total: Solicitudes al proveedor en vuelo como máximo en el proceso
+            limites: Máximo en vuelo por carril
+            pesos: Peso de cada carril al repartir turnos cuando hay cola
+        """
+        if limite_total <= 0:
+            raise ValueError("limite_total debe ser mayor que 0")
+
+        self.limite_total = limite_total
+        self.limites = {carril: max(1, limites.get(carril, limite_total)) for carril in CARRILES}
+        self.pesos = {carril: max(1, pesos.get(carril, 1)) for carril in CARRILES}
+
+        self._lock = threading.Lock()
+        self._colas = {carril: deque() for carril in CARRILES}
+        self._en_vuelo = {carril: 0 for carril in CARRILES}
+        self._credito = {carril: 0 for carril in CARRILES}
+
+        # Estadísticas por carril
+        self._turnos = {carril: 0 for carril in CARRILES}
+        self._espera_total = {carril: 0.0 for carril in CARRILES}
+        self._espera_maxima = {carril: 0.0 for carril in CARRILES}
+
+    def _despachar(self):
+        """Concede turnos libres a las solicitudes en cola (con el lock tomado)."""
+        while sum(self._en_vuelo.values()) < self.limite_total:
+            elegibles = [
+                carril for carril in CARRILES
+                if self._colas[carril] and self._en_vuelo[carril] < self.limites[carril]
+            ]
+            if not elegibles:
+                return
+
+            # Round-robin ponderado suave: cada carril con cola acumula su peso
+            # y el de más crédito toma el turno
+            for carril in elegibles:
+                self._credito[carril] += self.pesos[carril]
+            elegido = max(elegibles, key=lambda carril: self._credito[carril])
+            self._credito[elegido] -= sum(self.pesos[carril] for carril in elegibles)
+
+            espera = self._colas[elegido].popleft()
+            espera.concedida = True
+            self._en_vuelo[elegido] += 1
+
+            segundos = time.monotonic() - espera.encolada
+            self._turnos[elegido] += 1
+            self._espera_total[elegido] += segundos
+            self._espera_maxima[elegido] = max(self._espera_maxima[elegido], segundos)
+
+            if espera.evento is not None:
+                espera.evento.set()
+            else:
+                espera.bucle.call_soon_threadsafe(_resolver, espera.futuro)
+
+    def _encolar(self, carril: str, bucle: Optional[asyncio.AbstractEventLoop] = None) -> _Espera:
+        if carril not in CARRILES:
+            raise ValueError(f"Carril no válido: {carril}. Usa {', '.join(CARRILES)}")
+        espera = _Espera(carril, bucle)
+        with self._lock:
+            self._colas[carril].append(espera)
+            self._despachar()
+        return espera
+
+    def adquirir(self, carril: Optional[str] = None):
+        """Bloquea el hilo hasta obtener un turno en el carril (por defecto, el del contexto)."""
+        espera = self._encolar(carril or carril_actual())
+        espera.evento.wait()
+
+    async def aadquirir(self, carril: Optional[str] = None):
+        """Espera un turno en el carril sin bloquear el event loop."""
+        espera = self._encolar(carril or carril_actual(), asyncio.get_running_loop())
+        if espera.concedida:
+            return
+
+        try:
+            await espera.futuro
+        except asyncio.CancelledError:
+            # Cancelada en cola (p. ej. una solicitud de respaldo que ya no hace
+            # falta): se retira, o se devuelve el turno si llegó a concederse
+            with self._lock:
+                if espera.concedida:
+                    self._liberar(espera.carril)
+                else:
+                    self._colas[espera.carril].remove(espera)
+            raise
+
+    def _liberar(self, carril: str):
+        self._en_vuelo[carril] -= 1
+        self._despachar()
+
+    def liberar(self, carril: str):
+        """Devuelve el turno de una solicitud terminada."""
+        with self._lock:
+            self._liberar(carril)
+
+    @contextmanager
+    def turno(self, carril: Optional[str] = None):
+        """Ocupa un turno durante el bloque (código síncrono)."""
+        carril = carril or carril_actual()
+        self.adquirir(carril)
+        try:
+            yield
+        finally:
+            self.liberar(carril)
+
+    @asynccontextmanager
+    async def aturno(self, carril: Optional[str] = None):
+        """Ocupa un turno durante el bloque (código asíncrono)."""
+        carril = carril or carril_actual()
+        await self.aadquirir(carril)
+        try:
+            yield
+        finally:
+            self.liberar(carril)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Solicitudes en vuelo, en cola y espera media/máxima por carril."""
+        with self._lock:
+            return {
+                'limite_total': self.limite_total,
+                'en_vuelo': sum(self._en_vuelo.values()),
+                'carriles': {
+                    carril: {
+                        'limite': self.limites[carril],
+                        'peso': self.pesos[carril],
+                        'en_vuelo': self._en_vuelo[carril],
+                        'en_cola': len(self._colas[carril]),
+                        'turnos': self._turnos[carril],
+                        'espera_media_ms': round(
+                            1000 * self._espera_total[carril] / self._turnos[carril]
+                        ) if self._turnos[carril] else None,
+                        'espera_maxima_ms': round(1000 * self._espera_maxima[carril])
+                    }
+                    for carril in CARRILES
+                }
+            }
+
+
+def _resolver(futuro: asyncio.Future):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+_gobernador: Optional[GobernadorLLM] = None
+_gobernador_lock = threading.Lock()
+
+
+def obtener_gobernador() -> GobernadorLLM:
+    """Devuelve el gobernador del proceso, creándolo la primera vez con los límites de Config."""
+    global _gobernador
+
+    with _gobernador_lock:
+        if _gobernador is None:
+            _gobernador = GobernadorLLM(
+                limite_total=Config.LLM_CONCURRENCIA_MAX,
+                limites={
+                    'interactivo': Config.LLM_CONCURRENCIA_INTERACTIVO,
+                    'carga': Config.LLM_CONCURRENCIA_CARGA,
+                    'lote': Config.LLM_CONCURRENCIA_LOTE
+                },
+                pesos={
+                    'interactivo': Config.LLM_PESO_INTERACTIVO,
+                    'carga': Config.LLM_PESO_CARGA,
+                    'lote': Config.LLM_PESO_LOTE
+                }
+            )
+
+    return _gobernador
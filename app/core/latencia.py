@@ -0,0 +1,101 @@
+"""
+Histogramas de latencia por nodo del evaluador.
+
+Cada nodo (criterio, síntesis o llamada fusionada) guarda sus latencias
+recientes en una ventana deslizante. El evaluador usa sus percentiles para
+decidir cuándo enviar una solicitud de respaldo (hedging) a un nodo que
+tarda más de lo habitual.
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class HistogramaLatencia:
+    """Ventana deslizante de latencias (en segundos) de un nodo."""
+
+    def __init__(self, tamano_ventana: int = 200):
+        self._muestras = deque(maxlen=tamano_ventana)
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos: float):
+        """Agrega una latencia observada."""
+        with self._lock:
+            self._muestras.append(segundos)
+
+    def __len__(self) -> int:
+        return len(self._muestras)
+
+    def percentil(self, p: float) -> Optional[float]:
+        """
+        Calcula el percentil p (0-1) de las latencias de la ventana.
+
+        Returns:
+            Latencia en segundos, o None si aún no hay muestras
+        """
+        with self._lock:
+            ordenadas = sorted(self._muestras)
+
+        if not ordenadas:
+            return None
+
+        indice = min(len(ordenadas) - 1, max(0, math.ceil(p * len(ordenadas)) - 1))
+        return ordenadas[indice]
+
+    def resumen(self) -> Dict[str, Optional[float]]:
+        """Número de muestras y percentiles 50, 95 y 99 (en milisegundos)."""
+        def en_ms(valor):
+            return round(valor * 1000) if valor is not None else None
+
+        return {
+            'muestras': len(self),
+            'p50_ms': en_ms(self.percentil(0.50)),
+            'p95_ms': en_ms(self.percentil(0.95)),
+            'p99_ms': en_ms(self.percentil(0.99))
+        }
+
+
+class RegistroLatencias:
+    """Histogramas de latencia de todos los nodos de un evaluador."""
+
+    def __init__(self, tamano_ventana: int = 200, muestras_minimas: int = 20):
+        """
+        Args:
+            tamano_ventana: Latencias recientes que se conservan por nodo
+            muestras_minimas: Muestras necesarias antes de estimar umbrales
+        """
+        self.tamano_ventana = tamano_ventana
+        self.muestras_minimas = muestras_minimas
+        self._histogramas: Dict[str, HistogramaLatencia] = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nodo: str) -> HistogramaLatencia:
+        """Devuelve el histograma del nodo, creándolo si no existe."""
+        with self._lock:
+            if nodo not in self._histogramas:
+                self._histogramas[nodo] = HistogramaLatencia(self.tamano_ventana)
+            return self._histogramas[nodo]
+
+    def registrar(self, nodo: str, segundos: float):
+        """Registra una latencia observada para el nodo."""
+        self.histograma(nodo).registrar(segundos)
+
+    def umbral(self, nodo: str, percentil: float) -> Optional[float]:
+        """
+        Latencia a partir de la cual conviene enviar una solicitud de respaldo.
+
+        Returns:
+            El percentil indicado de la latencia reciente del nodo, o None si
+            todavía no hay suficientes muestras para estimarlo
+        """
+        histograma = self.histograma(nodo)
+        if len(histograma) < self.muestras_minimas:
+            return None
+        return histograma.percentil(percentil)
+
+    def resumen(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Resumen de percentiles de todos los nodos."""
+        with self._lock:
+            histogramas = dict(self._histogramas)
+        return {nodo: histograma.resumen() for nodo, histograma in histogramas.items()}
@@ -0,0 +1,127 @@
+"""
+Fábrica de modelos de chat.
+
+Todos los componentes que llaman al LLM (evaluador, limpieza de PDFs,
+comparación y chat) crean su modelo aquí. LLM_BACKEND elige el backend:
+"openai" (por defecto) o "simulado", que responde localmente sin red ni
+costo para pruebas de carga (ver app/core/llm_simulado.py).
+
+Los modelos de OpenAI comparten un único pool de conexiones HTTP keep-alive
+(uno síncrono y uno asíncrono), así que las ráfagas de llamadas reutilizan
+conexiones ya abiertas en lugar de pagar TCP + TLS por cliente. Cada
+solicitud HTTP pide antes un turno al gobernador de concurrencia
+(app/core/gobernador.py), incluidos los reintentos del cliente.
+"""
+import os
+import inspect
+import importlib
+import threading
+from typing import Any, Optional, Tuple
+
+import openai
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+from app.config import Config
+from app.core.gobernador import obtener_gobernador
+from app.core.llm_simulado import ChatSimulado
+
+BACKENDS_LLM = ("openai", "simulado")
+
+# Biblioteca HTTP del SDK de OpenAI (httpx o, en versiones recientes, httpx2):
+# los transportes y límites deben ser de la misma biblioteca que sus clientes
+httpx = importlib.import_module(inspect.getmro(openai.DefaultHttpxClient)[1].__module__.partition(".")[0])
+
+_clientes_http: Optional[Tuple[Any, Any]] = None
+_clientes_http_lock = threading.Lock()
+
+
+class TransporteGobernado(httpx.HTTPTransport):
+    """Transporte síncrono que ocupa un turno del gobernador por solicitud."""
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # Sin streaming, la respuesta llega completa: el turno se libera al recibirla
+        with obtener_gobernador().turno():
+            return super().handle_request(request)
+
+
+class TransporteGobernadoAsync(httpx.AsyncHTTPTransport):
+    """Transporte asíncrono que ocupa un turno del gobernador por solicitud."""
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async with obtener_gobernador().aturno():
+            return await super().handle_async_request(request)
+
+
+def obtener_clientes_http() -> Tuple[Any, Any]:
+    """
+    Devuelve los clientes HTTP compartidos (síncrono y asíncrono), creándolos
+    la primera vez con los límites de Config.
+    
+    El cliente asíncrono solo se usa desde el event loop compartido
+    (app/core/event_loop.py), al que quedan ligadas sus conexiones.
+    """
+    global _clientes_http
+    
+    with _clientes_http_lock:
+        if _clientes_http is None:
+            limites = httpx.Limits(
+                max_connections=Config.LLM_HTTP_MAX_CONEXIONES,
+                max_keepalive_connections=Config.LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=Config.LLM_HTTP_KEEPALIVE_SEGUNDOS
+            )
+            timeout = httpx.Timeout(Config.LLM_HTTP_TIMEOUT, connect=10.0)
+            _clientes_http = (
+                openai.DefaultHttpxClient(transport=TransporteGobernado(limits=limites), timeout=timeout),
+                openai.DefaultAsyncHttpxClient(transport=TransporteGobernadoAsync(limits=limites), timeout=timeout)
+            )
+    
+    return _clientes_http
+
+
+def crear_llm(model: str, temperature: float, max_retries: int = 2,
+              eco_simulado: bool = False, backend: Optional[str] = None,
+              max_tokens: Optional[int] = None) -> BaseChatModel:
+    """
+    Crea un modelo de chat con el backend configurado.
+    
+    Args:
+        model: Nombre del modelo de OpenAI
+        temperature: Temperatura para la generación
+        max_retries: Reintentos del cliente ante errores transitorios
+        eco_simulado: Solo backend simulado: responder con el último mensaje
+            (para tareas cuya salida tiene el tamaño de la entrada, como la limpieza)
+        backend: "openai" o "simulado" (por defecto, Config.LLM_BACKEND)
+        max_tokens: Tokens de salida máximos por respuesta (opcional)
+    
+    Returns:
+        Modelo de chat de LangChain
+    """
+    backend = backend or Config.LLM_BACKEND
+    
+    if backend == "simulado":
+        return ChatSimulado(
+            modelo=model,
+            latencia_ms=Config.LLM_SIMULADO_LATENCIA_MS,
+            dispersion=Config.LLM_SIMULADO_DISPERSION,
+            tasa_error=Config.LLM_SIMULADO_TASA_ERROR,
+            tasa_429=Config.LLM_SIMULADO_TASA_429,
+            tokens_salida=min(Config.LLM_SIMULADO_TOKENS_SALIDA, max_tokens or Config.LLM_SIMULADO_TOKENS_SALIDA),
+            ms_por_token_salida=Config.LLM_SIMULADO_MS_POR_TOKEN_SALIDA,
+            eco=eco_simulado,
+            max_retries=max_retries
+        )
+    
+    if backend != "openai":
+        raise ValueError(f"Backend de LLM no válido: {backend}. Usa {', '.join(BACKENDS_LLM)}")
+    
+    cliente_http, cliente_http_async = obtener_clientes_http()
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_retries=max_retries,
+        max_tokens=max_tokens,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=cliente_http,
+        http_async_client=cliente_http_async
+    )
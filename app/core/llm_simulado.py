@@ -0,0 +1,215 @@
+"""
+Backend de LLM simulado para pruebas de carga sin red.
+
+ChatSimulado es un chat model de LangChain que no llama a ningún proveedor:
+espera una latencia aleatoria (log-normal), falla con la tasa de errores
+configurada y devuelve texto de relleno o, con structured output, una
+instancia válida del esquema pedido. Reporta usage_metadata como lo hace
+ChatOpenAI, así que el limitador, la contabilidad de tokens y los
+benchmarks funcionan igual que con el modelo real. Cada intento ocupa un
+turno del gobernador de concurrencia, como una solicitud HTTP real.
+"""
+import json
+import math
+import time
+import random
+import asyncio
+from typing import Any, Dict, List, Optional, get_args, get_origin
+
+import httpx
+import openai
+from pydantic import BaseModel
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from app.core.gobernador import obtener_gobernador
+from app.core.rate_limiter import estimar_tokens
+
+_FRASE_RELLENO = (
+    "El ensayo presenta ideas relevantes con una estructura clara y argumentos "
+    "que podrían fortalecerse con más evidencia y ejemplos concretos. "
+)
+
+
+def _texto_relleno(tokens: int) -> str:
+    """Genera texto de relleno de aproximadamente `tokens` tokens."""
+    caracteres = max(1, tokens) * 4
+    repeticiones = caracteres // len(_FRASE_RELLENO) + 1
+    return (_FRASE_RELLENO * repeticiones)[:caracteres].strip()
+
+
+def _valor_simulado(anotacion: Any, info_campo: Any = None) -> Any:
+    """Genera un valor válido para una anotación de tipo de pydantic."""
+    origen = get_origin(anotacion)
+
+    # Optional[X] / Union[X, None]: se usa el primer tipo no nulo
+    if origen is not None and type(None) in get_args(anotacion):
+        tipos = [t for t in get_args(anotacion) if t is not type(None)]
+        return _valor_simulado(tipos[0], info_campo)
+
+    if origen in (list, List):
+        return []
+    if origen in (dict, Dict):
+        return {}
+
+    if isinstance(anotacion, type) and issubclass(anotacion, BaseModel):
+        return generar_instancia(anotacion)
+
+    if anotacion is int or anotacion is float:
+        minimo, maximo = 1, 5
+        for restriccion in getattr(info_campo, 'metadata', []):
+            minimo = getattr(restriccion, 'ge', minimo)
+            maximo = getattr(restriccion, 'le', maximo)
+        if anotacion is int:
+            return random.randint(int(minimo), int(maximo))
+        return round(random.uniform(minimo, maximo), 2)
+
+    if anotacion is bool:
+        return random.random() < 0.5
+
+    return _texto_relleno(60)
+
+
+def generar_instancia(esquema: type) -> BaseModel:
+    """
+    Genera una instancia válida de un modelo pydantic con valores simulados.
+
+    Solo se rellenan los campos obligatorios; el resto conserva su valor por defecto.
+    """
+    valores = {
+        nombre: _valor_simulado(campo.annotation, campo)
+        for nombre, campo in esquema.model_fields.items()
+        if campo.is_required()
+    }
+    return esquema(**valores)
+
+
+class ChatSimulado(BaseChatModel):
+    """Chat model local con latencia, errores y tokens configurables."""
+
+    modelo: str = "simulado"
+    latencia_ms: float = 800.0        # Mediana de la latencia
+    dispersion: float = 0.5           # Sigma de la distribución log-normal
+    tasa_error: float = 0.0           # Fracción de llamadas que fallan con 500
+    tasa_429: float = 0.0             # Fracción de llamadas que fallan con 429
+    tokens_salida: int = 250          # Tokens de las respuestas de texto
+    ms_por_token_salida: float = 0.0  # Tiempo de generación por token de salida (se suma a la latencia)
+    eco: bool = False                 # Responder con el último mensaje (p. ej. limpieza de texto)
+    max_retries: int = 2              # Reintentos ante errores simulados, como el cliente real
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulado"
+
+    def _latencia(self) -> float:
+        """Latencia aleatoria en segundos."""
+        if self.latencia_ms <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.latencia_ms / 1000), self.dispersion)
+
+    def _espera_reintento(self, intento: int) -> float:
+        """Backoff exponencial entre reintentos (similar al del cliente de OpenAI)."""
+        return min(8.0, 0.5 * 2 ** intento)
+
+    def _generacion(self, contenido: str) -> float:
+        """Segundos de generación de una respuesta, proporcionales a sus tokens."""
+        return estimar_tokens(contenido) * self.ms_por_token_salida / 1000
+
+    def _simular_llamada(self, generacion: float = 0.0):
+        """Espera la latencia simulada y falla según las tasas, con reintentos."""
+        for intento in range(self.max_retries + 1):
+            try:
+                with obtener_gobernador().turno():
+                    time.sleep(self._latencia() + generacion)
+                    return self._quizas_fallar()
+            except openai.APIStatusError:
+                if intento == self.max_retries:
+                    raise
+            time.sleep(self._espera_reintento(intento))
+
+    async def _asimular_llamada(self, generacion: float = 0.0):
+        """Versión asíncrona de _simular_llamada."""
+        for intento in range(self.max_retries + 1):
+            try:
+                async with obtener_gobernador().aturno():
+                    await asyncio.sleep(self._latencia() + generacion)
+                    return self._quizas_fallar()
+            except openai.APIStatusError:
+                if intento == self.max_retries:
+                    raise
+            await asyncio.sleep(self._espera_reintento(intento))
+
+    def _quizas_fallar(self):
+        """Lanza un error del proveedor con las tasas configuradas."""
+        azar = random.random()
+        if azar < self.tasa_429:
+            codigo, clase = 429, openai.RateLimitError
+        elif azar < self.tasa_429 + self.tasa_error:
+            codigo, clase = 500, openai.InternalServerError
+        else:
+            return
+
+        respuesta = httpx.Response(
+            codigo,
+            headers={"retry-after": "1"} if codigo == 429 else {},
+            request=httpx.Request("POST", "https://simulado.local/v1/chat/completions")
+        )
+        raise clase(f"Error simulado {codigo}", response=respuesta, body=None)
+
+    def _mensaje(self, mensajes: List[BaseMessage], contenido: str) -> AIMessage:
+        """Construye la respuesta con usage_metadata al estilo de ChatOpenAI."""
+        tokens_entrada = estimar_tokens("".join(str(m.content) for m in mensajes))
+        tokens_salida = estimar_tokens(contenido)
+        return AIMessage(
+            content=contenido,
+            response_metadata={"model_name": self.modelo},
+            usage_metadata={
+                "input_tokens": tokens_entrada,
+                "output_tokens": tokens_salida,
+                "total_tokens": tokens_entrada + tokens_salida,
+                "input_token_details": {"cache_read": 0}
+            }
+        )
+
+    def _contenido(self, mensajes: List[BaseMessage]) -> str:
+        if self.eco and mensajes:
+            return str(mensajes[-1].content)
+        return _texto_relleno(self.tokens_salida)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        contenido = self._contenido(messages)
+        self._simular_llamada(self._generacion(contenido))
+        mensaje = self._mensaje(messages, contenido)
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        contenido = self._contenido(messages)
+        await self._asimular_llamada(self._generacion(contenido))
+        mensaje = self._mensaje(messages, contenido)
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
+
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False,
+                               **kwargs: Any) -> Runnable:
+        """Devuelve instancias válidas de `schema` con la misma forma que ChatOpenAI."""
+
+        def empaquetar(mensajes: List[BaseMessage], instancia: BaseModel) -> Any:
+            crudo = self._mensaje(mensajes, json.dumps(instancia.model_dump(), ensure_ascii=False))
+            if include_raw:
+                return {"raw": crudo, "parsed": instancia, "parsing_error": None}
+            return instancia
+
+        def estructurado(entrada: Any) -> Any:
+            mensajes = self._convert_input(entrada).to_messages()
+            self._simular_llamada()
+            return empaquetar(mensajes, generar_instancia(schema))
+
+        async def aestructurado(entrada: Any) -> Any:
+            mensajes = self._convert_input(entrada).to_messages()
+            await self._asimular_llamada()
+            return empaquetar(mensajes, generar_instancia(schema))
+
+        return RunnableLambda(estructurado, afunc=aestructurado)
@@ -1,8 +1,8 @@
 """
 Modelos de datos para el sistema de evaluación de ensayos.
 """
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class FragmentoDestacado(BaseModel):
@@ -22,7 +22,62 @@ class EvaluacionCriterio(BaseModel):
     )
 
 
-class EvaluacionEnsayo(BaseModel):
+class RutaModelo(BaseModel):
+    """Modelo, temperatura y tokens de salida máximos de un nodo del evaluador."""
+    modelo: Optional[str] = Field(None, description="Modelo del nodo (por defecto, el del evaluador)")
+    temperatura: Optional[float] = Field(None, ge=0, le=2, description="Temperatura (por defecto, la del evaluador)")
+    max_tokens: Optional[int] = Field(None, gt=0, description="Tokens de salida máximos (por defecto, sin límite)")
+
+
+class EvaluacionCriterioConConfianza(EvaluacionCriterio):
+    """Evaluación de un criterio con la confianza que reporta el modelo (modo cascada)."""
+    confianza: int = Field(
+        ...,
+        ge=1,
+        le=5,
+        description="Qué tan seguro estás de la calificación, de 1 (muy dudosa) a 5 (muy segura). "
+                    "Usa 3 o menos si el ensayo está entre dos niveles o el criterio es ambiguo"
+    )
+
+
+class CriterioRubrica(BaseModel):
+    """Definición declarativa de un criterio de la rúbrica."""
+    clave: str = Field(..., description="Identificador del criterio (nodo del grafo y campo del resultado)")
+    titulo: str = Field(..., description="Título del criterio en el resumen para la síntesis")
+    prompt: str = Field(..., description="Instrucciones del criterio, tras el prefijo compartido")
+    peso: float = Field(..., gt=0, le=1, description="Ponderación en la puntuación total (0-1)")
+    entradas: List[str] = Field(
+        default_factory=lambda: ["ensayo", "anexo_ia"],
+        description="Campos del estado que necesita el prompt"
+    )
+
+
+class ConUsoTokens(BaseModel):
+    """Base para resultados que registran el uso de tokens de cada nodo."""
+    
+    # Uso de tokens por nodo reportado por el proveedor. Es un atributo privado
+    # para que no forme parte del esquema de structured output ni de model_dump().
+    _uso_tokens: Dict[str, Dict[str, int]] = PrivateAttr(default_factory=dict)
+    
+    @property
+    def uso_tokens(self) -> Dict[str, Dict[str, int]]:
+        """Tokens de entrada, salida y cacheados (y latencia_ms) de cada nodo de la evaluación."""
+        return self._uso_tokens
+    
+    def registrar_uso_tokens(self, uso_por_nodo: Dict[str, Dict[str, int]]):
+        """Adjunta a la evaluación el uso de tokens de cada nodo."""
+        self._uso_tokens.update(uso_por_nodo or {})
+    
+    def resumen_uso_tokens(self) -> Dict[str, int]:
+        """Suma el uso de tokens de todos los nodos."""
+        resumen = {'tokens_entrada': 0, 'tokens_salida': 0, 'tokens_cacheados': 0}
+        for uso in self._uso_tokens.values():
+            for clave in resumen:
+                resumen[clave] += uso.get(clave, 0)
+        return resumen
+
+
+class EvaluacionEnsayo(ConUsoTokens):
     """Evaluación completa de un ensayo."""
     
     # Criterio 1: Calidad técnica y rigor académico (20%)
@@ -103,6 +158,25 @@ class EvaluacionEnsayo(BaseModel):
         return self.puntuacion_total
 
 
+class EvaluacionRubrica(ConUsoTokens):
+    """Evaluación de un ensayo con una rúbrica arbitraria (p. ej. criterios personalizados)."""
+    criterios: Dict[str, EvaluacionCriterio] = Field(..., description="Evaluación por clave de criterio")
+    ponderaciones: Dict[str, float] = Field(..., description="Peso (0-1) de cada criterio")
+    comentario_general: str = Field(..., description="Síntesis general sobre el ensayo")
+    puntuacion_total: Optional[float] = Field(None, description="Puntuación total ponderada (1-5)")
+    
+    def calcular_puntuacion_total(self) -> float:
+        """Calcula la puntuación total ponderada, normalizando los pesos."""
+        suma_pesos = sum(self.ponderaciones[clave] for clave in self.criterios)
+        total = sum(
+            evaluacion.calificacion * self.ponderaciones[clave]
+            for clave, evaluacion in self.criterios.items()
+        )
+        
+        self.puntuacion_total = round(total / suma_pesos, 2) if suma_pesos else 0.0
+        return self.puntuacion_total
+
+
 class EstadoEvaluacion(BaseModel):
     """Estado del proceso de evaluación."""
     ensayo: str = Field(..., description="Texto del ensayo a evaluar")
@@ -26,11 +26,23 @@ Tu objetivo: ofrecer evaluaciones precisas, respetuosas y útiles para retroalim
 
 """
 
-PROMPT_CALIDAD_TECNICA = """Evalúa CALIDAD TÉCNICA Y RIGOR ACADÉMICO (20%).
-
-ENSAYO:
+# Prefijo compartido por todas las llamadas de un mismo ensayo (sistema + ensayo + anexo).
+# Las instrucciones de cada criterio van DESPUÉS, para que el proveedor pueda
+# reutilizar el prefijo cacheado entre las llamadas paralelas.
+PROMPT_CONTEXTO_ENSAYO = """ENSAYO:
 {ensayo}
 
+ANEXO IA (solo se considera en el criterio de uso responsable de IA):
+{anexo_ia}
+"""
+
+# Contexto reducido para la síntesis (modo "extracto"): se calcula localmente
+PROMPT_CONTEXTO_EXTRACTO = """EXTRACTO DEL ENSAYO (párrafos iniciales y frases citadas en las evaluaciones):
+{extracto}
+"""
+
+PROMPT_CALIDAD_TECNICA = """Evalúa CALIDAD TÉCNICA Y RIGOR ACADÉMICO (20%).
+
 FORMATO:
 Calificación: [1–5]
 
@@ -47,9 +59,6 @@ Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo
 
 PROMPT_CREATIVIDAD = """Evalúa CREATIVIDAD Y ORIGINALIDAD (20%).
 
-ENSAYO:
-{ensayo}
-
 FORMATO:
 Calificación: [1–5]
 
@@ -64,9 +73,6 @@ Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo
 
 PROMPT_VINCULACION_TEMATICA = """Evalúa la VINCULACIÓN CON LOS EJES TEMÁTICOS (15%).
 
-ENSAYO:
-{ensayo}
-
 FORMATO:
 Calificación: [1–5]
 
@@ -80,9 +86,6 @@ Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo
 
 PROMPT_BIENESTAR_COLECTIVO = """Evalúa BIENESTAR COLECTIVO Y RESPONSABILIDAD SOCIAL (20%).
 
-ENSAYO:
-{ensayo}
-
 FORMATO:
 Calificación: [1–5]
 
@@ -96,12 +99,6 @@ Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo
 
 PROMPT_USO_RESPONSABLE_IA = """Evalúa el uso responsable de IA, basado en el ANEXO donde el autor explica su proceso (15%).
 
-ENSAYO:
-{ensayo}
-
-ANEXO IA:
-{anexo_ia}
-
 FORMATO:
 Calificación: [1–5]
 
@@ -117,9 +114,6 @@ SI NO HAY ANEXO no penalices. Evalúa positivamente la claridad del autor para t
 
 PROMPT_POTENCIAL_IMPACTO = """Evalúa POTENCIAL DE IMPACTO Y PUBLICACIÓN (10%).
 
-ENSAYO:
-{ensayo}
-
 FORMATO:
 Calificación: [1–5]
 
@@ -132,14 +126,11 @@ Considera:
 Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo (5–20 palabras máximo) que ejemplifiquen una fortaleza o debilidad y 2. Temáticas o ideas que el autor aborda o deja sin abordar.
 """
 
-PROMPT_COMENTARIO_GENERAL = """Basándote en todas las evaluaciones previas de los 6 criterios, genera un COMENTARIO GENERAL Y RETROALIMENTACIÓN para el autor del ensayo.
+PROMPT_COMENTARIO_GENERAL = """Basándote en todas las evaluaciones previas de los criterios, genera un COMENTARIO GENERAL Y RETROALIMENTACIÓN para el autor del ensayo.
 
 EVALUACIONES PREVIAS:
 {evaluaciones_previas}
 
-ENSAYO ORIGINAL:
-{ensayo}
-
 Tu comentario debe:
 1. Sintetizar la impresión general sobre el ensayo
 2. Destacar las principales fortalezas identificadas
@@ -154,3 +145,69 @@ Proporciona únicamente el comentario general.
 
 Evita repetir literalmente frases de las evaluaciones previas; sintetiza con tus propias palabras.
 """
+
+# Paso "map" para textos que superan el presupuesto de tokens: cada fragmento
+# se condensa por separado y los criterios evalúan la versión condensada
+PROMPT_CONDENSAR_FRAGMENTO = """Este es el fragmento {numero} de {total} de {documento} presentado a un concurso de ensayos. El texto completo es demasiado largo para evaluarlo de una vez.
+
+Condénsalo en no más de {palabras} palabras para que un evaluador pueda calificarlo después sin leer el original:
+1. Conserva la tesis, los argumentos y su orden, y la estructura (títulos, secciones)
+2. Conserva ejemplos, datos y referencias que sostienen los argumentos
+3. Copia entre comillas, sin modificarlas, las frases más representativas del estilo y la voz del autor
+4. Conserva lo que el autor dice sobre el uso de herramientas de IA en su proceso
+5. NO evalúes ni opines; escribe en tercera persona solo lo que dice el texto
+
+FRAGMENTO:
+{fragmento}
+
+Devuelve únicamente el texto condensado."""
+
+ENCABEZADO_TEXTO_CONDENSADO = (
+    "[Versión condensada de {documento} original de aproximadamente {palabras} palabras; "
+    "las frases entre comillas son textuales]\n\n"
+)
+
+# Plantilla para criterios personalizados de los jueces. Se rellena con
+# str.format al construir la rúbrica (nombre, peso, descripcion).
+PROMPT_CRITERIO_PERSONALIZADO = """Evalúa el criterio {nombre} ({peso:g}%).
+
+DESCRIPCIÓN DEL CRITERIO:
+{descripcion}
+
+FORMATO:
+Calificación: [1–5]
+
+Comentario (50–120 palabras):
+Explica en qué medida el ensayo cumple con el criterio descrito.
+Justifica la calificación obtenida usando 1. Citas textuales breves del ensayo (5–20 palabras máximo) que ejemplifiquen una fortaleza o debilidad y 2. Temáticas o ideas que el autor aborda o deja sin abordar.
+"""
+
+PROMPT_EVALUACION_FUSIONADA = """Evalúa el ensayo en los 6 criterios de la rúbrica y genera además un COMENTARIO GENERAL para el autor.
+
+CRITERIOS (calificación 1–5 y comentario de 50–120 palabras cada uno):
+
+1. calidad_tecnica — CALIDAD TÉCNICA Y RIGOR ACADÉMICO (20%):
+   coherencia de la estructura, desarrollo de los argumentos, uso de evidencia, claridad de la redacción y profundidad conceptual.
+
+2. creatividad — CREATIVIDAD Y ORIGINALIDAD (20%):
+   ideas nuevas o enfoques diferentes, voz propia, evita ideas comunes, forma innovadora de relacionar conceptos.
+
+3. vinculacion_tematica — VINCULACIÓN CON LOS EJES TEMÁTICOS (15%):
+   qué tan directamente aborda los temas del concurso, vínculo con la tecnología responsable, enfoque en sostenibilidad, inclusión o memoria tecnológica.
+
+4. bienestar_colectivo — BIENESTAR COLECTIVO Y RESPONSABILIDAD SOCIAL (20%):
+   reconoce impactos sociales, éticos y humanos; sensibilidad a la equidad y la justicia; visiones orientadas al bien común.
+
+5. uso_responsable_ia — USO RESPONSABLE DE IA, basado en el ANEXO (15%):
+   incluye 1 cita textual breve del ANEXO; claridad sobre cómo usó las herramientas, reconocimiento de límites y sesgos, conservación de su voz y criterio humano.
+   SI NO HAY ANEXO no penalices: valora la autonomía y la honestidad del proceso creativo.
+
+6. potencial_impacto — POTENCIAL DE IMPACTO Y PUBLICACIÓN (10%, comentario de 70–150 palabras):
+   claridad del mensaje, fuerza comunicativa, estilo narrativo y posibilidad de publicarse o inspirar a otros.
+
+En los criterios 1, 2, 3, 4 y 6 justifica la calificación con citas textuales breves del ensayo (5–20 palabras máximo) y con las temáticas que el autor aborda o deja sin abordar.
+
+comentario_general (2–4 párrafos): sintetiza la impresión general, destaca fortalezas, señala áreas de mejora de forma constructiva y ofrece sugerencias específicas y accionables. Será compartido de forma anónima con el participante: debe ser profesional, motivador y respetuoso, sin repetir literalmente los comentarios de los criterios.
+
+No calcules la puntuación total; se calcula automáticamente.
+"""
@@ -0,0 +1,117 @@
+"""
+Limitador de tasa para las llamadas al LLM.
+
+Implementa dos token buckets (solicitudes por minuto y tokens por minuto)
+con backoff adaptativo: cada respuesta 429 reduce la tasa efectiva a la
+mitad y pausa las nuevas solicitudes; cada éxito la recupera poco a poco.
+"""
+import asyncio
+import time
+from typing import Optional
+
+# Estimación rápida: ~4 caracteres por token en español
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estima el número de tokens de un texto sin llamar al tokenizador."""
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+class LimitadorTasa:
+    """Token bucket asíncrono que respeta límites de RPM y TPM del proveedor."""
+
+    def __init__(self, rpm: int, tpm: int, factor_minimo: float = 0.1,
+                 incremento_por_exito: float = 0.05, pausa_429: float = 5.0):
+        """
+        Inicializa el limitador.
+
+        Args:
+            rpm: Solicitudes por minuto permitidas por el proveedor
+            tpm: Tokens (entrada + salida) por minuto permitidos
+            factor_minimo: Fracción mínima de la tasa a la que puede reducirse tras 429
+            incremento_por_exito: Cuánto se recupera el factor de tasa con cada éxito
+            pausa_429: Segundos de pausa tras un 429 sin cabecera Retry-After
+        """
+        if rpm <= 0 or tpm <= 0:
+            raise ValueError("rpm y tpm deben ser mayores que 0")
+
+        self.rpm = rpm
+        self.tpm = tpm
+        self.factor_minimo = factor_minimo
+        self.incremento_por_exito = incremento_por_exito
+        self.pausa_429 = pausa_429
+
+        # Factor multiplicativo sobre la tasa nominal (1.0 = sin penalización)
+        self.factor = 1.0
+
+        # Los buckets empiezan llenos
+        self._solicitudes = float(rpm)
+        self._tokens = float(tpm)
+        self._ultima_recarga = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = asyncio.Lock()
+
+        self.total_429 = 0
+
+    def _recargar(self, ahora: float):
+        """Rellena ambos buckets según el tiempo transcurrido y el factor actual."""
+        transcurrido = ahora - self._ultima_recarga
+        self._ultima_recarga = ahora
+
+        self._solicitudes = min(self.rpm, self._solicitudes + transcurrido * self.rpm * self.factor / 60)
+        self._tokens = min(self.tpm, self._tokens + transcurrido * self.tpm * self.factor / 60)
+
+    async def adquirir(self, tokens: int):
+        """
+        Espera hasta que haya capacidad para una solicitud de `tokens` tokens.
+
+        Los que esperan son atendidos en orden de llegada (asyncio.Lock es FIFO).
+
+        Args:
+            tokens: Tokens estimados de la solicitud (entrada + salida)
+        """
+        # Una solicitud mayor que el bucket nunca cabría: se limita a su capacidad
+        tokens = min(tokens, self.tpm)
+
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self._recargar(ahora)
+
+                espera = self._pausa_hasta - ahora
+                if espera <= 0:
+                    if self._solicitudes >= 1 and self._tokens >= tokens:
+                        self._solicitudes -= 1
+                        self._tokens -= tokens
+                        return
+
+                    tasa_solicitudes = self.rpm * self.factor / 60
+                    tasa_tokens = self.tpm * self.factor / 60
+                    espera = max(
+                        (1 - self._solicitudes) / tasa_solicitudes,
+                        (tokens - self._tokens) / tasa_tokens
+                    )
+
+                await asyncio.sleep(max(espera, 0.01))
+
+    def corregir(self, tokens_estimados: int, tokens_reales: int):
+        """Ajusta el bucket de tokens con el consumo real reportado por el proveedor."""
+        self._tokens = max(-self.tpm, self._tokens - (tokens_reales - tokens_estimados))
+
+    def registrar_exito(self):
+        """Recupera gradualmente la tasa tras una respuesta exitosa."""
+        self.factor = min(1.0, self.factor + self.incremento_por_exito)
+
+    def registrar_429(self, retry_after: Optional[float] = None):
+        """
+        Registra una respuesta 429: reduce la tasa a la mitad y pausa las solicitudes.
+
+        Args:
+            retry_after: Segundos indicados por el proveedor en Retry-After (opcional)
+        """
+        self.total_429 += 1
+        self.factor = max(self.factor_minimo, self.factor / 2)
+
+        pausa = retry_after if retry_after is not None else self.pausa_429
+        self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + pausa)
@@ -0,0 +1,117 @@
+"""
+Rúbricas de evaluación definidas como datos.
+
+Cada criterio declara su clave, el título con que aparece en la síntesis,
+sus instrucciones, su peso y los campos del estado que necesita. El
+evaluador compila una cadena por criterio al construirse y arma el
+fan-out del grafo a partir de esta lista, así que agregar un criterio o
+evaluar con los criterios personalizados de un jurado no requiere código
+nuevo.
+"""
+import re
+from typing import Iterable, List
+
+from app.core.cache import calcular_hash
+from app.core.models import CriterioRubrica
+from app.core.prompts import (
+    PROMPT_CALIDAD_TECNICA,
+    PROMPT_CREATIVIDAD,
+    PROMPT_VINCULACION_TEMATICA,
+    PROMPT_BIENESTAR_COLECTIVO,
+    PROMPT_USO_RESPONSABLE_IA,
+    PROMPT_POTENCIAL_IMPACTO,
+    PROMPT_CRITERIO_PERSONALIZADO
+)
+
+# Rúbrica oficial del concurso; sus claves son los campos de EvaluacionEnsayo
+RUBRICA_OFICIAL: List[CriterioRubrica] = [
+    CriterioRubrica(
+        clave="calidad_tecnica",
+        titulo="CALIDAD TÉCNICA Y RIGOR ACADÉMICO",
+        prompt=PROMPT_CALIDAD_TECNICA,
+        peso=0.20
+    ),
+    CriterioRubrica(
+        clave="creatividad",
+        titulo="CREATIVIDAD Y ORIGINALIDAD",
+        prompt=PROMPT_CREATIVIDAD,
+        peso=0.20
+    ),
+    CriterioRubrica(
+        clave="vinculacion_tematica",
+        titulo="VINCULACIÓN TEMÁTICA",
+        prompt=PROMPT_VINCULACION_TEMATICA,
+        peso=0.15
+    ),
+    CriterioRubrica(
+        clave="bienestar_colectivo",
+        titulo="BIENESTAR COLECTIVO",
+        prompt=PROMPT_BIENESTAR_COLECTIVO,
+        peso=0.20
+    ),
+    CriterioRubrica(
+        clave="uso_responsable_ia",
+        titulo="USO RESPONSABLE DE IA",
+        prompt=PROMPT_USO_RESPONSABLE_IA,
+        peso=0.15
+    ),
+    CriterioRubrica(
+        clave="potencial_impacto",
+        titulo="POTENCIAL DE IMPACTO",
+        prompt=PROMPT_POTENCIAL_IMPACTO,
+        peso=0.10
+    ),
+]
+
+
+def _escapar_llaves(texto: str) -> str:
+    """Escapa las llaves para que ChatPromptTemplate no las tome como variables."""
+    return texto.replace("{", "{{").replace("}", "}}")
+
+
+def rubrica_desde_criterios_personalizados(criterios: Iterable) -> List[CriterioRubrica]:
+    """
+    Construye una rúbrica a partir de los CriterioPersonalizado de un jurado.
+
+    Args:
+        criterios: Criterios personalizados (modelos o dicts con id, nombre,
+            descripcion y peso en porcentaje)
+
+    Returns:
+        Lista de CriterioRubrica con los pesos normalizados a 0-1
+    """
+    criterios = [c if isinstance(c, dict) else c.to_dict() for c in criterios]
+    if not criterios:
+        raise ValueError("La rúbrica necesita al menos un criterio")
+
+    suma_pesos = sum(c['peso'] for c in criterios)
+    if suma_pesos <= 0:
+        raise ValueError("La suma de los pesos de los criterios debe ser mayor que 0")
+
+    rubrica = []
+    for criterio in criterios:
+        slug = re.sub(r'[^a-z0-9]+', '_', criterio['nombre'].lower()).strip('_')
+        rubrica.append(CriterioRubrica(
+            clave=f"criterio_{criterio['id']}_{slug}"[:60],
+            titulo=criterio['nombre'].upper(),
+            prompt=_escapar_llaves(PROMPT_CRITERIO_PERSONALIZADO.format(
+                nombre=criterio['nombre'].upper(),
+                peso=criterio['peso'],
+                descripcion=criterio.get('descripcion') or criterio['nombre']
+            )),
+            peso=criterio['peso'] / suma_pesos
+        ))
+
+    return rubrica
+
+
+def es_rubrica_oficial(rubrica: List[CriterioRubrica]) -> bool:
+    """Indica si la rúbrica produce los campos de EvaluacionEnsayo."""
+    return [c.clave for c in rubrica] == [c.clave for c in RUBRICA_OFICIAL]
+
+
+def hash_rubrica(rubrica: List[CriterioRubrica]) -> str:
+    """Hash estable de una rúbrica (claves, prompts, pesos y entradas)."""
+    return calcular_hash(*(
+        f"{c.clave}|{c.peso}|{','.join(c.entradas)}|{c.prompt}" for c in rubrica
+    ))
@@ -7,9 +7,11 @@ import hashlib
 from datetime import datetime, timezone
 from pathlib import Path
 from sqlalchemy import JSON, Index, ForeignKey, UniqueConstraint, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import relationship
 
 from app.database.connection import db
+from app.core.duplicados import agrupar_pares, bandas_lsh, calcular_firma, similitud_estimada
 
 
 class Usuario(db.Model):
@@ -137,6 +139,10 @@ class Ensayo(db.Model):
     puntajes_criterios = relationship('PuntajeCriterio', back_populates='ensayo', cascade='all, delete-orphan')
     comparaciones_1 = relationship('Comparacion', foreign_keys='Comparacion.ensayo_1_id', back_populates='ensayo_1', cascade='all, delete-orphan')
     comparaciones_2 = relationship('Comparacion', foreign_keys='Comparacion.ensayo_2_id', back_populates='ensayo_2', cascade='all, delete-orphan')
+    usos_llm = relationship('UsoLLM', back_populates='ensayo', cascade='all, delete-orphan')
+    archivos_pdf = relationship('ArchivoPDF', back_populates='ensayo')
+    firma_minhash = relationship('FirmaMinHash', back_populates='ensayo', uselist=False, cascade='all, delete-orphan')
+    bandas_lsh = relationship('BandaLSH', cascade='all, delete-orphan')
     
     # Índices compuestos para búsquedas comunes
     __table_args__ = (
@@ -261,6 +267,117 @@ class PuntajeCriterio(db.Model):
         }
 
 
+class UsoLLM(db.Model):
+    """Registro de cada llamada al LLM: tokens, latencia, modelo y costo.
+    Permite encontrar los nodos y ensayos más caros o lentos."""
+    
+    __tablename__ = 'uso_llm'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Ensayo al que se atribuye la llamada (None en comparaciones de varios ensayos)
+    ensayo_id = db.Column(db.Integer, ForeignKey('ensayos.id', ondelete='CASCADE'), nullable=True, index=True)
+    ensayos_ids = db.Column(JSON, nullable=True)  # Ensayos involucrados en comparación/chat
+    
+    # Operación y nodo que hicieron la llamada
+    operacion = db.Column(db.String(50), nullable=False, index=True)
+    # Opciones: 'evaluacion', 'evaluacion_personalizada', 'limpieza_pdf', 'comparacion', 'chat'
+    nodo = db.Column(db.String(100), nullable=False, index=True)  # Criterio, 'comentario_general', etc.
+    modelo = db.Column(db.String(100), nullable=False)
+    
+    # Uso reportado por el proveedor
+    tokens_entrada = db.Column(db.Integer, nullable=False, default=0)
+    tokens_salida = db.Column(db.Integer, nullable=False, default=0)
+    tokens_cacheados = db.Column(db.Integer, nullable=False, default=0)
+    latencia_ms = db.Column(db.Integer, nullable=False, default=0)
+    costo_usd = db.Column(db.Float, nullable=True)  # None si el modelo no tiene precio registrado
+    
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Relación
+    ensayo = relationship('Ensayo', back_populates='usos_llm')
+    
+    # Índices compuestos
+    __table_args__ = (
+        Index('idx_uso_ensayo_nodo', 'ensayo_id', 'nodo'),
+        Index('idx_uso_operacion_fecha', 'operacion', 'fecha'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'ensayo_id': self.ensayo_id,
+            'ensayos_ids': self.ensayos_ids,
+            'operacion': self.operacion,
+            'nodo': self.nodo,
+            'modelo': self.modelo,
+            'tokens_entrada': self.tokens_entrada,
+            'tokens_salida': self.tokens_salida,
+            'tokens_cacheados': self.tokens_cacheados,
+            'latencia_ms': self.latencia_ms,
+            'costo_usd': self.costo_usd,
+            'fecha': self.fecha.isoformat()
+        }
+
+
+class ArchivoPDF(db.Model):
+    """Cache de PDFs subidos por hash SHA-256 de sus bytes.
+    Guarda el texto ya extraído y limpiado y el ensayo evaluado, de modo que
+    volver a subir el mismo archivo no repite la extracción ni la limpieza."""
+    
+    __tablename__ = 'archivos_pdf'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pdf_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    texto_limpio = db.Column(db.Text, nullable=False)
+    # Ensayo evaluado a partir de este archivo (None mientras se evalúa o si falló)
+    ensayo_id = db.Column(db.Integer, ForeignKey('ensayos.id', ondelete='SET NULL'), nullable=True, index=True)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relación
+    ensayo = relationship('Ensayo', back_populates='archivos_pdf')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pdf_hash': self.pdf_hash,
+            'ensayo_id': self.ensayo_id,
+            'longitud_texto': len(self.texto_limpio),
+            'fecha': self.fecha.isoformat()
+        }
+
+
+class FirmaMinHash(db.Model):
+    """Firma MinHash del texto de un ensayo (ver app.core.duplicados).
+    Se compara contra las de los candidatos que devuelve el índice LSH."""
+    
+    __tablename__ = 'firmas_minhash'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ensayo_id = db.Column(db.Integer, ForeignKey('ensayos.id', ondelete='CASCADE'), unique=True, nullable=False, index=True)
+    firma = db.Column(JSON, nullable=False)  # Lista de NUM_PERMUTACIONES enteros
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relación
+    ensayo = relationship('Ensayo', back_populates='firma_minhash')
+
+
+class BandaLSH(db.Model):
+    """Índice LSH: hash de cada banda de la firma MinHash de un ensayo.
+    Dos ensayos con el mismo (banda, valor) son candidatos a casi duplicados."""
+    
+    __tablename__ = 'bandas_lsh'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ensayo_id = db.Column(db.Integer, ForeignKey('ensayos.id', ondelete='CASCADE'), nullable=False, index=True)
+    banda = db.Column(db.Integer, nullable=False)
+    valor = db.Column(db.String(16), nullable=False)
+    
+    # La búsqueda de candidatos es una consulta por igualdad sobre (banda, valor)
+    __table_args__ = (
+        Index('idx_banda_valor', 'banda', 'valor'),
+    )
+
+
 class EvaluacionJurado(db.Model):
     """Tabla intermedia para evaluaciones de jurados.
     Implementa privacidad: cada jurado solo ve sus propias evaluaciones.
@@ -698,6 +815,225 @@ def guardar_comparacion_multiple(ensayos_ids: list, resultado: str, ranking: dic
     return comparacion
 
 
+def guardar_uso_llm(registros: list, operacion: str, ensayo_id: int = None,
+                    ensayos_ids: list = None, commit: bool = True):
+    """Guarda los registros de uso de llamadas al LLM.
+    
+    Args:
+        registros: Dicts de app.core.contabilidad.registro_uso
+        operacion: Operación que hizo las llamadas ('evaluacion', 'chat', etc.)
+        ensayo_id: Ensayo al que se atribuyen las llamadas (opcional)
+        ensayos_ids: Ensayos involucrados, para comparaciones y chat (opcional)
+        commit: Si True, confirma la transacción
+    """
+    for registro in registros:
+        db.session.add(UsoLLM(
+            ensayo_id=ensayo_id,
+            ensayos_ids=ensayos_ids,
+            operacion=operacion,
+            **registro
+        ))
+    
+    if commit:
+        db.session.commit()
+
+
+def resumir_uso_llm(query, agrupar_por, limite: int = None) -> list:
+    """Agrega tokens, latencia y costo de una consulta de UsoLLM.
+    
+    Args:
+        query: Consulta base (p. ej. UsoLLM.query.filter_by(ensayo_id=1))
+        agrupar_por: Columna de UsoLLM por la que agrupar (nodo, ensayo_id, operacion...)
+        limite: Número máximo de grupos (None = todos)
+    
+    Returns:
+        Lista de dicts ordenada por costo total descendente
+    """
+    filas = query.with_entities(
+        agrupar_por.label('grupo'),
+        func.count(UsoLLM.id),
+        func.sum(UsoLLM.tokens_entrada),
+        func.sum(UsoLLM.tokens_salida),
+        func.sum(UsoLLM.tokens_cacheados),
+        func.avg(UsoLLM.latencia_ms),
+        func.max(UsoLLM.latencia_ms),
+        func.sum(UsoLLM.costo_usd)
+    ).group_by(agrupar_por).order_by(func.sum(UsoLLM.costo_usd).desc()).limit(limite).all()
+    
+    return [{
+        'grupo': grupo,
+        'llamadas': llamadas,
+        'tokens_entrada': tokens_entrada or 0,
+        'tokens_salida': tokens_salida or 0,
+        'tokens_cacheados': tokens_cacheados or 0,
+        'latencia_ms_promedio': round(latencia_promedio or 0),
+        'latencia_ms_maxima': latencia_maxima or 0,
+        'costo_usd': round(costo or 0, 6)
+    } for grupo, llamadas, tokens_entrada, tokens_salida, tokens_cacheados,
+        latencia_promedio, latencia_maxima, costo in filas]
+
+
+def registrar_archivo_pdf(pdf_hash: str, texto_limpio: str = None, ensayo_id: int = None,
+                          commit: bool = True) -> ArchivoPDF:
+    """Crea o actualiza la entrada de un PDF en la cache por hash de bytes.
+    
+    Args:
+        pdf_hash: SHA-256 de los bytes del PDF
+        texto_limpio: Texto extraído y limpiado (obligatorio si la entrada no existe)
+        ensayo_id: Ensayo evaluado a partir del archivo (opcional)
+        commit: Si False, solo agrega a la sesión
+    """
+    archivo = ArchivoPDF.query.filter_by(pdf_hash=pdf_hash).first()
+    if archivo is None:
+        archivo = ArchivoPDF(pdf_hash=pdf_hash, texto_limpio=texto_limpio)
+        db.session.add(archivo)
+    elif texto_limpio is not None:
+        archivo.texto_limpio = texto_limpio
+    
+    if ensayo_id is not None:
+        archivo.ensayo_id = ensayo_id
+    
+    if commit:
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otra subida simultánea del mismo archivo ya creó la entrada
+            db.session.rollback()
+            return registrar_archivo_pdf(pdf_hash, texto_limpio, ensayo_id)
+    return archivo
+
+
+def indexar_firma_minhash(ensayo_id: int, texto: str, commit: bool = True) -> bool:
+    """Calcula la firma MinHash del texto de un ensayo y la agrega al índice LSH.
+    
+    Args:
+        ensayo_id: Ensayo al que pertenece el texto
+        texto: Texto completo del ensayo
+        commit: Si False, solo agrega a la sesión
+    
+    Returns:
+        True si se indexó, False si el texto no tiene palabras
+    """
+    firma = calcular_firma(texto)
+    if not firma:
+        return False
+    
+    # Reindexar reemplaza la firma y las bandas anteriores
+    FirmaMinHash.query.filter_by(ensayo_id=ensayo_id).delete()
+    BandaLSH.query.filter_by(ensayo_id=ensayo_id).delete()
+    
+    db.session.add(FirmaMinHash(ensayo_id=ensayo_id, firma=firma))
+    db.session.add_all(
+        BandaLSH(ensayo_id=ensayo_id, banda=banda, valor=valor)
+        for banda, valor in bandas_lsh(firma)
+    )
+    
+    if commit:
+        db.session.commit()
+    return True
+
+
+def buscar_casi_duplicados(texto: str, umbral: float, limite: int = 5) -> list:
+    """Busca ensayos activos casi duplicados de un texto con el índice LSH.
+    
+    Solo se comparan las firmas de los ensayos que comparten alguna banda con
+    el texto, así que el costo no crece con el tamaño del corpus.
+    
+    Args:
+        texto: Texto a buscar
+        umbral: Similitud de Jaccard estimada mínima (0-1)
+        limite: Número máximo de resultados
+    
+    Returns:
+        Lista de tuplas (Ensayo, similitud) de mayor a menor similitud
+    """
+    firma = calcular_firma(texto)
+    if not firma:
+        return []
+    
+    candidatos = db.session.query(BandaLSH.ensayo_id).filter(db.or_(*(
+        db.and_(BandaLSH.banda == banda, BandaLSH.valor == valor)
+        for banda, valor in bandas_lsh(firma)
+    ))).distinct()
+    
+    resultados = []
+    filas = db.session.query(Ensayo, FirmaMinHash.firma).join(
+        FirmaMinHash, FirmaMinHash.ensayo_id == Ensayo.id
+    ).filter(Ensayo.id.in_(candidatos), Ensayo.activo == True).all()
+    
+    for ensayo, firma_candidato in filas:
+        similitud = similitud_estimada(firma, firma_candidato)
+        if similitud >= umbral:
+            resultados.append((ensayo, similitud))
+    
+    resultados.sort(key=lambda resultado: resultado[1], reverse=True)
+    return resultados[:limite]
+
+
+def get_clusters_duplicados(umbral: float) -> list:
+    """Agrupa en clusters los ensayos activos casi duplicados de todo el corpus.
+    
+    Los pares candidatos salen de los grupos de bandas LSH con más de un
+    ensayo, se verifican con la firma completa y se unen transitivamente.
+    
+    Args:
+        umbral: Similitud de Jaccard estimada mínima de cada par (0-1)
+    
+    Returns:
+        Lista de clusters (dicts con ensayos y similitud mínima/máxima de sus pares)
+    """
+    cubetas = db.session.query(BandaLSH.banda, BandaLSH.valor).join(
+        Ensayo, Ensayo.id == BandaLSH.ensayo_id
+    ).filter(Ensayo.activo == True).group_by(
+        BandaLSH.banda, BandaLSH.valor
+    ).having(func.count(BandaLSH.id) > 1).subquery()
+    
+    miembros = {}
+    for banda, valor, ensayo_id in db.session.query(
+        BandaLSH.banda, BandaLSH.valor, BandaLSH.ensayo_id
+    ).join(cubetas, db.and_(
+        BandaLSH.banda == cubetas.c.banda, BandaLSH.valor == cubetas.c.valor
+    )).join(Ensayo, Ensayo.id == BandaLSH.ensayo_id).filter(Ensayo.activo == True):
+        miembros.setdefault((banda, valor), set()).add(ensayo_id)
+    
+    candidatos = {
+        (a, b)
+        for ids in miembros.values()
+        for a in ids for b in ids if a < b
+    }
+    if not candidatos:
+        return []
+    
+    ids = {ensayo_id for par in candidatos for ensayo_id in par}
+    firmas = dict(db.session.query(FirmaMinHash.ensayo_id, FirmaMinHash.firma).filter(
+        FirmaMinHash.ensayo_id.in_(ids)
+    ).all())
+    
+    similitudes = {}
+    for a, b in candidatos:
+        similitud = similitud_estimada(firmas.get(a, []), firmas.get(b, []))
+        if similitud >= umbral:
+            similitudes[(a, b)] = similitud
+    
+    ensayos = {ensayo.id: ensayo for ensayo in Ensayo.query.filter(Ensayo.id.in_(ids)).all()}
+    clusters = []
+    for cluster in agrupar_pares(similitudes):
+        en_cluster = set(cluster)
+        valores = [similitud for (a, b), similitud in similitudes.items() if a in en_cluster]
+        clusters.append({
+            'ensayos': [{
+                'id': ensayo_id,
+                'nombre_archivo_original': ensayos[ensayo_id].nombre_archivo_original,
+                'autor': ensayos[ensayo_id].autor,
+                'puntuacion_total': ensayos[ensayo_id].puntuacion_total,
+                'fecha_evaluacion': ensayos[ensayo_id].fecha_evaluacion.isoformat() if ensayos[ensayo_id].fecha_evaluacion else None
+            } for ensayo_id in cluster],
+            'similitud_minima': round(min(valores), 3),
+            'similitud_maxima': round(max(valores), 3)
+        })
+    return clusters
+
+
 def invalidar_comparaciones(ensayo_id: int):
     """Invalida todas las comparaciones que involucran un ensayo.
     
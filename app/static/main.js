@@ -524,6 +524,7 @@ async function evaluateEssay() {
     uploadSection.style.display = 'none';
     processingSection.style.display = 'block';
     resultsSection.style.display = 'none';
+    renderPartialResults({ progress: 0, parcial: {} });
 
     try {
         // Crear FormData para enviar el archivo
@@ -572,9 +573,9 @@ async function evaluateEssay() {
                     
                     const jobStatus = await statusResponse.json();
                     console.log(`📊 Job status: ${jobStatus.status} (${jobStatus.progress}%)`);
-                    
-                    // Actualizar barra de progreso (si la tienes en el HTML)
-                    // document.getElementById('progress').value = jobStatus.progress;
+
+                    // Progreso y criterios ya evaluados mientras el resto sigue en proceso
+                    renderPartialResults(jobStatus);
                     
                     if (jobStatus.status === 'completed') {
                         // Job completado - mostrar resultados
@@ -613,6 +614,39 @@ async function evaluateEssay() {
     }
 }
 
+// Nombres de los criterios para los resultados parciales
+const NOMBRES_CRITERIOS = {
+    calidad_tecnica: 'Calidad Técnica',
+    creatividad: 'Creatividad',
+    vinculacion_tematica: 'Vinculación Temática',
+    bienestar_colectivo: 'Bienestar Colectivo',
+    uso_responsable_ia: 'Uso Responsable de IA',
+    potencial_impacto: 'Potencial de Impacto',
+    comentario_general: 'Comentario General'
+};
+
+// Mostrar el progreso del job y los criterios que ya terminaron
+function renderPartialResults(jobStatus) {
+    const progressFill = document.getElementById('processingProgressFill');
+    const partialList = document.getElementById('partialCriteria');
+
+    if (progressFill) progressFill.style.width = `${jobStatus.progress || 0}%`;
+    if (!partialList) return;
+
+    const parcial = jobStatus.parcial || {};
+    partialList.innerHTML = Object.entries(parcial).map(([criterio, resultado]) => {
+        const nombre = NOMBRES_CRITERIOS[criterio] || criterio.replace(/_/g, ' ');
+        const calificacion = resultado && resultado.calificacion !== undefined
+            ? `${parseFloat(resultado.calificacion).toFixed(1)}/5`
+            : '✓';
+        return `
+            <li class="partial-criterion">
+                <span class="partial-criterion-name">${escapeHtml(nombre)}</span>
+                <span class="partial-criterion-score">${escapeHtml(calificacion)}</span>
+            </li>`;
+    }).join('');
+}
+
 // Mostrar resultados
 function displayResults(evaluation) {
     // Ocultar procesamiento y mostrar resultados
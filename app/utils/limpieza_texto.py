@@ -0,0 +1,369 @@
+"""
+Limpieza determinista del texto extraído de PDFs.
+
+Hace con reglas lo que antes se pedía al LLM para todo el texto: quitar
+números de página y encabezados/pies repetidos, unir palabras cortadas con
+guion, unir las líneas de un mismo párrafo y normalizar espacios. Tarda
+milisegundos y da siempre el mismo resultado para el mismo texto.
+
+Las heurísticas de calidad marcan los párrafos ilegibles (glifos sin mapear,
+letras sueltas, palabras pegadas, dígitos mezclados por OCR): solo esos se
+envían al LLM. Las mismas heurísticas califican las páginas de pypdf en la
+extracción híbrida.
+
+Lo que sí va al LLM se divide en fragmentos alineados a párrafos que se
+limpian en paralelo. Cada fragmento repite al inicio las últimas oraciones
+del anterior (solape) para que el modelo vea el contexto del corte; al
+unir las respuestas, la versión limpia del solape se quita del fragmento
+siguiente.
+"""
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Sequence, Tuple, Union
+
+from app.core.extracto import dividir_oraciones, dividir_parrafos
+from app.core.rate_limiter import CARACTERES_POR_TOKEN, estimar_tokens
+
+# Umbrales de calidad de un texto extraído
+CALIDAD_MIN_CARACTERES = 20          # Menos caracteres útiles: página vacía o escaneada
+CALIDAD_MIN_DENSIDAD = 0.75          # Fracción de letras, dígitos, espacios y puntuación común
+CALIDAD_MAX_PARTIDAS = 0.15          # Fracción de "palabras" de una letra (t e x t o  e s p a c i a d o)
+CALIDAD_MAX_PEGADAS = 0.03           # Fracción de palabras de más de 20 letras (textosinespacios)
+CALIDAD_MAX_MIXTAS = 0.05            # Fracción de palabras con letras y dígitos (l0s, c0munidad)
+
+# Una línea corta en el borde superior o inferior de al menos estas páginas
+# es encabezado o pie de página. Solo se miran las primeras y últimas líneas
+# de cada página: una línea repetida dentro del texto nunca se quita
+REPETICIONES_ENCABEZADO = 3
+LONGITUD_MAX_ENCABEZADO = 80
+LINEAS_BORDE_PAGINA = 2
+
+_PALABRAS_UNA_LETRA = {"a", "e", "o", "u", "y"}
+_PUNTUACION_COMUN = set(".,;:¿?¡!()\"'«»“”‘’-–—/%$&*[]…")
+_TOKEN = re.compile(r"[^\W\d_]+")
+_TOKEN_ALFANUMERICO = re.compile(r"\w+")
+_ORDINAL = re.compile(r"^\d+(er|ro|ra|do|da|to|ta|vo|va|no|na|mo|ma|o|a|s)$", re.IGNORECASE)
+_NUMERO_PAGINA = re.compile(
+    r"^(?:p[aá]g(?:ina)?\.?\s*)?[-–—]?\s*\d{1,4}\s*[-–—]?(?:\s*(?:de|/)\s*\d{1,4})?$",
+    re.IGNORECASE
+)
+_FIN_ORACION = tuple(".!?:…\"»”)")
+_INICIO_LISTA = re.compile(r"^(?:[-–—•·*]\s|\d{1,2}[.)]\s|[a-z][)]\s)")
+_ESPACIOS = re.compile(r"[ \t ]+")
+
+
+def calidad_texto(texto: str) -> Dict[str, float]:
+    """
+    Métricas de calidad de un texto extraído (una página o un párrafo).
+
+    Returns:
+        Dict con palabras, caracteres útiles, densidad y fracciones de palabras
+        partidas, pegadas y mixtas (letras y dígitos)
+    """
+    sin_espacios = [c for c in texto if not c.isspace()]
+    if not sin_espacios:
+        return {'palabras': 0, 'caracteres': 0, 'densidad': 0.0,
+                'partidas': 0.0, 'pegadas': 0.0, 'mixtas': 0.0}
+
+    validos = sum(1 for c in sin_espacios if c.isalnum() or c in _PUNTUACION_COMUN)
+    palabras = _TOKEN.findall(texto)
+    total = max(1, len(palabras))
+    mixtas = [
+        token for token in _TOKEN_ALFANUMERICO.findall(texto)
+        if not token.isdigit() and not token.isalpha() and "_" not in token and not _ORDINAL.match(token)
+    ]
+    return {
+        'palabras': len(palabras),
+        'caracteres': validos,
+        # "(cid:12)", U+FFFD y glifos sin mapear bajan la densidad
+        'densidad': validos / len(sin_espacios) if "(cid:" not in texto else 0.0,
+        'partidas': sum(1 for p in palabras if len(p) == 1 and p.lower() not in _PALABRAS_UNA_LETRA) / total,
+        'pegadas': sum(1 for p in palabras if len(p) > 20) / total,
+        'mixtas': len(mixtas) / total
+    }
+
+
+def pagina_aceptable(texto: str) -> bool:
+    """True si el texto de pypdf de una página pasa las heurísticas de calidad."""
+    metricas = calidad_texto(texto)
+    return (
+        metricas['caracteres'] >= CALIDAD_MIN_CARACTERES
+        and metricas['densidad'] >= CALIDAD_MIN_DENSIDAD
+        and metricas['partidas'] <= CALIDAD_MAX_PARTIDAS
+        and metricas['pegadas'] <= CALIDAD_MAX_PEGADAS
+    )
+
+
+def parrafo_ilegible(parrafo: str) -> bool:
+    """
+    True si un párrafo ya limpiado con reglas sigue pareciendo ilegible y
+    necesita al LLM. En párrafos cortos una sola palabra rara no basta.
+    """
+    metricas = calidad_texto(parrafo)
+    if metricas['densidad'] < CALIDAD_MIN_DENSIDAD:
+        return True
+
+    palabras = metricas['palabras']
+    if palabras < 8:
+        return False
+    return (
+        metricas['partidas'] > CALIDAD_MAX_PARTIDAS
+        or (metricas['pegadas'] > CALIDAD_MAX_PEGADAS and metricas['pegadas'] * palabras >= 2)
+        or (metricas['mixtas'] > CALIDAD_MAX_MIXTAS and metricas['mixtas'] * palabras >= 2)
+    )
+
+
+def _clave_repeticion(linea: str) -> str:
+    # Los encabezados suelen variar solo en el número de página
+    return re.sub(r"\d+", "#", linea.lower())
+
+
+def _candidata_encabezado(linea: str) -> bool:
+    # Una línea que empieza en minúscula continúa una oración: es del cuerpo
+    return bool(linea) and len(linea) <= LONGITUD_MAX_ENCABEZADO and not linea[0].islower()
+
+
+def _lineas_borde(lineas: List[str]) -> List[str]:
+    """Primeras y últimas líneas no vacías de una página: candidatas a encabezado o pie."""
+    no_vacias = [linea for linea in lineas if linea]
+    if len(no_vacias) <= 2 * LINEAS_BORDE_PAGINA:
+        return no_vacias
+    return no_vacias[:LINEAS_BORDE_PAGINA] + no_vacias[-LINEAS_BORDE_PAGINA:]
+
+
+def _encabezados_repetidos(paginas: List[List[str]]) -> set:
+    """Claves de las líneas de borde que se repiten en varias páginas."""
+    conteo = Counter()
+    for lineas in paginas:
+        conteo.update({
+            _clave_repeticion(linea) for linea in _lineas_borde(lineas)
+            if _candidata_encabezado(linea)
+        })
+    # En documentos cortos basta con que se repita en todas las páginas
+    minimo = max(2, min(REPETICIONES_ENCABEZADO, len(paginas)))
+    return {clave for clave, veces in conteo.items() if veces >= minimo}
+
+
+def _quitar_bordes(lineas: List[str], repetidas: set) -> List[str]:
+    """
+    Quita números de página y encabezados/pies de los bordes de una página.
+
+    Se avanza desde cada borde hacia dentro y se para en la primera línea que
+    no es encabezado ni número de página, así que nunca se quita una línea
+    del cuerpo.
+    """
+    def es_borde(linea: str) -> bool:
+        return bool(_NUMERO_PAGINA.match(linea)) or (
+            _candidata_encabezado(linea) and _clave_repeticion(linea) in repetidas
+        )
+
+    inicio, fin = 0, len(lineas)
+    while inicio < fin and (not lineas[inicio] or es_borde(lineas[inicio])):
+        inicio += 1
+    while fin > inicio and (not lineas[fin - 1] or es_borde(lineas[fin - 1])):
+        fin -= 1
+    return lineas[inicio:fin]
+
+
+def _longitud_tipica(lineas: List[str]) -> int:
+    """Percentil 75 de la longitud de las líneas: el ancho de una línea de párrafo llena."""
+    longitudes = sorted(len(linea) for linea in lineas if linea)
+    if not longitudes:
+        return 0
+    return longitudes[int(len(longitudes) * 0.75)]
+
+
+def limpiar_con_reglas(paginas: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Limpia el texto extraído de un PDF sin llamar al LLM.
+
+    - Elimina números de página y encabezados/pies repetidos en el borde
+      superior o inferior de las páginas
+    - Une palabras cortadas con guion al final de línea
+    - Une las líneas de un mismo párrafo; un párrafo termina en una línea en
+      blanco, en una línea corta que cierra una oración, en un título o antes
+      de un elemento de lista
+    - Normaliza espacios
+
+    Args:
+        paginas: Texto crudo de cada página del PDF, o un solo texto (las
+            páginas separadas por "\f", si las hay)
+
+    Returns:
+        Lista de párrafos limpios
+    """
+    if isinstance(paginas, str):
+        paginas = paginas.split("\f")
+    lineas_paginas = [
+        [_ESPACIOS.sub(" ", linea).strip() for linea in pagina.splitlines()]
+        for pagina in paginas
+    ]
+    repetidas = _encabezados_repetidos(lineas_paginas)
+
+    # Entre páginas queda una línea en blanco: solo corta el párrafo si la
+    # página anterior terminó una oración
+    lineas = []
+    for lineas_pagina in lineas_paginas:
+        lineas.extend(_quitar_bordes(lineas_pagina, repetidas) + [""])
+    tipica = _longitud_tipica(lineas)
+
+    parrafos = []
+    actual = ""
+    anterior = ""
+    lineas_actual = 0
+
+    def cerrar():
+        nonlocal actual, lineas_actual
+        if actual:
+            parrafos.append(actual)
+        actual = ""
+        lineas_actual = 0
+
+    for linea in lineas:
+        if not linea:
+            # Un salto de página o línea en blanco no corta el párrafo si la
+            # línea siguiente lo continúa
+            if anterior and anterior.endswith(_FIN_ORACION):
+                cerrar()
+            continue
+
+        if not actual:
+            actual, lineas_actual = linea, 1
+        elif actual.endswith("-") and len(actual) > 1 and actual[-2].isalpha() and linea[0].islower():
+            actual = actual[:-1] + linea
+            lineas_actual += 1
+        elif (
+            _INICIO_LISTA.match(linea)
+            # Línea corta que cierra una oración y la siguiente empieza otra
+            or (anterior.endswith(_FIN_ORACION) and len(anterior) < 0.85 * tipica
+                and not linea[0].islower())
+            # Título: una línea sola, corta o en mayúsculas, sin puntuación final
+            or (lineas_actual == 1 and (len(anterior) < 0.6 * tipica or anterior.isupper())
+                and not anterior.endswith(_FIN_ORACION + (",", ";")) and linea[0].isupper())
+            # Fin de un elemento de lista sin puntuación
+            or (_INICIO_LISTA.match(actual) and not anterior.endswith((",", ";"))
+                and linea[0].isupper())
+        ):
+            cerrar()
+            actual, lineas_actual = linea, 1
+        else:
+            actual = f"{actual} {linea}"
+            lineas_actual += 1
+        anterior = linea
+
+    cerrar()
+    return parrafos
+
+
+def _unidades_con_separador(texto: str, max_tokens: int) -> List[Tuple[str, str]]:
+    """
+    Párrafos del texto, o sus oraciones (o trozos de oración, cortados entre
+    palabras) si un párrafo no cabe en `max_tokens`, cada uno con el
+    separador que lo precede: "\n\n" al inicio de un párrafo y " " dentro de él.
+    """
+    unidades = []
+    for parrafo in dividir_parrafos(texto):
+        if estimar_tokens(parrafo) <= max_tokens:
+            unidades.append((parrafo, "\n\n"))
+            continue
+
+        trozos = []
+        for oracion in dividir_oraciones(parrafo):
+            if estimar_tokens(oracion) <= max_tokens:
+                trozos.append(oracion)
+                continue
+            # Una oración que tampoco cabe se corta entre palabras
+            palabras = []
+            for palabra in oracion.split():
+                if palabras and estimar_tokens(" ".join(palabras + [palabra])) > max_tokens:
+                    trozos.append(" ".join(palabras))
+                    palabras = []
+                palabras.append(palabra)
+            trozos.append(" ".join(palabras))
+        unidades.extend((trozo, "\n\n" if i == 0 else " ") for i, trozo in enumerate(trozos))
+    return unidades
+
+
+def fragmentar_con_solape(texto: str, max_tokens: int, solape_tokens: int) -> List[Tuple[str, str, str]]:
+    """
+    Divide un texto en fragmentos alineados a párrafos para limpiarlos por separado.
+
+    Un párrafo que no cabe en un fragmento se corta entre oraciones (o entre
+    palabras, si una oración tampoco cabe). Los fragmentos conservan los
+    separadores del texto: unidos sin cambios, cada uno precedido de su
+    separador, reproducen el texto con sus párrafos.
+
+    Args:
+        texto: Texto a dividir
+        max_tokens: Tokens estimados máximos de cada fragmento (sin el solape)
+        solape_tokens: Tokens estimados máximos del solape (0 = sin solape)
+
+    Returns:
+        Ternas (solape, fragmento, separador): el solape son las últimas
+        oraciones del fragmento anterior ("" en el primero) y el separador es
+        el que va entre el fragmento anterior y este en el texto ("\n\n" si el
+        corte cae entre párrafos, " " si cae dentro de uno)
+    """
+    # Agrupar unidades consecutivas mientras quepan en max_tokens
+    grupos = []
+    for unidad, separador in _unidades_con_separador(texto, max_tokens):
+        if grupos and estimar_tokens(f"{grupos[-1][1]}{separador}{unidad}") <= max_tokens:
+            grupos[-1][1] += f"{separador}{unidad}"
+            grupos[-1][2] = unidad
+        else:
+            grupos.append([separador, unidad, unidad])
+
+    ternas = []
+    for i, (separador, fragmento, _) in enumerate(grupos):
+        if i == 0:
+            ternas.append(("", fragmento, ""))
+            continue
+
+        tomadas = []
+        if solape_tokens > 0:
+            for oracion in reversed(dividir_oraciones(grupos[i - 1][2])):
+                if tomadas and estimar_tokens(" ".join([oracion] + tomadas)) > solape_tokens:
+                    break
+                tomadas.insert(0, oracion)
+        solape = " ".join(tomadas)
+        if estimar_tokens(solape) > solape_tokens:
+            # Una sola oración más larga que el solape: solo su final
+            solape = solape[-solape_tokens * CARACTERES_POR_TOKEN:].split(" ", 1)[-1]
+
+        ternas.append((solape, fragmento, separador))
+    return ternas
+
+
+def _palabra_normalizada(palabra: str) -> str:
+    return re.sub(r"\W+", "", palabra.lower())
+
+
+def quitar_solape(limpio: str, solape: str) -> str:
+    """
+    Quita del inicio de un fragmento limpio la versión limpia de su solape.
+
+    El solape limpio puede diferir del crudo (guiones, OCR, espacios), así
+    que se alinea por palabras normalizadas. Si no se reconoce al menos el
+    60 % del solape, el fragmento se devuelve completo.
+    """
+    palabras_solape = [p for p in map(_palabra_normalizada, solape.split()) if p]
+    if not palabras_solape:
+        return limpio
+
+    tokens = list(re.finditer(r"\S+", limpio))[:2 * len(palabras_solape) + 10]
+    palabras = [_palabra_normalizada(token.group()) for token in tokens]
+
+    bloques = [
+        bloque for bloque in SequenceMatcher(None, palabras_solape, palabras, autojunk=False).get_matching_blocks()
+        if bloque.size
+    ]
+    if sum(bloque.size for bloque in bloques) < 0.6 * len(palabras_solape):
+        return limpio
+
+    # Si las últimas palabras del solape cambiaron al limpiarse (p. ej. una
+    # palabra con guion que se unió), el corte avanza lo que falta
+    ultimo = bloques[-1]
+    faltan = len(palabras_solape) - (ultimo.a + ultimo.size)
+    fin = min(len(tokens), ultimo.b + ultimo.size + (faltan if faltan <= 3 else 0))
+    return limpio[tokens[fin - 1].end():].lstrip()
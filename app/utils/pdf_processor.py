@@ -1,9 +1,28 @@
 """
-Módulo para procesar PDFs y limpiar el texto extraído usando LLM.
+Módulo para procesar PDFs y limpiar el texto extraído.
+
+La limpieza se hace con reglas locales (app.utils.limpieza_texto) y solo los
+párrafos que siguen ilegibles se envían al LLM.
+
+La extracción "auto" es híbrida: pypdf, varias veces más rápido, extrae todas
+las páginas y cada una se califica con heurísticas locales (densidad de
+caracteres, palabras partidas, espacios faltantes). Solo las páginas que no
+pasan se vuelven a extraer con pdfplumber, que respeta mejor el layout.
+
+El análisis de layout de pdfplumber es CPU-bound: en PDFs largos las páginas
+se reparten por rangos en un ProcessPoolExecutor compartido por el proceso.
+Cada worker abre el archivo por su cuenta y las páginas se reensamblan en
+orden.
 """
+import io
 import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
 
 try:
@@ -18,7 +37,18 @@ try:
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
-from langchain_openai import ChatOpenAI
+from app.config import Config
+from app.core.contabilidad import ainvocar_con_uso
+from app.core.event_loop import ejecutar_sincrono
+from app.core.gobernador import usar_carril
+from app.core.llm import crear_llm
+from app.utils.limpieza_texto import (
+    fragmentar_con_solape,
+    limpiar_con_reglas,
+    pagina_aceptable,
+    parrafo_ilegible,
+    quitar_solape
+)
 from langchain_core.prompts import ChatPromptTemplate
 
 load_dotenv()
@@ -46,42 +76,130 @@ TEXTO EXTRAÍDO DEL PDF:
 Devuelve únicamente el texto limpio y bien formateado, sin comentarios adicionales."""
 
 
+MODOS_LIMPIEZA = ("reglas", "llm")
+
+# Un PDF se extrae de una ruta o de un stream binario en memoria (io.BytesIO)
+FuentePDF = Union[str, os.PathLike, BinaryIO]
+
+
+def unir_paginas(paginas: Sequence[str]) -> str:
+    """Texto completo del PDF a partir del de cada página."""
+    return "\n\n".join(paginas)
+
+
+def _es_ruta(fuente: FuentePDF) -> bool:
+    return isinstance(fuente, (str, os.PathLike))
+
+
+@contextmanager
+def _abrir_pdf(fuente: FuentePDF):
+    """Abre la ruta en modo binario, o rebobina el stream recibido (sin cerrarlo)."""
+    if _es_ruta(fuente):
+        with open(fuente, 'rb') as archivo:
+            yield archivo
+    else:
+        fuente.seek(0)
+        yield fuente
+
+
+def _extraer_paginas_pdfplumber(pdf_path: FuentePDF, paginas: Sequence[int]) -> List[str]:
+    """Texto de las páginas indicadas (índices desde 0) con pdfplumber; también corre en los workers."""
+    with _abrir_pdf(pdf_path) as archivo, pdfplumber.open(archivo) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in paginas]
+
+
+_pool_extraccion: Optional[ProcessPoolExecutor] = None
+_pool_extraccion_lock = threading.Lock()
+
+
+def obtener_pool_extraccion() -> ProcessPoolExecutor:
+    """Devuelve el pool de procesos de extracción, creándolo la primera vez."""
+    global _pool_extraccion
+    
+    with _pool_extraccion_lock:
+        if _pool_extraccion is None:
+            # spawn: el servidor tiene hilos (executor de jobs, event loop) y
+            # hacer fork de un proceso con hilos puede heredar locks tomados
+            _pool_extraccion = ProcessPoolExecutor(
+                max_workers=Config.PDF_PROCESOS_EXTRACCION,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    
+    return _pool_extraccion
+
+
+def rangos_paginas(num_paginas: int, procesos: int, paginas_minimas: int) -> List[Tuple[int, int]]:
+    """
+    Divide las páginas en rangos contiguos de tamaño parecido, uno por proceso,
+    con al menos `paginas_minimas` páginas cada uno.
+    
+    Returns:
+        Lista de rangos (inicio, fin); un solo rango si no conviene repartir
+    """
+    num_rangos = max(1, min(procesos, num_paginas // max(1, paginas_minimas)))
+    base, resto = divmod(num_paginas, num_rangos)
+    rangos = []
+    inicio = 0
+    for i in range(num_rangos):
+        fin = inicio + base + (1 if i < resto else 0)
+        rangos.append((inicio, fin))
+        inicio = fin
+    return rangos
+
+
 class PDFProcessor:
-    """Procesador de PDFs con limpieza automática usando LLM."""
+    """Procesador de PDFs con limpieza automática (reglas locales y LLM)."""
     
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.1):
+    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.1,
+                 carril: str = "carga", extraccion_paralela: Optional[bool] = None,
+                 limpieza: Optional[str] = None):
         """
         Inicializa el procesador de PDFs.
         
         Args:
             model_name: Modelo de OpenAI a usar (gpt-4o-mini es más económico)
             temperature: Temperatura baja para mantener fidelidad al texto original
+            carril: Carril del gobernador de concurrencia para la limpieza
+            extraccion_paralela: Repartir las páginas de pdfplumber en el pool de
+                procesos (por defecto, Config.PDF_EXTRACCION_PARALELA)
+            limpieza: "reglas" (reglas locales y LLM solo para párrafos ilegibles)
+                o "llm" (todo el texto al LLM); por defecto, Config.PDF_LIMPIEZA
         """
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=temperature,
-            api_key=os.getenv("OPENAI_API_KEY")
+        limpieza = limpieza or Config.PDF_LIMPIEZA
+        if limpieza not in MODOS_LIMPIEZA:
+            raise ValueError(f"Limpieza no válida: {limpieza}. Usa {', '.join(MODOS_LIMPIEZA)}")
+        
+        self.model_name = model_name
+        self.carril = carril
+        self.limpieza = limpieza
+        self.extraccion_paralela = (
+            Config.PDF_EXTRACCION_PARALELA if extraccion_paralela is None else extraccion_paralela
         )
+        self.llm = crear_llm(model_name, temperature, eco_simulado=True)
         self.prompt = ChatPromptTemplate.from_messages([
             ("user", PROMPT_LIMPIEZA)
         ])
     
-    def extraer_texto_pypdf(self, pdf_path: str) -> str:
+    def extraer_texto_pypdf(self, pdf_path: FuentePDF) -> str:
         """
         Extrae texto de un PDF usando pypdf.
         
         Args:
-            pdf_path: Ruta al archivo PDF
+            pdf_path: Ruta al archivo PDF o stream binario con su contenido
             
         Returns:
             Texto extraído del PDF
         """
+        return unir_paginas(self.extraer_paginas_pypdf(pdf_path))
+    
+    def extraer_paginas_pypdf(self, pdf_path: FuentePDF) -> List[str]:
+        """Texto de cada página con contenido, extraído con pypdf."""
         if not PYPDF_AVAILABLE:
             raise ImportError("pypdf no está instalado. Instálalo con: pip install pypdf")
         
         texto_completo = []
         
-        with open(pdf_path, 'rb') as file:
+        with _abrir_pdf(pdf_path) as file:
             reader = pypdf.PdfReader(file)
             num_paginas = len(reader.pages)
             
@@ -95,90 +213,322 @@ class PDFProcessor:
             
             print()  # Nueva línea después del progreso
         
-        return "\n\n".join(texto_completo)
+        return texto_completo
     
-    def extraer_texto_pdfplumber(self, pdf_path: str) -> str:
+    def _usa_pool(self) -> bool:
+        """True si la extracción con pdfplumber se reparte en el pool de procesos."""
+        return self.extraccion_paralela and Config.PDF_PROCESOS_EXTRACCION > 1
+    
+    @staticmethod
+    def _rangos(num_paginas: int) -> List[Tuple[int, int]]:
+        return rangos_paginas(num_paginas, Config.PDF_PROCESOS_EXTRACCION, Config.PDF_PAGINAS_POR_PROCESO)
+    
+    def extraer_texto_pdfplumber(self, pdf_path: FuentePDF) -> str:
         """
         Extrae texto de un PDF usando pdfplumber (mejor para tablas y layout complejo).
         
+        Con extracción paralela, los PDFs de al menos 2 * PDF_PAGINAS_POR_PROCESO
+        páginas se reparten por rangos en el pool de procesos.
+        
         Args:
-            pdf_path: Ruta al archivo PDF
+            pdf_path: Ruta al archivo PDF o stream binario con su contenido
             
         Returns:
             Texto extraído del PDF
         """
+        return unir_paginas(self.extraer_paginas_pdfplumber(pdf_path))
+    
+    def extraer_paginas_pdfplumber(self, pdf_path: FuentePDF) -> List[str]:
+        """Texto de cada página con contenido, extraído con pdfplumber."""
         if not PDFPLUMBER_AVAILABLE:
             raise ImportError("pdfplumber no está instalado. Instálalo con: pip install pdfplumber")
         
         texto_completo = []
         
-        with pdfplumber.open(pdf_path) as pdf:
+        with _abrir_pdf(pdf_path) as archivo, pdfplumber.open(archivo) as pdf:
             num_paginas = len(pdf.pages)
+            # Los workers abren el archivo por su ruta: un stream se extrae aquí
+            rangos = self._rangos(num_paginas) if self._usa_pool() and _es_ruta(pdf_path) else []
             
-            print(f"Extrayendo texto de {num_paginas} paginas con pdfplumber...")
+            if len(rangos) < 2:
+                print(f"Extrayendo texto de {num_paginas} paginas con pdfplumber...")
+                
+                for i, page in enumerate(pdf.pages, 1):
+                    texto = page.extract_text()
+                    if texto and texto.strip():
+                        texto_completo.append(texto)
+                    print(f"   Página {i}/{num_paginas} procesada", end='\r')
+                
+                print()  # Nueva línea después del progreso
+                return texto_completo
+        
+        print(f"Extrayendo texto de {num_paginas} paginas con pdfplumber en {len(rangos)} procesos...")
+        pool = obtener_pool_extraccion()
+        futuros = [pool.submit(_extraer_paginas_pdfplumber, str(pdf_path), range(inicio, fin)) for inicio, fin in rangos]
+        
+        # Reensamblar en el orden de las páginas
+        for futuro in futuros:
+            texto_completo.extend(texto for texto in futuro.result() if texto.strip())
+        
+        return texto_completo
+    
+    def extraer_texto_hibrido(self, pdf_path: FuentePDF) -> str:
+        """
+        Extrae con pypdf y re-extrae con pdfplumber solo las páginas de baja calidad.
+        
+        Args:
+            pdf_path: Ruta al archivo PDF o stream binario con su contenido
             
-            for i, page in enumerate(pdf.pages, 1):
-                texto = page.extract_text()
-                if texto and texto.strip():
-                    texto_completo.append(texto)
-                print(f"   Página {i}/{num_paginas} procesada", end='\r')
+        Returns:
+            Texto extraído del PDF
+        """
+        return unir_paginas(self.extraer_paginas_hibrido(pdf_path))
+    
+    def extraer_paginas_hibrido(self, pdf_path: FuentePDF) -> List[str]:
+        """Texto de cada página con contenido, con el extractor híbrido."""
+        with _abrir_pdf(pdf_path) as file:
+            reader = pypdf.PdfReader(file)
+            paginas = []
+            for page in reader.pages:
+                try:
+                    paginas.append(page.extract_text() or "")
+                except Exception:
+                    # Página que pypdf no puede decodificar: se delega a pdfplumber
+                    paginas.append("")
+        
+        fallidas = [i for i, texto in enumerate(paginas) if not pagina_aceptable(texto)]
+        print(f"Extraidas {len(paginas)} paginas con pypdf; "
+              f"{len(fallidas)} se re-extraen con pdfplumber")
+        
+        if fallidas:
+            rangos = self._rangos(len(fallidas)) if self._usa_pool() and _es_ruta(pdf_path) else []
+            if len(rangos) < 2:
+                textos = _extraer_paginas_pdfplumber(pdf_path, fallidas)
+            else:
+                pool = obtener_pool_extraccion()
+                futuros = [
+                    pool.submit(_extraer_paginas_pdfplumber, str(pdf_path), fallidas[inicio:fin])
+                    for inicio, fin in rangos
+                ]
+                textos = [texto for futuro in futuros for texto in futuro.result()]
             
-            print()  # Nueva línea después del progreso
+            for i, texto in zip(fallidas, textos):
+                # pdfplumber tampoco saca nada (p. ej. página escaneada): se conserva pypdf
+                if texto.strip():
+                    paginas[i] = texto
         
-        return "\n\n".join(texto_completo)
+        return [texto for texto in paginas if texto.strip()]
     
-    def extraer_texto(self, pdf_path: str, metodo: str = "auto") -> str:
+    def extraer_paginas_varios(
+        self, pdf_paths: List[str], metodo: str = "auto"
+    ) -> Dict[str, Union[List[str], Exception]]:
+        """
+        Extrae el texto de cada página de varios PDFs.
+        
+        Con pdfplumber y extracción paralela, los rangos de páginas de todos
+        los archivos se envían juntos al pool, así que también los PDFs cortos
+        se extraen en paralelo entre sí.
+        
+        Args:
+            pdf_paths: Rutas de los PDFs
+            metodo: "auto", "hibrido", "pypdf" o "pdfplumber"
+            
+        Returns:
+            Diccionario {ruta: páginas}, o {ruta: excepción} si la extracción falló
+        """
+        # El híbrido ya es rápido y manda sus páginas de respaldo al pool por su cuenta
+        usa_pdfplumber = metodo == "pdfplumber" or (
+            metodo == "auto" and PDFPLUMBER_AVAILABLE and not PYPDF_AVAILABLE
+        )
+        if not usa_pdfplumber or not self._usa_pool():
+            textos = {}
+            for pdf_path in pdf_paths:
+                try:
+                    textos[pdf_path] = self.extraer_paginas(pdf_path, metodo=metodo)
+                except Exception as e:
+                    textos[pdf_path] = e
+            return textos
+        
+        print(f"Extrayendo texto de {len(pdf_paths)} PDFs con pdfplumber en paralelo...")
+        pool = obtener_pool_extraccion()
+        tareas = {}
+        for pdf_path in pdf_paths:
+            try:
+                with pdfplumber.open(pdf_path) as pdf:
+                    num_paginas = len(pdf.pages)
+                tareas[pdf_path] = [
+                    pool.submit(_extraer_paginas_pdfplumber, str(pdf_path), range(inicio, fin))
+                    for inicio, fin in self._rangos(num_paginas)
+                ]
+            except Exception as e:
+                tareas[pdf_path] = e
+        
+        textos = {}
+        for pdf_path, futuros in tareas.items():
+            if isinstance(futuros, Exception):
+                textos[pdf_path] = futuros
+                continue
+            try:
+                textos[pdf_path] = [
+                    texto for futuro in futuros for texto in futuro.result() if texto.strip()
+                ]
+            except Exception as e:
+                textos[pdf_path] = e
+        
+        return textos
+    
+    def extraer_texto(self, pdf_path: FuentePDF, metodo: str = "auto") -> str:
         """
         Extrae texto de un PDF usando el método especificado.
         
         Args:
-            pdf_path: Ruta al archivo PDF
-            metodo: "auto", "pypdf" o "pdfplumber"
+            pdf_path: Ruta al archivo PDF o stream binario con su contenido
+            metodo: "auto", "hibrido", "pypdf" o "pdfplumber" ("auto" usa el
+                híbrido si ambas bibliotecas están instaladas)
             
         Returns:
             Texto extraído del PDF
         """
-        if metodo == "auto":
-            # Preferir pdfplumber si está disponible
+        return unir_paginas(self.extraer_paginas(pdf_path, metodo=metodo))
+    
+    def extraer_paginas(self, pdf_path: FuentePDF, metodo: str = "auto") -> List[str]:
+        """
+        Extrae el texto de cada página con contenido (ver extraer_texto).
+        
+        La limpieza con reglas necesita las páginas por separado para
+        reconocer encabezados y pies de página.
+        """
+        if metodo == "hibrido" or (metodo == "auto" and PYPDF_AVAILABLE and PDFPLUMBER_AVAILABLE):
+            if not (PYPDF_AVAILABLE and PDFPLUMBER_AVAILABLE):
+                raise ImportError("La extracción híbrida requiere pypdf y pdfplumber: "
+                                  "pip install pypdf pdfplumber")
+            return self.extraer_paginas_hibrido(pdf_path)
+        elif metodo == "auto":
             if PDFPLUMBER_AVAILABLE:
-                return self.extraer_texto_pdfplumber(pdf_path)
+                return self.extraer_paginas_pdfplumber(pdf_path)
             elif PYPDF_AVAILABLE:
-                return self.extraer_texto_pypdf(pdf_path)
+                return self.extraer_paginas_pypdf(pdf_path)
             else:
                 raise ImportError(
                     "No se encontró ninguna biblioteca de PDF instalada. "
                     "Instala una con: pip install pypdf o pip install pdfplumber"
                 )
         elif metodo == "pypdf":
-            return self.extraer_texto_pypdf(pdf_path)
+            return self.extraer_paginas_pypdf(pdf_path)
         elif metodo == "pdfplumber":
-            return self.extraer_texto_pdfplumber(pdf_path)
+            return self.extraer_paginas_pdfplumber(pdf_path)
         else:
-            raise ValueError(f"Método no válido: {metodo}. Usa 'auto', 'pypdf' o 'pdfplumber'")
+            raise ValueError(f"Método no válido: {metodo}. Usa 'auto', 'hibrido', 'pypdf' o 'pdfplumber'")
     
-    def limpiar_texto(self, texto_crudo: str) -> str:
+    async def _alimpiar_fragmentos(self, entradas: List[str]) -> list:
+        """Limpia todos los fragmentos a la vez en el event loop compartido."""
+        chain = self.prompt | self.llm
+        # Las tareas de gather heredan el carril del contexto en que se crean
+        with usar_carril(self.carril):
+            return await asyncio.gather(*(
+                ainvocar_con_uso(chain, {"texto_crudo": entrada}, "limpieza_pdf", self.model_name)
+                for entrada in entradas
+            ))
+    
+    def _limpiar_con_llm(self, textos: List[str], registros: Optional[List[dict]] = None) -> List[str]:
         """
-        Limpia el texto extraído usando LLM.
+        Limpia textos con el LLM, divididos en fragmentos con solape que se
+        envían todos en paralelo y se vuelven a unir sin el solape repetido.
         
         Args:
-            texto_crudo: Texto extraído del PDF sin procesar
+            textos: Textos a limpiar
+            registros: Lista a la que se agrega el uso de cada llamada (opcional)
+            
+        Returns:
+            Los textos limpios, en el mismo orden
+        """
+        fragmentos = [
+            fragmentar_con_solape(texto, Config.PDF_LIMPIEZA_TOKENS_FRAGMENTO, Config.PDF_LIMPIEZA_SOLAPE_TOKENS)
+            for texto in textos
+        ]
+        entradas = [
+            f"{solape}{separador}{fragmento}" if solape else fragmento
+            for ternas in fragmentos for solape, fragmento, separador in ternas
+        ]
+        if not entradas:
+            return ["" for _ in textos]
+        
+        print(f"🧹 Limpiando {len(entradas)} fragmentos con LLM en paralelo...")
+        resultados = iter(ejecutar_sincrono(self._alimpiar_fragmentos(entradas)))
+        
+        limpios = []
+        for ternas in fragmentos:
+            limpio = ""
+            for solape, _, separador in ternas:
+                respuesta, registro = next(resultados)
+                if registros is not None:
+                    registros.append(registro)
+                parte = quitar_solape(respuesta.content.strip(), solape)
+                limpio = f"{limpio}{separador}{parte}" if limpio else parte
+            limpios.append(limpio)
+        
+        return limpios
+    
+    def limpiar_texto(
+        self, texto_crudo: Union[str, List[str]], registros: Optional[List[dict]] = None
+    ) -> str:
+        """
+        Limpia el texto extraído.
+        
+        Con limpieza "reglas", las reglas locales quitan números de página y
+        encabezados repetidos, unen palabras con guion y líneas de un mismo
+        párrafo; los grupos de párrafos consecutivos que siguen ilegibles se
+        limpian con el LLM. Con "llm", todo el texto va al LLM. Lo que va al
+        LLM se limpia en fragmentos paralelos (ver _limpiar_con_llm).
+        
+        Args:
+            texto_crudo: Texto extraído del PDF sin procesar, o el de cada página
+                (las reglas solo reconocen encabezados y pies con las páginas)
+            registros: Lista a la que se agrega el uso de las llamadas (opcional)
             
         Returns:
             Texto limpio y bien formateado
         """
-        print("🧹 Limpiando texto con LLM...")
+        if self.limpieza == "llm":
+            if not isinstance(texto_crudo, str):
+                texto_crudo = unir_paginas(texto_crudo)
+            return self._limpiar_con_llm([texto_crudo], registros)[0]
+        
+        parrafos = limpiar_con_reglas(texto_crudo)
+        
+        # Agrupar los párrafos ilegibles consecutivos: el LLM ve su contexto
+        # y se hace una llamada por grupo en lugar de una por párrafo
+        grupos = []
+        for i, parrafo in enumerate(parrafos):
+            if not parrafo_ilegible(parrafo):
+                continue
+            if grupos and grupos[-1][-1] == i - 1:
+                grupos[-1].append(i)
+            else:
+                grupos.append([i])
         
-        chain = self.prompt | self.llm
-        respuesta = chain.invoke({"texto_crudo": texto_crudo})
+        print(f"🧹 Texto limpiado con reglas: {len(parrafos)} parrafos, "
+              f"{sum(len(grupo) for grupo in grupos)} ilegibles enviados al LLM")
+        
+        limpios = self._limpiar_con_llm(
+            ["\n\n".join(parrafos[i] for i in grupo) for grupo in grupos], registros
+        ) if grupos else []
+        for grupo, limpio in zip(grupos, limpios):
+            parrafos[grupo[0]] = limpio
+            for i in grupo[1:]:
+                parrafos[i] = ""
         
-        return respuesta.content.strip()
+        return "\n\n".join(parrafo for parrafo in parrafos if parrafo)
     
     def procesar_pdf(
         self, 
         pdf_path: str, 
         output_path: Optional[str] = None,
         metodo: str = "auto",
-        limpiar: bool = True
+        limpiar: bool = True,
+        registros: Optional[List[dict]] = None,
+        paginas_extraidas: Optional[List[str]] = None,
+        contenido: Optional[bytes] = None
     ) -> str:
         """
         Procesa un PDF completo: extrae y opcionalmente limpia el texto.
@@ -186,27 +536,36 @@ class PDFProcessor:
         Args:
             pdf_path: Ruta al archivo PDF
             output_path: Ruta donde guardar el texto limpio (opcional)
-            metodo: Método de extracción ("auto", "pypdf", "pdfplumber")
-            limpiar: Si True, limpia el texto con LLM
+            metodo: Método de extracción ("auto", "hibrido", "pypdf", "pdfplumber")
+            limpiar: Si True, limpia el texto (reglas locales y LLM según self.limpieza)
+            registros: Lista a la que se agrega el uso de las llamadas al LLM (opcional)
+            paginas_extraidas: Texto ya extraído de cada página (omite la extracción)
+            contenido: Bytes del PDF ya en memoria; se extrae de ellos sin volver
+                a leer pdf_path del disco
             
         Returns:
             Texto procesado (limpio o crudo según el parámetro)
         """
         # Validar que el archivo existe
-        if not os.path.exists(pdf_path):
+        if contenido is None and not os.path.exists(pdf_path):
             raise FileNotFoundError(f"No se encontró el archivo: {pdf_path}")
         
         print(f"\nProcesando PDF: {Path(pdf_path).name}")
         print("="*80)
         
         # Extraer texto
-        texto = self.extraer_texto(pdf_path, metodo=metodo)
+        if paginas_extraidas is not None:
+            paginas = paginas_extraidas
+        else:
+            fuente = io.BytesIO(contenido) if contenido is not None else pdf_path
+            paginas = self.extraer_paginas(fuente, metodo=metodo)
+        texto = unir_paginas(paginas)
         
         print(f"Extraidos {len(texto)} caracteres")
         
         # Limpiar si se solicitó
         if limpiar:
-            texto = self.limpiar_texto(texto)
+            texto = self.limpiar_texto(paginas, registros=registros)
             print(f"Texto limpiado: {len(texto)} caracteres")
         
         # Guardar si se especificó ruta de salida
@@ -233,7 +592,7 @@ class PDFProcessor:
             directorio: Directorio con archivos PDF
             output_dir: Directorio donde guardar los textos procesados
             metodo: Método de extracción
-            limpiar: Si True, limpia los textos con LLM
+            limpiar: Si True, limpia los textos (reglas locales y LLM)
             
         Returns:
             Diccionario con {nombre_archivo: texto_procesado}
@@ -253,10 +612,17 @@ class PDFProcessor:
         
         resultados = {}
         
+        # Extraer todos los PDFs de una vez (en paralelo si está activado)
+        textos = self.extraer_paginas_varios([str(pdf_path) for pdf_path in pdfs], metodo=metodo)
+        
         for i, pdf_path in enumerate(pdfs, 1):
             print(f"\n[{i}/{len(pdfs)}] Procesando: {pdf_path.name}")
             
             try:
+                paginas = textos[str(pdf_path)]
+                if isinstance(paginas, Exception):
+                    raise paginas
+                
                 # Generar ruta de salida
                 output_path = Path(output_dir) / f"{pdf_path.stem}.txt"
                 
@@ -265,7 +631,8 @@ class PDFProcessor:
                     str(pdf_path),
                     output_path=str(output_path),
                     metodo=metodo,
-                    limpiar=limpiar
+                    limpiar=limpiar,
+                    paginas_extraidas=paginas
                 )
                 
                 resultados[pdf_path.name] = texto
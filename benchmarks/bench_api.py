@@ -0,0 +1,142 @@
+"""
+Benchmark del flujo /api/evaluate → /api/job-status con el LLM simulado.
+
+Levanta la app con la configuración de testing sobre un directorio temporal
+(base de datos, uploads y PDFs), sube PDFs sintéticos distintos con los
+niveles de concurrencia indicados y consulta /job-status hasta que cada job
+termina. La latencia medida va desde el POST hasta el estado final.
+
+El número de evaluaciones simultáneas lo acota el ThreadPoolExecutor de
+app/api/routes/evaluation.py; la concurrencia del benchmark es la de los
+clientes que suben ensayos.
+
+Uso:
+    python benchmarks/bench_api.py [--ensayos N] [--concurrencia 1 4 8]
+        [--intervalo 0.05] [--latencia-ms 800] [--salida resultados.json]
+"""
+import time
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import (
+    agregar_argumentos_llm,
+    configurar_llm_simulado,
+    ejecutar_concurrente,
+    generar_ensayo,
+    generar_pdf,
+    guardar_resultados,
+    imprimir_resumen,
+    resumir_ejecucion
+)
+from app.config import Config, TestingConfig
+
+ESTADOS_FINALES = ('completed', 'error')
+
+
+def crear_app_benchmark(directorio: Path):
+    """Crea la app de testing con datos en `directorio` y sin rate limiting."""
+    TestingConfig.DATABASE_PATH = directorio / 'benchmark.db'
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{TestingConfig.DATABASE_PATH}"
+    TestingConfig.UPLOAD_FOLDER = directorio / 'uploads'
+    TestingConfig.PERMANENT_PDF_FOLDER = directorio / 'pdfs'
+    TestingConfig.PERMANENT_ANEXO_FOLDER = directorio / 'anexos'
+    TestingConfig.RATELIMIT_ENABLED = False
+    # El evaluador de las rutas lee Config al importarse
+    Config.CHECKPOINTS_EVALUACION_PATH = directorio / 'checkpoints_evaluacion.db'
+
+    # Se importa aquí: las rutas construyen el evaluador al importarse
+    from run import create_app
+    return create_app('testing')
+
+
+def evaluar_por_api(app, token: str, ruta_pdf: Path, intervalo: float, estados: Counter):
+    """Sube un PDF y consulta el job hasta su estado final."""
+    cliente = app.test_client()
+    cabeceras = {'Authorization': f'Bearer {token}'}
+
+    with open(ruta_pdf, 'rb') as f:
+        respuesta = cliente.post('/api/evaluate', headers=cabeceras,
+                                 data={'file': (f, ruta_pdf.name)},
+                                 content_type='multipart/form-data')
+
+    if respuesta.status_code == 200:
+        estados['cache_hit'] += 1
+        return
+    if respuesta.status_code != 202:
+        estados[f'http_{respuesta.status_code}'] += 1
+        raise RuntimeError(respuesta.get_json().get('error', respuesta.status_code))
+
+    job_id = respuesta.get_json()['job_id']
+    while True:
+        estado = cliente.get(f'/api/job-status/{job_id}', headers=cabeceras).get_json()
+        if estado['status'] in ESTADOS_FINALES:
+            break
+        time.sleep(intervalo)
+
+    estados[estado['status']] += 1
+    if estado['status'] == 'error':
+        raise RuntimeError(estado['error'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del flujo evaluate/job-status de la API")
+    parser.add_argument('--ensayos', type=int, default=12, help="Ensayos por nivel de concurrencia")
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 4, 8],
+                        help="Clientes simultáneos a medir")
+    parser.add_argument('--intervalo', type=float, default=0.05,
+                        help="Segundos entre consultas a /job-status")
+    agregar_argumentos_llm(parser)
+    args = parser.parse_args()
+
+    backend = configurar_llm_simulado(args)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE LA API ({args.ensayos} ensayos por nivel)")
+    print("=" * 80)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        app = crear_app_benchmark(directorio)
+
+        from app.api.middleware import auth_manager
+        token = auth_manager.generate_token('benchmark', 'benchmark')
+
+        # PDFs distintos en cada nivel para no acertar en la caché por hash
+        semilla = 0
+        for concurrencia in args.concurrencia:
+            rutas = []
+            for _ in range(args.ensayos):
+                ruta = directorio / f"Ensayo_{semilla}.pdf"
+                generar_pdf(ruta, generar_ensayo(semilla))
+                rutas.append(ruta)
+                semilla += 1
+
+            estados = Counter()
+            ejecucion = ejecutar_concurrente(
+                lambda ruta: evaluar_por_api(app, token, ruta, args.intervalo, estados),
+                rutas, concurrencia
+            )
+            resumen = resumir_ejecucion(ejecucion, concurrencia)
+            resumen['estados'] = dict(estados)
+            resultados.append(resumen)
+
+    print()
+    for resumen in resultados:
+        imprimir_resumen(f"concurrencia {resumen['concurrencia']:>3}", resumen)
+        print(f"   estados: {resumen['estados']}")
+
+    guardar_resultados('api', {
+        'ensayos': args.ensayos,
+        'intervalo': args.intervalo,
+        **backend
+    }, resultados, args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark de EvaluadorEnsayos.evaluar con el LLM simulado.
+
+Evalúa N ensayos sintéticos con cada nivel de concurrencia indicado y
+reporta rendimiento, percentiles de latencia de extremo a extremo y
+percentiles por nodo del grafo (criterios y síntesis).
+
+Uso:
+    python benchmarks/bench_evaluador.py [--ensayos N] [--concurrencia 1 4 8]
+        [--modo preciso|fusionado] [--cascada] [--latencia-ms 800] [--salida resultados.json]
+"""
+import argparse
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import (
+    agregar_argumentos_llm,
+    configurar_llm_simulado,
+    ejecutar_concurrente,
+    generar_ensayo,
+    guardar_resultados,
+    imprimir_resumen,
+    resumir_ejecucion
+)
+from app.core.evaluator import EvaluadorEnsayos, MODOS_EVALUACION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del evaluador de ensayos")
+    parser.add_argument('--ensayos', type=int, default=20, help="Ensayos por nivel de concurrencia")
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 4, 8],
+                        help="Niveles de concurrencia a medir")
+    parser.add_argument('--modo', choices=MODOS_EVALUACION, default="preciso", help="Modo de evaluación")
+    parser.add_argument('--cascada', action='store_true',
+                        help="Evaluar en cascada (modelo económico y escalamiento)")
+    agregar_argumentos_llm(parser)
+    args = parser.parse_args()
+
+    backend = configurar_llm_simulado(args)
+    ensayos = [generar_ensayo(i) for i in range(args.ensayos)]
+
+    print("=" * 80)
+    print(f"BENCHMARK DEL EVALUADOR ({args.ensayos} ensayos, modo {args.modo})")
+    print("=" * 80)
+
+    resultados = []
+    for concurrencia in args.concurrencia:
+        # Evaluador nuevo por nivel para que los histogramas no se mezclen
+        evaluador = EvaluadorEnsayos(modo=args.modo, cascada=args.cascada)
+        ejecucion = ejecutar_concurrente(evaluador.evaluar, ensayos, concurrencia)
+
+        resumen = resumir_ejecucion(ejecucion, concurrencia)
+        resumen['latencia_por_nodo'] = evaluador.latencias.resumen()
+        if args.cascada:
+            resumen['cascada'] = evaluador.estadisticas_cascada()
+        resultados.append(resumen)
+
+        imprimir_resumen(f"concurrencia {concurrencia:>3}", resumen)
+        for nodo, valores in resumen['latencia_por_nodo'].items():
+            print(f"   {nodo:>22}: p50 {valores['p50_ms']} ms, p95 {valores['p95_ms']} ms, "
+                  f"p99 {valores['p99_ms']} ms ({valores['muestras']} muestras)")
+
+    guardar_resultados('evaluador', {
+        'ensayos': args.ensayos,
+        'modo': args.modo,
+        'cascada': args.cascada,
+        **backend
+    }, resultados, args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark de la extracción de texto: pdfplumber secuencial, pdfplumber en el
+pool de procesos y el extractor híbrido (pypdf con respaldo de pdfplumber por
+página), para PDFs sintéticos de distinto número de páginas.
+
+No llama al LLM. El pool se calienta antes de medir, porque el arranque de
+los workers se paga una sola vez por proceso.
+
+Uso:
+    python benchmarks/bench_extraccion.py [--paginas 2 8 32] [--repeticiones 3]
+        [--procesos 4] [--salida resultados.json]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import generar_ensayo, generar_pdf, guardar_resultados
+from app.config import Config
+from app.utils.pdf_processor import PDFProcessor, obtener_pool_extraccion
+
+# Párrafos de 120 palabras que caben en una página carta de reportlab
+PARRAFOS_POR_PAGINA = 4
+
+
+def medir(extraer, ruta: str, repeticiones: int) -> float:
+    """Mediana en ms de extraer el PDF `repeticiones` veces."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        extraer(ruta)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(sorted(tiempos)[len(tiempos) // 2], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la extracción de PDFs")
+    parser.add_argument('--paginas', type=int, nargs='+', default=[2, 8, 32],
+                        help="Páginas aproximadas de cada PDF sintético")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Extracciones por PDF y modo")
+    parser.add_argument('--procesos', type=int, default=Config.PDF_PROCESOS_EXTRACCION,
+                        help="Procesos del pool de extracción")
+    parser.add_argument('--salida', default=None, help="Ruta del JSON con los resultados")
+    args = parser.parse_args()
+
+    Config.PDF_PROCESOS_EXTRACCION = args.procesos
+    Config.LLM_BACKEND = "simulado"  # PDFProcessor construye su modelo aunque no se use
+    secuencial = PDFProcessor(extraccion_paralela=False)
+    paralelo = PDFProcessor(extraccion_paralela=True)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE EXTRACCIÓN DE PDF ({args.procesos} procesos, "
+          f"{Config.PDF_PAGINAS_POR_PROCESO} páginas mínimas por proceso)")
+    print("=" * 80)
+
+    # Calentar el pool: arrancar los workers no forma parte de cada extracción
+    list(obtener_pool_extraccion().map(abs, range(args.procesos)))
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for paginas in args.paginas:
+            ruta = Path(directorio) / f"Ensayo_{paginas}.pdf"
+            generar_pdf(ruta, generar_ensayo(paginas, parrafos=paginas * PARRAFOS_POR_PAGINA))
+
+            ms_secuencial = medir(secuencial.extraer_texto_pdfplumber, str(ruta), args.repeticiones)
+            ms_paralelo = medir(paralelo.extraer_texto_pdfplumber, str(ruta), args.repeticiones)
+            ms_hibrido = medir(paralelo.extraer_texto_hibrido, str(ruta), args.repeticiones)
+            resultados.append({
+                'paginas': paginas,
+                'secuencial_ms': ms_secuencial,
+                'paralelo_ms': ms_paralelo,
+                'hibrido_ms': ms_hibrido,
+                'aceleracion': round(ms_secuencial / ms_paralelo, 2) if ms_paralelo else None,
+                'aceleracion_hibrido': round(ms_secuencial / ms_hibrido, 2) if ms_hibrido else None
+            })
+
+    print()
+    for resultado in resultados:
+        print(f"~{resultado['paginas']:>3} páginas: secuencial {resultado['secuencial_ms']} ms, "
+              f"paralelo {resultado['paralelo_ms']} ms (x{resultado['aceleracion']}), "
+              f"híbrido {resultado['hibrido_ms']} ms (x{resultado['aceleracion_hibrido']})")
+
+    guardar_resultados('extraccion', {
+        'paginas': args.paginas,
+        'repeticiones': args.repeticiones,
+        'procesos': args.procesos,
+        'paginas_por_proceso': Config.PDF_PAGINAS_POR_PROCESO
+    }, resultados, args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark de los modos de evaluación "preciso" y "fusionado".
+
+Evalúa el mismo corpus de ensayos con ambos modos y el LLM simulado, y
+compara tokens consumidos (incluidos los cacheados por el proveedor),
+tiempo de pared y la deriva de calificaciones del modo fusionado respecto
+al modo preciso. Con el backend simulado las calificaciones son de relleno:
+la deriva solo tiene sentido midiendo contra el proveedor real.
+
+Uso:
+    python benchmarks/bench_modos.py [--ensayos N] [--directorio data/processed]
+        [--latencia-ms 800] [--salida resultados.json]
+"""
+import time
+import argparse
+from pathlib import Path
+from statistics import mean
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import (
+    agregar_argumentos_corpus,
+    agregar_argumentos_llm,
+    cargar_ensayos,
+    configurar_llm_simulado,
+    guardar_resultados
+)
+from app.core.evaluator import CRITERIOS, EvaluadorEnsayos
+
+
+def evaluar_con_metricas(evaluador: EvaluadorEnsayos, texto: str, modo: str) -> dict:
+    """Evalúa un ensayo en el modo indicado y mide tokens y tiempo de pared."""
+    inicio = time.perf_counter()
+    evaluacion = evaluador.evaluar(texto, modo=modo)
+    segundos = time.perf_counter() - inicio
+
+    uso = evaluacion.resumen_uso_tokens()
+
+    return {
+        'segundos': round(segundos, 2),
+        'tokens_entrada': uso['tokens_entrada'],
+        'tokens_salida': uso['tokens_salida'],
+        'tokens_cacheados': uso['tokens_cacheados'],
+        'puntuacion_total': evaluacion.puntuacion_total,
+        'calificaciones': {c: getattr(evaluacion, c).calificacion for c in CRITERIOS}
+    }
+
+
+def resumir(resultados: list, modo: str) -> dict:
+    """Promedia las métricas de un modo sobre todo el corpus."""
+    return {
+        'segundos_promedio': round(mean(r[modo]['segundos'] for r in resultados), 2),
+        'tokens_entrada_promedio': round(mean(r[modo]['tokens_entrada'] for r in resultados)),
+        'tokens_salida_promedio': round(mean(r[modo]['tokens_salida'] for r in resultados)),
+        'tokens_cacheados_promedio': round(mean(r[modo]['tokens_cacheados'] for r in resultados)),
+        'tokens_entrada_total': sum(r[modo]['tokens_entrada'] for r in resultados),
+        'tokens_salida_total': sum(r[modo]['tokens_salida'] for r in resultados)
+    }
+
+
+def calcular_deriva(resultados: list) -> dict:
+    """Calcula la deriva de calificaciones del modo fusionado respecto al preciso."""
+    deriva = {}
+
+    for criterio in CRITERIOS:
+        diferencias = [
+            r['fusionado']['calificaciones'][criterio] - r['preciso']['calificaciones'][criterio]
+            for r in resultados
+        ]
+        deriva[criterio] = {
+            'diferencia_media': round(mean(diferencias), 2),
+            'diferencia_absoluta_media': round(mean(abs(d) for d in diferencias), 2),
+            'diferencia_maxima': max(abs(d) for d in diferencias),
+            'coincidencias': sum(1 for d in diferencias if d == 0)
+        }
+
+    diferencias_total = [
+        r['fusionado']['puntuacion_total'] - r['preciso']['puntuacion_total']
+        for r in resultados
+    ]
+    deriva['puntuacion_total'] = {
+        'diferencia_media': round(mean(diferencias_total), 2),
+        'diferencia_absoluta_media': round(mean(abs(d) for d in diferencias_total), 2),
+        'diferencia_maxima': round(max(abs(d) for d in diferencias_total), 2)
+    }
+
+    return deriva
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los modos de evaluación preciso y fusionado")
+    agregar_argumentos_corpus(parser)
+    agregar_argumentos_llm(parser)
+    args = parser.parse_args()
+
+    backend = configurar_llm_simulado(args)
+    ensayos = cargar_ensayos(args)
+
+    if not ensayos:
+        print(f"ERROR: No se encontraron ensayos en {args.directorio}")
+        return
+
+    print("=" * 80)
+    print(f"BENCHMARK DE MODOS DE EVALUACIÓN ({len(ensayos)} ensayos)")
+    print("=" * 80)
+
+    evaluador = EvaluadorEnsayos()
+    resultados = []
+
+    for i, (nombre, texto) in enumerate(ensayos, 1):
+        print(f"\n[{i}/{len(ensayos)}] {nombre}")
+
+        try:
+            resultado = {
+                'ensayo': nombre,
+                'preciso': evaluar_con_metricas(evaluador, texto, 'preciso'),
+                'fusionado': evaluar_con_metricas(evaluador, texto, 'fusionado')
+            }
+        except Exception as e:
+            print(f"ERROR: Evaluando {nombre}: {e}")
+            continue
+
+        resultados.append(resultado)
+        print(f"   preciso:   {resultado['preciso']['segundos']}s, "
+              f"{resultado['preciso']['tokens_entrada']} tokens de entrada, "
+              f"total {resultado['preciso']['puntuacion_total']}")
+        print(f"   fusionado: {resultado['fusionado']['segundos']}s, "
+              f"{resultado['fusionado']['tokens_entrada']} tokens de entrada, "
+              f"total {resultado['fusionado']['puntuacion_total']}")
+
+    if not resultados:
+        print("ERROR: Ningún ensayo pudo evaluarse")
+        return
+
+    resumen = {
+        'preciso': resumir(resultados, 'preciso'),
+        'fusionado': resumir(resultados, 'fusionado'),
+        'deriva': calcular_deriva(resultados),
+        'detalle': resultados
+    }
+
+    print("\n" + "=" * 80)
+    print("RESUMEN")
+    print("=" * 80)
+    for modo in ('preciso', 'fusionado'):
+        print(f"{modo:>10}: {resumen[modo]['segundos_promedio']}s promedio, "
+              f"{resumen[modo]['tokens_entrada_promedio']} tokens de entrada "
+              f"({resumen[modo]['tokens_cacheados_promedio']} cacheados), "
+              f"{resumen[modo]['tokens_salida_promedio']} tokens de salida")
+    print("\nDeriva (fusionado - preciso):")
+    for criterio, valores in resumen['deriva'].items():
+        print(f"   {criterio:<22} media {valores['diferencia_media']:+.2f}, "
+              f"|media| {valores['diferencia_absoluta_media']:.2f}, "
+              f"máx {valores['diferencia_maxima']}")
+
+    guardar_resultados('modos', {
+        'ensayos': len(resultados),
+        'directorio': args.directorio,
+        **backend
+    }, resumen, args.salida)
+
+
+if __name__ == "__main__":
+    main()
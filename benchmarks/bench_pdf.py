@@ -0,0 +1,80 @@
+"""
+Benchmark de PDFProcessor.procesar_pdf con el LLM simulado.
+
+Genera PDFs sintéticos y mide extracción y limpieza de cada uno con los
+niveles de concurrencia indicados.
+
+Uso:
+    python benchmarks/bench_pdf.py [--pdfs N] [--parrafos 6] [--concurrencia 1 4]
+        [--sin-limpieza] [--limpieza reglas|llm] [--ms-por-token 10]
+        [--latencia-ms 800] [--salida resultados.json]
+"""
+import argparse
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import (
+    agregar_argumentos_llm,
+    configurar_llm_simulado,
+    ejecutar_concurrente,
+    generar_ensayo,
+    generar_pdf,
+    guardar_resultados,
+    imprimir_resumen,
+    resumir_ejecucion
+)
+from app.utils.pdf_processor import MODOS_LIMPIEZA, PDFProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del procesamiento de PDFs")
+    parser.add_argument('--pdfs', type=int, default=10, help="PDFs por nivel de concurrencia")
+    parser.add_argument('--parrafos', type=int, default=6, help="Párrafos de cada PDF sintético")
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 4],
+                        help="Niveles de concurrencia a medir")
+    parser.add_argument('--sin-limpieza', action='store_true', help="Medir solo la extracción de texto")
+    parser.add_argument('--limpieza', choices=MODOS_LIMPIEZA, default=None,
+                        help="Modo de limpieza (por defecto, PDF_LIMPIEZA)")
+    agregar_argumentos_llm(parser)
+    args = parser.parse_args()
+
+    backend = configurar_llm_simulado(args)
+    procesador = PDFProcessor(limpieza=args.limpieza)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE PROCESAMIENTO DE PDF ({args.pdfs} PDFs, limpieza: {not args.sin_limpieza})")
+    print("=" * 80)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = []
+        for i in range(args.pdfs):
+            ruta = Path(directorio) / f"Ensayo_{i}.pdf"
+            generar_pdf(ruta, generar_ensayo(i, parrafos=args.parrafos))
+            rutas.append(str(ruta))
+
+        for concurrencia in args.concurrencia:
+            ejecucion = ejecutar_concurrente(
+                lambda ruta: procesador.procesar_pdf(ruta, limpiar=not args.sin_limpieza),
+                rutas, concurrencia
+            )
+            resumen = resumir_ejecucion(ejecucion, concurrencia)
+            resultados.append(resumen)
+
+    print()
+    for resumen in resultados:
+        imprimir_resumen(f"concurrencia {resumen['concurrencia']:>3}", resumen)
+
+    guardar_resultados('pdf', {
+        'pdfs': args.pdfs,
+        'parrafos': args.parrafos,
+        'limpieza': None if args.sin_limpieza else procesador.limpieza,
+        **backend
+    }, resultados, args.salida)
+
+
+if __name__ == "__main__":
+    main()
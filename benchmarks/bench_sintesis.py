@@ -0,0 +1,116 @@
+"""
+Benchmark del contexto del paso de síntesis (comentario general).
+
+Evalúa el mismo corpus con los contextos "completo", "extracto" y "ninguno"
+y el LLM simulado. Los criterios se guardan en una caché en memoria, así que
+solo se pagan una vez por ensayo y cada contexto vuelve a ejecutar
+únicamente la síntesis. Compara tokens de entrada y salida y latencia de
+esa llamada.
+
+Uso:
+    python benchmarks/bench_sintesis.py [--ensayos N] [--directorio data/processed]
+        [--latencia-ms 800] [--salida resultados.json]
+"""
+import argparse
+from pathlib import Path
+from statistics import mean
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.comun import (
+    agregar_argumentos_corpus,
+    agregar_argumentos_llm,
+    cargar_ensayos,
+    configurar_llm_simulado,
+    guardar_resultados
+)
+from app.core.cache import CacheEvaluaciones
+from app.core.evaluator import EvaluadorEnsayos, MODOS_CONTEXTO_SINTESIS
+
+
+def evaluar_sintesis(evaluador: EvaluadorEnsayos, texto: str, contexto: str) -> dict:
+    """Evalúa un ensayo con el contexto de síntesis indicado y mide solo la síntesis."""
+    evaluacion = evaluador.evaluar(texto, modo="preciso", contexto_sintesis=contexto)
+    uso = evaluacion.uso_tokens["comentario_general"]
+
+    return {
+        'tokens_entrada': uso['tokens_entrada'],
+        'tokens_salida': uso['tokens_salida'],
+        'latencia_ms': uso.get('latencia_ms', 0),
+        'palabras_comentario': len(evaluacion.comentario_general.split())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los contextos del paso de síntesis")
+    agregar_argumentos_corpus(parser)
+    agregar_argumentos_llm(parser)
+    args = parser.parse_args()
+
+    backend = configurar_llm_simulado(args)
+    ensayos = cargar_ensayos(args)
+
+    if not ensayos:
+        print(f"ERROR: No se encontraron ensayos en {args.directorio}")
+        return
+
+    print("=" * 80)
+    print(f"BENCHMARK DEL CONTEXTO DE SÍNTESIS ({len(ensayos)} ensayos)")
+    print("=" * 80)
+
+    # Caché volátil: los criterios se evalúan una sola vez por ensayo
+    evaluador = EvaluadorEnsayos(cache=CacheEvaluaciones(":memory:"))
+    resultados = []
+
+    for i, (nombre, texto) in enumerate(ensayos, 1):
+        print(f"\n[{i}/{len(ensayos)}] {nombre}")
+
+        try:
+            resultado = {'ensayo': nombre}
+            for contexto in MODOS_CONTEXTO_SINTESIS:
+                resultado[contexto] = evaluar_sintesis(evaluador, texto, contexto)
+        except Exception as e:
+            print(f"ERROR: Evaluando {nombre}: {e}")
+            continue
+
+        resultados.append(resultado)
+        for contexto in MODOS_CONTEXTO_SINTESIS:
+            print(f"   {contexto:>9}: {resultado[contexto]['tokens_entrada']} tokens de entrada, "
+                  f"{resultado[contexto]['tokens_salida']} de salida, {resultado[contexto]['latencia_ms']} ms")
+
+    if not resultados:
+        print("ERROR: Ningún ensayo pudo evaluarse")
+        return
+
+    resumen = {
+        'contextos': {
+            contexto: {
+                'tokens_entrada_promedio': round(mean(r[contexto]['tokens_entrada'] for r in resultados)),
+                'tokens_salida_promedio': round(mean(r[contexto]['tokens_salida'] for r in resultados)),
+                'latencia_ms_promedio': round(mean(r[contexto]['latencia_ms'] for r in resultados)),
+                'latencia_ms_maxima': max(r[contexto]['latencia_ms'] for r in resultados),
+                'palabras_comentario_promedio': round(mean(r[contexto]['palabras_comentario'] for r in resultados))
+            }
+            for contexto in MODOS_CONTEXTO_SINTESIS
+        },
+        'detalle': resultados
+    }
+
+    print("\n" + "=" * 80)
+    print("RESUMEN")
+    print("=" * 80)
+    for contexto, valores in resumen['contextos'].items():
+        print(f"{contexto:>9}: {valores['tokens_entrada_promedio']} tokens de entrada, "
+              f"{valores['tokens_salida_promedio']} de salida, "
+              f"{valores['latencia_ms_promedio']} ms promedio (máx {valores['latencia_ms_maxima']} ms)")
+
+    guardar_resultados('sintesis', {
+        'ensayos': len(resultados),
+        'directorio': args.directorio,
+        **backend
+    }, resumen, args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Configuran el backend simulado del LLM (sin red ni costo), generan ensayos
+y PDFs sintéticos, ejecutan cargas con concurrencia acotada y guardan los
+resultados como JSON junto con el commit, para comparar regresiones entre
+versiones.
+"""
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RAIZ_PROYECTO = Path(__file__).parent.parent
+
+# Agregar la raíz del proyecto al path
+sys.path.insert(0, str(RAIZ_PROYECTO))
+
+from app.config import Config
+from app.core.latencia import HistogramaLatencia
+
+_PALABRAS = (
+    "la inteligencia artificial transforma educación comunidad bienestar datos "
+    "responsabilidad ética sociedad futuro innovación aprendizaje colaboración "
+    "tecnología impacto justicia acceso conocimiento herramienta desarrollo "
+    "sostenible jóvenes oportunidad riesgo transparencia decisión humana"
+).split()
+
+
+def agregar_argumentos_llm(parser):
+    """Agrega al parser los argumentos del backend simulado."""
+    parser.add_argument('--latencia-ms', type=float, default=Config.LLM_SIMULADO_LATENCIA_MS,
+                        help="Mediana de la latencia simulada por llamada al LLM")
+    parser.add_argument('--dispersion', type=float, default=Config.LLM_SIMULADO_DISPERSION,
+                        help="Sigma de la latencia log-normal simulada")
+    parser.add_argument('--tasa-error', type=float, default=Config.LLM_SIMULADO_TASA_ERROR,
+                        help="Fracción de llamadas simuladas que fallan con 500")
+    parser.add_argument('--ms-por-token', type=float, default=Config.LLM_SIMULADO_MS_POR_TOKEN_SALIDA,
+                        help="Tiempo simulado de generación por token de salida")
+    parser.add_argument('--salida', default=None, help="Ruta del JSON con los resultados")
+
+
+def configurar_llm_simulado(args) -> Dict[str, Any]:
+    """
+    Fuerza el backend simulado y desactiva la caché de evaluaciones.
+
+    Debe llamarse antes de construir evaluadores o importar las rutas de la
+    API, que crean sus modelos al importarse.
+
+    Returns:
+        Parámetros del backend, para incluirlos en los resultados
+    """
+    Config.LLM_BACKEND = "simulado"
+    Config.LLM_SIMULADO_LATENCIA_MS = args.latencia_ms
+    Config.LLM_SIMULADO_DISPERSION = args.dispersion
+    Config.LLM_SIMULADO_TASA_ERROR = args.tasa_error
+    Config.LLM_SIMULADO_MS_POR_TOKEN_SALIDA = args.ms_por_token
+    Config.CACHE_EVALUACIONES = False
+
+    return {
+        'backend': Config.LLM_BACKEND,
+        'latencia_ms': args.latencia_ms,
+        'dispersion': args.dispersion,
+        'tasa_error': args.tasa_error,
+        'ms_por_token_salida': args.ms_por_token
+    }
+
+
+def generar_ensayo(semilla: int, parrafos: int = 6, palabras_por_parrafo: int = 120) -> str:
+    """Genera un ensayo sintético reproducible (distinto para cada semilla)."""
+    azar = random.Random(semilla)
+    texto = [f"Ensayo sintético número {semilla}."]
+    for _ in range(parrafos):
+        palabras = [azar.choice(_PALABRAS) for _ in range(palabras_por_parrafo)]
+        oraciones = [" ".join(palabras[i:i + 15]).capitalize() + "." for i in range(0, len(palabras), 15)]
+        texto.append(" ".join(oraciones))
+    return "\n\n".join(texto)
+
+
+def agregar_argumentos_corpus(parser, ensayos: int = 10):
+    """Agrega al parser los argumentos del corpus de ensayos a evaluar."""
+    parser.add_argument('--ensayos', type=int, default=ensayos, help="Número de ensayos a evaluar")
+    parser.add_argument('--directorio', default=None,
+                        help="Directorio con ensayos .txt ya procesados (por defecto, ensayos sintéticos)")
+
+
+def cargar_ensayos(args) -> List[Tuple[str, str]]:
+    """
+    Corpus del benchmark: los primeros Ensayo_*.txt de --directorio o, sin
+    directorio, ensayos sintéticos.
+
+    Returns:
+        Pares (nombre, texto)
+    """
+    if args.directorio is None:
+        return [(f"sintetico_{i}", generar_ensayo(i)) for i in range(args.ensayos)]
+
+    rutas = sorted(Path(args.directorio).glob('Ensayo_*.txt'))[:args.ensayos]
+    return [(ruta.name, ruta.read_text(encoding='utf-8').strip()) for ruta in rutas]
+
+
+def generar_pdf(ruta: Path, texto: str):
+    """Escribe el texto en un PDF de una o más páginas con reportlab."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    estilos = getSampleStyleSheet()
+    contenido = []
+    for parrafo in texto.split("\n\n"):
+        contenido.append(Paragraph(parrafo, estilos['Normal']))
+        contenido.append(Spacer(1, 12))
+
+    SimpleDocTemplate(str(ruta), pagesize=letter).build(contenido)
+
+
+def ejecutar_concurrente(funcion: Callable[[Any], Any], elementos: List[Any],
+                         concurrencia: int) -> Dict[str, Any]:
+    """
+    Ejecuta `funcion` sobre cada elemento con a lo sumo `concurrencia` hilos.
+
+    Returns:
+        Dict con las latencias de las ejecuciones exitosas, los errores y el
+        tiempo de pared total
+    """
+    latencias = []
+    errores = []
+
+    def medir(elemento):
+        inicio = time.perf_counter()
+        try:
+            funcion(elemento)
+        except Exception as e:
+            errores.append(f"{type(e).__name__}: {e}")
+            return
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(medir, elementos))
+
+    return {'latencias': latencias, 'errores': errores, 'segundos': time.perf_counter() - inicio}
+
+
+def resumir_latencias(latencias: List[float]) -> Dict[str, Optional[float]]:
+    """Percentiles 50, 95 y 99 (en ms) con el mismo cálculo que los histogramas del evaluador."""
+    histograma = HistogramaLatencia(tamano_ventana=max(1, len(latencias)))
+    for segundos in latencias:
+        histograma.registrar(segundos)
+    return histograma.resumen()
+
+
+def resumir_ejecucion(ejecucion: Dict[str, Any], concurrencia: int) -> Dict[str, Any]:
+    """Resumen de una ejecución de ejecutar_concurrente."""
+    completadas = len(ejecucion['latencias'])
+    return {
+        'concurrencia': concurrencia,
+        'completadas': completadas,
+        'errores': len(ejecucion['errores']),
+        'segundos': round(ejecucion['segundos'], 3),
+        'rendimiento_por_segundo': round(completadas / ejecucion['segundos'], 3) if ejecucion['segundos'] else None,
+        'latencia': resumir_latencias(ejecucion['latencias']),
+        'ejemplos_error': ejecucion['errores'][:5]
+    }
+
+
+def memoria_pico_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso (RSS pico) en MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(pico / divisor, 1)
+
+
+def commit_actual() -> Optional[str]:
+    """Hash del commit de git del árbol medido, si está disponible."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=RAIZ_PROYECTO, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def guardar_resultados(benchmark: str, parametros: Dict[str, Any], resultados: Any,
+                       ruta: Optional[str]) -> Dict[str, Any]:
+    """
+    Agrega los metadatos de la ejecución y guarda el JSON si se indicó ruta.
+
+    Returns:
+        El documento completo con metadatos y resultados
+    """
+    documento = {
+        'benchmark': benchmark,
+        'commit': commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': parametros,
+        'resultados': resultados,
+        'memoria_pico_mb': memoria_pico_mb()
+    }
+
+    if ruta:
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en: {ruta}")
+
+    return documento
+
+
+def imprimir_resumen(titulo: str, resumen: Dict[str, Any]):
+    """Imprime una línea por ejecución con rendimiento y percentiles."""
+    latencia = resumen['latencia']
+    print(f"{titulo}: {resumen['completadas']} ok, {resumen['errores']} errores en {resumen['segundos']} s "
+          f"({resumen['rendimiento_por_segundo']}/s) | p50 {latencia['p50_ms']} ms, "
+          f"p95 {latencia['p95_ms']} ms, p99 {latencia['p99_ms']} ms")
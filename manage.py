@@ -9,6 +9,7 @@ Comandos disponibles:
   python manage.py downgrade   - Revertir última migración
   python manage.py history     - Ver historial de migraciones
   python manage.py current     - Ver versión actual de BD
+  python manage.py indexar-duplicados - Indexar firmas MinHash de ensayos existentes
 """
 import sys
 import os
@@ -54,6 +55,7 @@ Comandos disponibles:
   downgrade         Revertir la ultima migracion
   history           Ver historial de migraciones
   current           Ver version actual de la base de datos
+  indexar-duplicados Calcular la firma MinHash de los ensayos sin indexar
   help              Mostrar esta ayuda
 
 Ejemplos:
@@ -131,6 +133,15 @@ if __name__ == '__main__':
                 from flask_migrate import history as flask_history
                 flask_history()
                 
+            elif command == 'indexar-duplicados':
+                print("Indexando firmas MinHash de ensayos existentes...")
+                from app.database.models import Ensayo, FirmaMinHash, indexar_firma_minhash
+                pendientes = Ensayo.query.outerjoin(FirmaMinHash).filter(FirmaMinHash.id.is_(None)).all()
+                for ensayo in pendientes:
+                    indexar_firma_minhash(ensayo.id, ensayo.texto_completo, commit=False)
+                db.session.commit()
+                print(f"{len(pendientes)} ensayos indexados")
+                
             else:
                 print(f"ERROR: Comando desconocido: {command}")
                 print("Usa 'python manage.py help' para ver comandos disponibles")
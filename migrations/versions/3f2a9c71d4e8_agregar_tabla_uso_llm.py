@@ -0,0 +1,55 @@
+"""Agregar tabla uso_llm para contabilidad de llamadas al LLM
+
+Revision ID: 3f2a9c71d4e8
+Revises: 9184783d9075
+Create Date: 2026-10-17 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c71d4e8'
+down_revision = '9184783d9075'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'uso_llm',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ensayo_id', sa.Integer(), nullable=True),
+        sa.Column('ensayos_ids', sa.JSON(), nullable=True),
+        sa.Column('operacion', sa.String(length=50), nullable=False),
+        sa.Column('nodo', sa.String(length=100), nullable=False),
+        sa.Column('modelo', sa.String(length=100), nullable=False),
+        sa.Column('tokens_entrada', sa.Integer(), nullable=False),
+        sa.Column('tokens_salida', sa.Integer(), nullable=False),
+        sa.Column('tokens_cacheados', sa.Integer(), nullable=False),
+        sa.Column('latencia_ms', sa.Integer(), nullable=False),
+        sa.Column('costo_usd', sa.Float(), nullable=True),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ensayo_id'], ['ensayos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('uso_llm', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_uso_llm_ensayo_id'), ['ensayo_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_uso_llm_operacion'), ['operacion'], unique=False)
+        batch_op.create_index(batch_op.f('ix_uso_llm_nodo'), ['nodo'], unique=False)
+        batch_op.create_index(batch_op.f('ix_uso_llm_fecha'), ['fecha'], unique=False)
+        batch_op.create_index('idx_uso_ensayo_nodo', ['ensayo_id', 'nodo'], unique=False)
+        batch_op.create_index('idx_uso_operacion_fecha', ['operacion', 'fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uso_llm', schema=None) as batch_op:
+        batch_op.drop_index('idx_uso_operacion_fecha')
+        batch_op.drop_index('idx_uso_ensayo_nodo')
+        batch_op.drop_index(batch_op.f('ix_uso_llm_fecha'))
+        batch_op.drop_index(batch_op.f('ix_uso_llm_nodo'))
+        batch_op.drop_index(batch_op.f('ix_uso_llm_operacion'))
+        batch_op.drop_index(batch_op.f('ix_uso_llm_ensayo_id'))
+
+    op.drop_table('uso_llm')
@@ -0,0 +1,40 @@
+"""Agregar tabla archivos_pdf (cache por hash de los bytes del PDF)
+
+Revision ID: b7d41e0c9a52
+Revises: 3f2a9c71d4e8
+Create Date: 2026-10-17 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41e0c9a52'
+down_revision = '3f2a9c71d4e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'archivos_pdf',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('pdf_hash', sa.String(length=64), nullable=False),
+        sa.Column('texto_limpio', sa.Text(), nullable=False),
+        sa.Column('ensayo_id', sa.Integer(), nullable=True),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ensayo_id'], ['ensayos.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archivos_pdf', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archivos_pdf_pdf_hash'), ['pdf_hash'], unique=True)
+        batch_op.create_index(batch_op.f('ix_archivos_pdf_ensayo_id'), ['ensayo_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archivos_pdf', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archivos_pdf_ensayo_id'))
+        batch_op.drop_index(batch_op.f('ix_archivos_pdf_pdf_hash'))
+
+    op.drop_table('archivos_pdf')
@@ -0,0 +1,56 @@
+"""Agregar tablas firmas_minhash y bandas_lsh (índice de casi duplicados)
+
+Revision ID: c5e8a2f17b3d
+Revises: b7d41e0c9a52
+Create Date: 2026-10-17 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a2f17b3d'
+down_revision = 'b7d41e0c9a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'firmas_minhash',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ensayo_id', sa.Integer(), nullable=False),
+        sa.Column('firma', sa.JSON(), nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ensayo_id'], ['ensayos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('firmas_minhash', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_firmas_minhash_ensayo_id'), ['ensayo_id'], unique=True)
+
+    op.create_table(
+        'bandas_lsh',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ensayo_id', sa.Integer(), nullable=False),
+        sa.Column('banda', sa.Integer(), nullable=False),
+        sa.Column('valor', sa.String(length=16), nullable=False),
+        sa.ForeignKeyConstraint(['ensayo_id'], ['ensayos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('bandas_lsh', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_bandas_lsh_ensayo_id'), ['ensayo_id'], unique=False)
+        batch_op.create_index('idx_banda_valor', ['banda', 'valor'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bandas_lsh', schema=None) as batch_op:
+        batch_op.drop_index('idx_banda_valor')
+        batch_op.drop_index(batch_op.f('ix_bandas_lsh_ensayo_id'))
+
+    op.drop_table('bandas_lsh')
+
+    with op.batch_alter_table('firmas_minhash', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_firmas_minhash_ensayo_id'))
+
+    op.drop_table('firmas_minhash')
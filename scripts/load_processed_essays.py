@@ -2,19 +2,30 @@
 Script para cargar ensayos y anexos ya procesados en la base de datos.
 Este script procesa los archivos .txt de las carpetas pdfs_procesado y Anexo_procesado
 y los evalúa con el agente de IA para guardar toda la información en la base de datos.
+
+Los ensayos se evalúan en lotes concurrentes (EvaluadorEnsayos.evaluar_lote) con un
+limitador de RPM/TPM configurable mediante LLM_RPM, LLM_TPM y LOTE_CONCURRENCIA.
 """
 import os
 import sys
+import hashlib
 from pathlib import Path
 from tqdm import tqdm
 import re
 
-# Agregar el directorio actual al path
+# Agregar el directorio actual y la raíz del proyecto al path
 sys.path.append(str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.config import Config
+from app.core.cache import CacheEvaluaciones
+from app.core.checkpoints import crear_checkpointer
+from app.core.contabilidad import registros_evaluacion
+from app.core.duplicados import IndiceLSH, calcular_firma
 from app.core.evaluator import EvaluadorEnsayos
+from app.core.rate_limiter import LimitadorTasa
 from app.database.connection import db
-from app.database.models import Ensayo
+from app.database.models import Ensayo, buscar_casi_duplicados, guardar_uso_llm, indexar_firma_minhash
 from flask import Flask
 from matches_ia import MATCHES_SEGUROS_IA, obtener_anexo_ia, cargar_texto_anexo
 
@@ -126,6 +137,86 @@ def load_all_anexos(anexos_folder: Path) -> dict:
     print(f"Cargados {len(anexos_dict)} anexos")
     return anexos_dict
 
+def leer_ensayos_pendientes(txt_files: list, anexos_folder: Path) -> tuple:
+    """
+    Lee los ensayos y descarta los vacíos, ya evaluados o repetidos en esta
+    misma carga (dos ensayos iguales compartirían el checkpoint del job y el
+    segundo violaría la unicidad de texto_hash al guardarse).
+    Requiere el contexto de la aplicación (consulta la base de datos).
+    Retorna (pendientes, omitidos, errores).
+    """
+    pendientes = []
+    skipped = 0
+    errors = 0
+    hashes_pendientes = {}
+    indice_pendientes = IndiceLSH()
+    
+    for txt_file in txt_files:
+        try:
+            # Leer el texto del ensayo
+            with open(txt_file, 'r', encoding='utf-8') as f:
+                texto_ensayo = f.read().strip()
+            
+            if not texto_ensayo:
+                print(f"\nWARN: Ensayo vacio: {txt_file.name}")
+                skipped += 1
+                continue
+            
+            # Verificar si ya existe en la base de datos
+            texto_hash = hashlib.sha256(texto_ensayo.encode('utf-8')).hexdigest()
+            
+            existing = Ensayo.query.filter_by(texto_hash=texto_hash).first()
+            if existing:
+                print(f"\nSKIP: Ensayo ya existe en BD: {txt_file.name}")
+                skipped += 1
+                continue
+            
+            if texto_hash in hashes_pendientes:
+                print(f"\nSKIP: Mismo texto que {hashes_pendientes[texto_hash]} en esta carga: {txt_file.name}")
+                skipped += 1
+                continue
+            
+            if Config.DUPLICADOS_DETECCION:
+                casi_duplicados = buscar_casi_duplicados(texto_ensayo, Config.DUPLICADOS_UMBRAL, limite=1)
+                if casi_duplicados:
+                    ensayo_similar, similitud = casi_duplicados[0]
+                    print(f"\nSKIP: Casi duplicado del ensayo {ensayo_similar.id} "
+                          f"(similitud {similitud:.2f}): {txt_file.name}")
+                    skipped += 1
+                    continue
+                
+                # Casi duplicados entre los pendientes: candidatos por banda LSH
+                # y verificación con la firma completa, como en la base de datos
+                firma = calcular_firma(texto_ensayo)
+                similar = indice_pendientes.mas_similar(firma, Config.DUPLICADOS_UMBRAL)
+                if similar:
+                    print(f"\nSKIP: Casi duplicado de {pendientes[similar[0]]['archivo'].name} "
+                          f"en esta carga (similitud {similar[1]:.2f}): {txt_file.name}")
+                    skipped += 1
+                    continue
+            
+            # Buscar anexo correspondiente usando el diccionario de matches
+            ruta_anexo, texto_anexo = find_matching_anexo(txt_file.name, anexos_folder)
+            
+            hashes_pendientes[texto_hash] = txt_file.name
+            if Config.DUPLICADOS_DETECCION:
+                indice_pendientes.agregar(len(pendientes), firma)
+            
+            pendientes.append({
+                'archivo': txt_file,
+                'autor': extract_author_from_filename(txt_file.name),
+                'texto': texto_ensayo,
+                'texto_hash': texto_hash,
+                'ruta_anexo': ruta_anexo,
+                'texto_anexo': texto_anexo
+            })
+            
+        except Exception as e:
+            print(f"\nERROR: Leyendo {txt_file.name}: {e}")
+            errors += 1
+    
+    return pendientes, skipped, errors
+
 def process_all_essays():
     """
     Procesa todos los ensayos de pdfs_procesado y los evalúa con el agente de IA.
@@ -133,8 +224,19 @@ def process_all_essays():
     # Configurar app y base de datos
     app = setup_app()
     
-    # Inicializar evaluador
-    evaluador = EvaluadorEnsayos()
+    # Inicializar evaluador con un limitador de RPM/TPM compartido por todo el lote
+    evaluador = EvaluadorEnsayos(
+        limitador=LimitadorTasa(rpm=Config.LLM_RPM, tpm=Config.LLM_TPM),
+        cascada=Config.EVALUACION_CASCADA,
+        modelo_cascada=Config.MODELO_CASCADA,
+        confianza_minima_cascada=Config.CASCADA_CONFIANZA_MINIMA,
+        calificaciones_escalar=Config.CASCADA_CALIFICACIONES_ESCALAR,
+        rutas_modelos=Config.RUTAS_MODELOS,
+        checkpointer=crear_checkpointer(Config.CHECKPOINTS_EVALUACION_PATH) if Config.CHECKPOINTS_EVALUACION else None,
+        reintentos_nodo=Config.LLM_REINTENTOS_NODO,
+        carril="lote",
+        cache=CacheEvaluaciones(Config.CACHE_EVALUACIONES_PATH) if Config.CACHE_EVALUACIONES else None
+    )
     
     # Carpetas de trabajo
     pdfs_folder = Path(__file__).parent.parent / 'data' / 'processed'
@@ -158,101 +260,96 @@ def process_all_essays():
     print("=" * 80)
     
     processed = 0
-    errors = 0
-    skipped = 0
     con_anexo = 0
     sin_anexo = 0
     
+    # Fase 1: leer los ensayos y descartar vacíos, ya evaluados o repetidos
     with app.app_context():
-        for txt_file in tqdm(txt_files, desc="Procesando ensayos"):
-            try:
-                # Leer el texto del ensayo
-                with open(txt_file, 'r', encoding='utf-8') as f:
-                    texto_ensayo = f.read().strip()
-                
-                if not texto_ensayo:
-                    print(f"\nWARN: Ensayo vacio: {txt_file.name}")
-                    skipped += 1
-                    continue
-                
-                # Extraer nombre del autor
-                author = extract_author_from_filename(txt_file.name)
-                
-                # Buscar anexo correspondiente usando el diccionario de matches
-                ruta_anexo, texto_anexo = find_matching_anexo(txt_file.name, anexos_folder)
-                
-                # Verificar si ya existe en la base de datos
-                import hashlib
-                texto_hash = hashlib.sha256(texto_ensayo.encode('utf-8')).hexdigest()
-                
-                existing = Ensayo.query.filter_by(texto_hash=texto_hash).first()
-                if existing:
-                    print(f"\nSKIP: Ensayo ya existe en BD: {txt_file.name}")
-                    skipped += 1
-                    continue
+        pendientes, skipped, errors = leer_ensayos_pendientes(txt_files, anexos_folder)
+    
+    print(f"\n{len(pendientes)} ensayos pendientes de evaluar "
+          f"(concurrencia {Config.LOTE_CONCURRENCIA}, {Config.LLM_RPM} RPM, {Config.LLM_TPM} TPM)")
+    
+    # Fase 2: evaluar en lotes concurrentes y guardar al terminar cada lote,
+    # para no perder el trabajo hecho si el proceso se interrumpe
+    tamano_lote = Config.LOTE_CONCURRENCIA * 4
+    
+    try:
+        with tqdm(total=len(pendientes), desc="Evaluando ensayos") as barra:
+            for inicio in range(0, len(pendientes), tamano_lote):
+                lote = pendientes[inicio:inicio + tamano_lote]
                 
-                # Evaluar el ensayo con el agente de IA
-                print(f"\nEvaluando: {author}")
-                try:
-                    evaluacion = evaluador.evaluar(
-                        ensayo=texto_ensayo,
-                        anexo_ia=texto_anexo
-                    )
-                    
-                    # Calcular puntuación total
-                    puntuacion = evaluacion.calcular_puntuacion_total()
-                    
-                    # Crear registro en la base de datos
-                    nuevo_ensayo = Ensayo(
-                        nombre_archivo=txt_file.name,
-                        autor=author,
-                        texto_completo=texto_ensayo,
-                        texto_hash=texto_hash,
-                        puntuacion_total=puntuacion,
-                        calidad_tecnica=evaluacion.calidad_tecnica.model_dump(),
-                        creatividad=evaluacion.creatividad.model_dump(),
-                        vinculacion_tematica=evaluacion.vinculacion_tematica.model_dump(),
-                        bienestar_colectivo=evaluacion.bienestar_colectivo.model_dump(),
-                        uso_responsable_ia=evaluacion.uso_responsable_ia.model_dump(),
-                        potencial_impacto=evaluacion.potencial_impacto.model_dump(),
-                        comentario_general=evaluacion.comentario_general,
-                        tiene_anexo=texto_anexo is not None,
-                        ruta_anexo=ruta_anexo,
-                        texto_anexo=texto_anexo,
-                        longitud_texto=len(texto_ensayo),
-                        num_palabras=len(texto_ensayo.split())
-                    )
-                    
-                    db.session.add(nuevo_ensayo)
-                    db.session.commit()
-                    
-                    print(f"{author} - Puntuacion: {puntuacion:.2f}/5.00")
-                    if ruta_anexo:
-                        print(f"   Anexo encontrado: {Path(ruta_anexo).name}")
-                        con_anexo += 1
-                    else:
-                        print(f"   WARN: Sin anexo")
-                        sin_anexo += 1
-                    
-                    processed += 1
-                    
-                except KeyboardInterrupt:
-                    print(f"\n\nWARN: Proceso interrumpido por el usuario")
-                    print(f"Procesados hasta ahora: {processed}")
-                    db.session.rollback()
-                    raise
-                except Exception as eval_error:
-                    print(f"ERROR: Evaluando: {eval_error}")
-                    errors += 1
-                    db.session.rollback()
-                    continue
+                resultados = evaluador.evaluar_lote(
+                    # El job id depende del texto: si el proceso se reinicia, cada
+                    # ensayo se reanuda desde los criterios que ya tenía evaluados
+                    [{'ensayo': p['texto'], 'anexo_ia': p['texto_anexo'], 'job_id': f"lote-{p['texto_hash']}"}
+                     for p in lote],
+                    concurrencia=Config.LOTE_CONCURRENCIA,
+                    al_completar=lambda indice, resultado: barra.update(1)
+                )
                 
-            except Exception as e:
-                print(f"\nERROR: Procesando {txt_file.name}: {e}")
-                import traceback
-                traceback.print_exc()
-                errors += 1
-                db.session.rollback()
+                with app.app_context():
+                    for pendiente, evaluacion in zip(lote, resultados):
+                        author = pendiente['autor']
+                        
+                        if isinstance(evaluacion, Exception):
+                            print(f"ERROR: Evaluando {pendiente['archivo'].name}: {evaluacion}")
+                            errors += 1
+                            continue
+                        
+                        try:
+                            # Calcular puntuación total
+                            puntuacion = evaluacion.calcular_puntuacion_total()
+                            
+                            # Crear registro en la base de datos
+                            nuevo_ensayo = Ensayo(
+                                nombre_archivo=pendiente['archivo'].name,
+                                autor=author,
+                                texto_completo=pendiente['texto'],
+                                texto_hash=pendiente['texto_hash'],
+                                puntuacion_total=puntuacion,
+                                calidad_tecnica=evaluacion.calidad_tecnica.model_dump(),
+                                creatividad=evaluacion.creatividad.model_dump(),
+                                vinculacion_tematica=evaluacion.vinculacion_tematica.model_dump(),
+                                bienestar_colectivo=evaluacion.bienestar_colectivo.model_dump(),
+                                uso_responsable_ia=evaluacion.uso_responsable_ia.model_dump(),
+                                potencial_impacto=evaluacion.potencial_impacto.model_dump(),
+                                comentario_general=evaluacion.comentario_general,
+                                tiene_anexo=pendiente['texto_anexo'] is not None,
+                                ruta_anexo=pendiente['ruta_anexo'],
+                                texto_anexo=pendiente['texto_anexo'],
+                                longitud_texto=len(pendiente['texto']),
+                                num_palabras=len(pendiente['texto'].split())
+                            )
+                            
+                            db.session.add(nuevo_ensayo)
+                            db.session.flush()
+                            guardar_uso_llm(registros_evaluacion(evaluacion, evaluador.model_name),
+                                            'evaluacion', ensayo_id=nuevo_ensayo.id, commit=False)
+                            indexar_firma_minhash(nuevo_ensayo.id, pendiente['texto'], commit=False)
+                            db.session.commit()
+                            
+                            print(f"{author} - Puntuacion: {puntuacion:.2f}/5.00")
+                            if pendiente['ruta_anexo']:
+                                print(f"   Anexo encontrado: {Path(pendiente['ruta_anexo']).name}")
+                                con_anexo += 1
+                            else:
+                                print(f"   WARN: Sin anexo")
+                                sin_anexo += 1
+                            
+                            processed += 1
+                            
+                        except Exception as e:
+                            print(f"\nERROR: Guardando {pendiente['archivo'].name}: {e}")
+                            import traceback
+                            traceback.print_exc()
+                            errors += 1
+                            db.session.rollback()
+    
+    except KeyboardInterrupt:
+        print(f"\n\nWARN: Proceso interrumpido por el usuario")
+        print(f"Procesados hasta ahora: {processed}")
+        raise
     
     # Resumen final
     print("\n" + "=" * 80)
@@ -264,6 +361,11 @@ def process_all_essays():
     print(f"Omitidos (duplicados/vacios): {skipped}")
     print(f"Errores: {errors}")
     print(f"Total de archivos: {len(txt_files)}")
+    if evaluador.cascada:
+        cascada = evaluador.estadisticas_cascada()
+        print(f"Cascada: {cascada['escalados']}/{cascada['criterios']} criterios escalados "
+              f"({cascada['motivos']}), costo ${cascada['costo_usd']:.4f} "
+              f"(ahorro estimado ${cascada['ahorro_usd']:.4f})")
     print("=" * 80)
     
     if processed > 0:
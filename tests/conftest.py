@@ -0,0 +1,10 @@
+"""
+Configuración común de las pruebas: backend simulado del LLM (sin red ni
+OPENAI_API_KEY) y sin caché ni checkpoints en disco.
+"""
+import os
+
+os.environ.setdefault('LLM_BACKEND', 'simulado')
+os.environ.setdefault('CACHE_EVALUACIONES', 'false')
+os.environ.setdefault('CHECKPOINTS_EVALUACION', 'false')
+os.environ.setdefault('LLM_SIMULADO_LATENCIA_MS', '5')
@@ -0,0 +1,56 @@
+"""
+Almacenamiento direccionado por contenido de los PDF subidos: subidas
+simultáneas del mismo archivo lo guardan una sola vez, con o sin enlaces duros.
+"""
+import hashlib
+import io
+import os
+import threading
+from types import SimpleNamespace
+
+from app.api.routes.evaluation import guardar_pdf_direccionado
+
+PDF = b"%PDF-1.4\n" + b"contenido del ensayo " * 5000
+SUBIDAS = 8
+
+
+def _subir_a_la_vez(carpeta):
+    """Guarda el mismo PDF desde SUBIDAS hilos que arrancan a la vez."""
+    barrera = threading.Barrier(SUBIDAS)
+    resultados = []
+
+    def subir():
+        archivo = SimpleNamespace(stream=io.BytesIO(PDF))
+        barrera.wait()
+        resultados.append(guardar_pdf_direccionado(archivo, carpeta, tamano_bloque=4096))
+
+    hilos = [threading.Thread(target=subir) for _ in range(SUBIDAS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def _comprobar(carpeta, resultados):
+    pdf_hash = hashlib.sha256(PDF).hexdigest()
+    assert len(resultados) == SUBIDAS
+    assert sum(creado for _, _, _, creado in resultados) == 1
+    assert {ruta for ruta, _, _, _ in resultados} == {carpeta / f"{pdf_hash}.pdf"}
+    assert all(contenido == PDF for _, _, contenido, _ in resultados)
+    # Sin temporales .part huérfanos
+    assert os.listdir(carpeta) == [f"{pdf_hash}.pdf"]
+    assert (carpeta / f"{pdf_hash}.pdf").read_bytes() == PDF
+
+
+def test_subidas_simultaneas_del_mismo_pdf_lo_crean_una_vez(tmp_path):
+    _comprobar(tmp_path, _subir_a_la_vez(tmp_path))
+
+
+def test_sin_enlaces_duros_las_subidas_simultaneas_lo_crean_una_vez(tmp_path, monkeypatch):
+    def sin_enlaces(origen, destino):
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(os, "link", sin_enlaces)
+
+    _comprobar(tmp_path, _subir_a_la_vez(tmp_path))
@@ -0,0 +1,130 @@
+"""
+Detección de casi duplicados: firmas MinHash, bandas LSH, índice en memoria,
+índice en la base de datos y descarte de repetidos al leer una carga.
+"""
+import random
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from app.core.duplicados import (
+    NUM_BANDAS, IndiceLSH, agrupar_pares, bandas_lsh, calcular_firma, similitud_estimada
+)
+from app.database.connection import db
+from app.database.models import (
+    Ensayo, buscar_casi_duplicados, get_clusters_duplicados, indexar_firma_minhash
+)
+
+VOCABULARIO = (
+    "inteligencia artificial educación comunidad acceso conocimiento desigualdad "
+    "tecnología estudiantes docentes escuela rural datos privacidad salud futuro "
+    "ética responsabilidad trabajo herramienta aprendizaje sociedad bienestar país "
+    "jóvenes oportunidad riesgo algoritmo decisión información cultura idioma región"
+).split()
+
+
+def _ensayo(semilla: int, palabras: int = 300) -> str:
+    aleatorio = random.Random(semilla)
+    return " ".join(aleatorio.choice(VOCABULARIO) for _ in range(palabras))
+
+
+ORIGINAL = _ensayo(1)
+# El mismo ensayo en mayúsculas, con otros saltos de línea y una palabra cambiada
+_PALABRAS = ORIGINAL.upper().split()
+_PALABRAS[150] = "DISTINTO"
+CASI_DUPLICADO = "\n".join(" ".join(_PALABRAS[i:i + 12]) for i in range(0, len(_PALABRAS), 12))
+DISTINTO = _ensayo(2)
+
+
+def test_firmas_de_casi_duplicados_comparten_bandas():
+    firma, casi, distinta = map(calcular_firma, (ORIGINAL, CASI_DUPLICADO, DISTINTO))
+
+    assert similitud_estimada(firma, casi) >= 0.85
+    assert similitud_estimada(firma, distinta) < 0.5
+    assert len(bandas_lsh(firma)) == NUM_BANDAS
+    assert set(bandas_lsh(firma)) & set(bandas_lsh(casi))
+    assert not set(bandas_lsh(firma)) & set(bandas_lsh(distinta))
+
+
+def test_firma_de_texto_sin_palabras_esta_vacia():
+    assert calcular_firma(" ¿?¡! ") == []
+    assert similitud_estimada([], []) == 0.0
+
+
+def test_indice_en_memoria_devuelve_el_candidato_verificado():
+    indice = IndiceLSH()
+    indice.agregar("original", calcular_firma(ORIGINAL))
+    indice.agregar("distinto", calcular_firma(DISTINTO))
+    indice.agregar("vacio", [])
+
+    clave, similitud = indice.mas_similar(calcular_firma(CASI_DUPLICADO), 0.85)
+
+    assert len(indice) == 2
+    assert clave == "original" and similitud >= 0.85
+    assert indice.mas_similar(calcular_firma(_ensayo(3)), 0.85) is None
+
+
+def test_agrupar_pares_une_transitivamente():
+    assert agrupar_pares([(3, 4), (1, 2), (2, 5)]) == [[1, 2, 5], [3, 4]]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def _guardar(texto: str, nombre: str) -> Ensayo:
+    criterio = {"calificacion": 3, "comentario": "Bien"}
+    ensayo = Ensayo(
+        nombre_archivo=nombre, texto_completo=texto, puntuacion_total=3.0,
+        calidad_tecnica=criterio, creatividad=criterio, vinculacion_tematica=criterio,
+        bienestar_colectivo=criterio, uso_responsable_ia=criterio, potencial_impacto=criterio,
+        comentario_general="Bien"
+    )
+    db.session.add(ensayo)
+    db.session.flush()
+    indexar_firma_minhash(ensayo.id, texto)
+    return ensayo
+
+
+def test_indice_en_base_de_datos_y_clusters(app):
+    original = _guardar(ORIGINAL, "original.pdf")
+    casi = _guardar(CASI_DUPLICADO, "casi.pdf")
+    _guardar(DISTINTO, "distinto.pdf")
+
+    encontrados = buscar_casi_duplicados(ORIGINAL, 0.85)
+    clusters = get_clusters_duplicados(0.85)
+
+    assert [ensayo.id for ensayo, _ in encontrados] == [original.id, casi.id]
+    assert encontrados[0][1] == 1.0
+    assert len(clusters) == 1
+    assert [e['id'] for e in clusters[0]['ensayos']] == [original.id, casi.id]
+    assert clusters[0]['similitud_minima'] >= 0.85
+
+
+def test_carga_descarta_repetidos_entre_los_pendientes(app, tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / 'scripts'))
+    from load_processed_essays import leer_ensayos_pendientes
+
+    archivos = []
+    for nombre, texto in [("Ensayo_A.txt", ORIGINAL), ("Ensayo_B.txt", ORIGINAL),
+                          ("Ensayo_C.txt", CASI_DUPLICADO), ("Ensayo_D.txt", DISTINTO),
+                          ("Ensayo_E.txt", "   ")]:
+        archivo = tmp_path / nombre
+        archivo.write_text(texto, encoding='utf-8')
+        archivos.append(archivo)
+
+    pendientes, omitidos, errores = leer_ensayos_pendientes(archivos, tmp_path / 'anexos')
+
+    # El mismo hash (B) y el casi duplicado (C) no se evalúan otra vez
+    assert [p['archivo'].name for p in pendientes] == ["Ensayo_A.txt", "Ensayo_D.txt"]
+    assert len({p['texto_hash'] for p in pendientes}) == len(pendientes)
+    assert (omitidos, errores) == (3, 0)
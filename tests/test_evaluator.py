@@ -0,0 +1,254 @@
+"""
+Pruebas del evaluador con el LLM simulado: cobertura (hedging) de nodos,
+reintentos de errores transitorios, reanudación de jobs desde su checkpoint
+y reglas de escalamiento de la cascada.
+"""
+import asyncio
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.cache import CacheEvaluaciones, calcular_hash
+from app.core.evaluator import EvaluadorEnsayos, construir_prompt
+from app.core.llm_simulado import ChatSimulado
+from app.core.models import EvaluacionCriterioConConfianza
+from app.core.rate_limiter import LimitadorTasa
+
+ENSAYO = "La inteligencia artificial puede acercar la educación a las comunidades. " * 20
+
+
+def _error_500() -> openai.InternalServerError:
+    respuesta = httpx.Response(500, request=httpx.Request("POST", "https://simulado.local/v1"))
+    return openai.InternalServerError("Error 500", response=respuesta, body=None)
+
+
+class CadenaConRetardos:
+    """Cadena falsa: cada llamada tarda lo indicado en `retardos`, en orden."""
+
+    def __init__(self, *retardos: float):
+        self.retardos = list(retardos)
+        self.llamadas = 0
+
+    async def ainvoke(self, entradas, config=None):
+        retardo = self.retardos[min(self.llamadas, len(self.retardos) - 1)]
+        self.llamadas += 1
+        await asyncio.sleep(retardo)
+        return {"llamada": self.llamadas}
+
+
+def test_respaldo_ganador_registra_la_latencia_del_nodo():
+    evaluador = EvaluadorEnsayos(cobertura=True, percentil_cobertura=0.95)
+    for _ in range(evaluador.latencias.muestras_minimas):
+        evaluador.latencias.registrar("nodo", 0.05)
+
+    cadena = CadenaConRetardos(0.5, 0.02)
+    asyncio.run(evaluador._invocar_nodo("nodo", cadena, {}))
+
+    assert cadena.llamadas == 2
+    assert evaluador.total_respaldos == 1
+    assert evaluador.respaldos_ganadores == 1
+    # Umbral (0.05 s) + respaldo (0.02 s): no solo la duración del respaldo
+    assert evaluador.latencias.histograma("nodo").percentil(1.0) >= 0.065
+
+
+class CadenaConError:
+    """Cadena falsa que siempre falla con un 500."""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    async def ainvoke(self, entradas, config=None):
+        self.llamadas += 1
+        raise _error_500()
+
+
+def test_error_transitorio_persistente_se_reintenta_en_una_sola_capa():
+    evaluador = EvaluadorEnsayos(limitador=LimitadorTasa(rpm=10000, tpm=10000000), reintentos_nodo=2)
+    cadena = CadenaConError()
+
+    try:
+        asyncio.run(evaluador._invocar(cadena, {"ensayo": "texto"}))
+    except openai.InternalServerError:
+        pass
+    else:
+        raise AssertionError("se esperaba InternalServerError")
+
+    assert cadena.llamadas == evaluador.reintentos_nodo
+
+
+def _evaluador_con_fallo(clave_fallida: str) -> EvaluadorEnsayos:
+    """Evaluador con checkpoints cuyo criterio `clave_fallida` falla la primera vez."""
+    evaluador = EvaluadorEnsayos(checkpointer=InMemorySaver())
+    evaluar_criterio = evaluador._evaluar_criterio
+    fallos = []
+
+    async def evaluar_con_fallo(criterio, state):
+        if criterio.clave == clave_fallida and not fallos:
+            fallos.append(criterio.clave)
+            await asyncio.sleep(0.05)
+            raise _error_500()
+        return await evaluar_criterio(criterio, state)
+
+    evaluador._evaluar_criterio = evaluar_con_fallo
+    return evaluador
+
+
+def test_reanudar_job_notifica_los_criterios_del_checkpoint():
+    evaluador = _evaluador_con_fallo("calidad_tecnica")
+    notificados = []
+
+    async def ejecutar():
+        try:
+            await evaluador.aevaluar(ENSAYO, job_id="job")
+        except openai.InternalServerError:
+            pass
+        else:
+            raise AssertionError("el primer intento debía fallar")
+        return await evaluador.aevaluar(
+            ENSAYO, job_id="job", al_progresar=lambda clave, _: notificados.append(clave)
+        )
+
+    evaluacion = asyncio.run(ejecutar())
+
+    claves = [criterio.clave for criterio in evaluador.rubrica]
+    assert sorted(notificados[:-1]) == sorted(claves)
+    assert notificados[-1] == "comentario_general"
+    assert evaluacion.calidad_tecnica.calificacion >= 1
+
+
+def test_hilo_terminado_no_mezcla_criterios_con_la_nueva_entrada():
+    evaluador = EvaluadorEnsayos(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "job"}}
+
+    async def ejecutar():
+        # Un hilo terminado que no llegó a borrarse (p. ej. se interrumpió el proceso)
+        await evaluador._grafo_checkpoints.ainvoke(
+            {"ensayo": "Otro ensayo. " * 20, "anexo_ia": "", "texto_hash": "previo",
+             "contexto_sintesis": "completo", "paso_actual": "inicio",
+             "evaluacion": None, "criterios": None, "uso_tokens": None},
+            config=config
+        )
+        previo = await evaluador._grafo_checkpoints.aget_state(config)
+        assert previo.values and not previo.next
+
+        # Los criterios deben evaluarse sin ver los resultados del hilo anterior
+        evaluar_criterio = evaluador._evaluar_criterio
+        vistos = []
+
+        async def evaluar_registrando(criterio, state):
+            vistos.append(state.get("criterios"))
+            return await evaluar_criterio(criterio, state)
+
+        evaluador._evaluar_criterio = evaluar_registrando
+        await evaluador.aevaluar(ENSAYO, job_id="job")
+        return vistos
+
+    vistos = asyncio.run(ejecutar())
+
+    assert len(vistos) == len(evaluador.rubrica)
+    assert not any(vistos)
+
+
+def test_cache_fusionada_usa_el_hash_del_texto_original():
+    cache = CacheEvaluaciones(":memory:")
+    evaluador = EvaluadorEnsayos(modo="fusionado", cache=cache, presupuesto_tokens=300,
+                                 tokens_fragmento=200)
+    anexo = "Usé un asistente para revisar la ortografía."
+
+    evaluacion = evaluador.evaluar(ENSAYO, anexo)
+
+    # El texto supera el presupuesto y se condensa, pero la clave es la del original
+    assert "condensacion" in evaluacion.uso_tokens
+    hashes = cache._conexion.execute(
+        "SELECT texto_hash FROM resultados_criterio WHERE criterio = 'fusionado'"
+    ).fetchall()
+    assert hashes == [(calcular_hash(ENSAYO, anexo),)]
+
+
+class CadenaCascada:
+    """Primera pasada de la cascada con una salida fija (o un error)."""
+
+    def __init__(self, salida):
+        self.salida = salida
+
+    async def ainvoke(self, entradas, config=None):
+        if isinstance(self.salida, BaseException):
+            raise self.salida
+        if self.salida is None:
+            return {"raw": None, "parsed": None, "parsing_error": ValueError("JSON inválido")}
+        calificacion, confianza = self.salida
+        crudo = AIMessage(content="{}", usage_metadata={
+            "input_tokens": 2000, "output_tokens": 200, "total_tokens": 2200
+        })
+        parsed = EvaluacionCriterioConConfianza(
+            calificacion=calificacion, confianza=confianza, comentario="Comentario"
+        )
+        return {"raw": crudo, "parsed": parsed, "parsing_error": None}
+
+
+def _simulado_con_error():
+    """ChatSimulado cuya única llamada falla con un 500."""
+    return ChatSimulado(modelo="gpt-4o-mini", latencia_ms=0, tasa_error=1.0, max_retries=0)
+
+
+def _evaluar_en_cascada(evaluador, primera_pasada):
+    criterio = evaluador.rubrica[0]
+    if isinstance(primera_pasada, ChatSimulado):
+        primera_pasada = construir_prompt(criterio.prompt) | primera_pasada.with_structured_output(
+            EvaluacionCriterioConConfianza, include_raw=True
+        )
+    evaluador._cadenas_cascada[criterio.clave] = primera_pasada
+    entradas = {entrada: ENSAYO for entrada in criterio.entradas}
+    return criterio.clave, asyncio.run(evaluador._evaluar_en_cascada(criterio, entradas))
+
+
+@pytest.mark.parametrize("primera_pasada, motivo", [
+    (CadenaCascada((3, 5)), None),
+    (CadenaCascada((3, 3)), "confianza"),
+    (CadenaCascada((5, 5)), "calificacion"),
+    (_simulado_con_error(), "error"),
+    (CadenaCascada(asyncio.TimeoutError()), "error"),
+    (CadenaCascada(None), "salida_invalida"),
+    (CadenaCascada(KeyError("calificacion")), "salida_invalida"),
+], ids=["aceptada", "confianza_baja", "calificacion_decisiva", "error_api", "plazo",
+        "sin_parsear", "otra_excepcion"])
+def test_reglas_de_escalamiento_de_la_cascada(primera_pasada, motivo):
+    evaluador = EvaluadorEnsayos(model_name="gpt-4o", cascada=True, modelo_cascada="gpt-4o-mini",
+                                 confianza_minima_cascada=4, calificaciones_escalar=(5,))
+
+    clave, (evaluacion, usos) = _evaluar_en_cascada(evaluador, primera_pasada)
+
+    estadisticas = evaluador.estadisticas_cascada()
+    assert estadisticas["criterios"] == 1
+    assert 1 <= evaluacion.calificacion <= 5
+    if motivo is None:
+        assert evaluacion.calificacion == 3
+        assert set(usos) == {clave}
+        assert usos[clave]["modelo"] == "gpt-4o-mini"
+        assert estadisticas["escalados"] == 0 and estadisticas["motivos"] == {}
+        # Aceptar la primera pasada cuesta lo que cobra el modelo económico
+        assert estadisticas["ahorro_usd"] > 0
+    else:
+        assert set(usos) == {clave, f"{clave}:gpt-4o-mini"}
+        assert usos[clave]["modelo"] == "gpt-4o"
+        assert estadisticas["motivos"] == {motivo: 1}
+        assert estadisticas["tasa_escalamiento"] == 1.0
+
+
+def test_estadisticas_de_la_cascada_acumulan_los_criterios():
+    evaluador = EvaluadorEnsayos(model_name="gpt-4o", cascada=True, modelo_cascada="gpt-4o-mini",
+                                 confianza_minima_cascada=4, calificaciones_escalar=(5,))
+
+    for primera_pasada in (CadenaCascada((3, 5)), CadenaCascada((2, 4)), CadenaCascada((4, 1)),
+                           _simulado_con_error(), CadenaCascada(None)):
+        _evaluar_en_cascada(evaluador, primera_pasada)
+
+    estadisticas = evaluador.estadisticas_cascada()
+    assert estadisticas["criterios"] == 5
+    assert estadisticas["escalados"] == 3
+    assert estadisticas["motivos"] == {"confianza": 1, "error": 1, "salida_invalida": 1}
+    assert estadisticas["tasa_escalamiento"] == 0.6
+    assert estadisticas["costo_usd"] <= estadisticas["costo_sin_cascada_usd"]
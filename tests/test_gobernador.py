@@ -0,0 +1,102 @@
+"""
+Gobernador de concurrencia: reparto ponderado de turnos entre carriles,
+límites por carril y solicitudes canceladas en cola.
+"""
+import asyncio
+
+import pytest
+
+from app.core.gobernador import GobernadorLLM
+
+
+def _encolar_todos(gobernador, por_carril: int):
+    """Encola sin bloquear `por_carril` solicitudes en cada carril."""
+    return {
+        carril: [gobernador._encolar(carril) for _ in range(por_carril)]
+        for carril in ("interactivo", "carga", "lote")
+    }
+
+
+def _conceder(gobernador, esperas, ocupado: str, turnos: int):
+    """Libera el turno en vuelo `turnos` veces y devuelve el carril que lo recibe cada vez."""
+    orden = []
+    for _ in range(turnos):
+        gobernador.liberar(ocupado)
+        ocupado = next(
+            carril for carril, cola in esperas.items()
+            if cola and cola[0].concedida
+        )
+        esperas[ocupado].pop(0)
+        orden.append(ocupado)
+    return orden
+
+
+def test_turnos_en_contencion_siguen_los_pesos():
+    gobernador = GobernadorLLM(limite_total=1, limites={},
+                               pesos={"interactivo": 3, "carga": 1, "lote": 1})
+    gobernador.adquirir("lote")
+    esperas = _encolar_todos(gobernador, por_carril=20)
+
+    orden = _conceder(gobernador, esperas, "lote", turnos=15)
+
+    # Round-robin ponderado suave: 3:1:1 en cada ronda de 5, sin rachas
+    assert orden[:5] == ["interactivo", "carga", "interactivo", "lote", "interactivo"]
+    assert orden == orden[:5] * 3
+    assert gobernador.estadisticas()["carriles"]["interactivo"]["turnos"] == 9
+
+
+def test_limite_por_carril_deja_turnos_a_los_demas():
+    gobernador = GobernadorLLM(limite_total=3, limites={"lote": 1}, pesos={"lote": 10})
+    lote = [gobernador._encolar("lote") for _ in range(3)]
+    carga = [gobernador._encolar("carga") for _ in range(3)]
+
+    estadisticas = gobernador.estadisticas()["carriles"]
+
+    assert sum(e.concedida for e in lote) == 1
+    assert sum(e.concedida for e in carga) == 2
+    assert estadisticas["lote"]["en_vuelo"] == 1
+    assert estadisticas["lote"]["en_cola"] == 2
+
+
+def test_espera_cancelada_en_cola_no_ocupa_turno():
+    gobernador = GobernadorLLM(limite_total=1, limites={}, pesos={})
+
+    async def ejecutar():
+        await gobernador.aadquirir("carga")
+        tarea = asyncio.create_task(gobernador.aadquirir("lote"))
+        await asyncio.sleep(0)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+        gobernador.liberar("carga")
+        await asyncio.wait_for(gobernador.aadquirir("interactivo"), timeout=1)
+        gobernador.liberar("interactivo")
+
+    asyncio.run(ejecutar())
+
+    estadisticas = gobernador.estadisticas()
+    assert estadisticas["en_vuelo"] == 0
+    assert all(carril["en_cola"] == 0 for carril in estadisticas["carriles"].values())
+
+
+def test_espera_cancelada_tras_recibir_el_turno_lo_devuelve():
+    gobernador = GobernadorLLM(limite_total=1, limites={}, pesos={})
+
+    async def ejecutar():
+        await gobernador.aadquirir("carga")
+        tarea = asyncio.create_task(gobernador.aadquirir("lote"))
+        await asyncio.sleep(0)
+
+        # El turno se concede a la tarea, pero se cancela antes de que despierte
+        gobernador.liberar("carga")
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+        await asyncio.wait_for(gobernador.aadquirir("interactivo"), timeout=1)
+        gobernador.liberar("interactivo")
+
+    asyncio.run(ejecutar())
+
+    assert gobernador.estadisticas()["en_vuelo"] == 0
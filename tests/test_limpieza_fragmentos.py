@@ -0,0 +1,98 @@
+"""
+Limpieza con el LLM en fragmentos con solape: dividir y volver a unir los
+fragmentos sin cambios devuelve el texto original, y un solape que el LLM
+editó no duplica párrafos al unir.
+"""
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import Config
+from app.utils.limpieza_texto import fragmentar_con_solape, quitar_solape
+from app.utils.pdf_processor import PDFProcessor
+
+
+def _oracion(parrafo: int, numero: int) -> str:
+    return (f"En el párrafo {parrafo} la oración {numero} explica cómo la tecnología "
+            f"llega a la comunidad {parrafo * 10 + numero}.")
+
+
+def _texto(oraciones_por_parrafo) -> str:
+    return "\n\n".join(
+        " ".join(_oracion(p, n) for n in range(oraciones))
+        for p, oraciones in enumerate(oraciones_por_parrafo)
+    )
+
+
+TEXTO_CORTO = _texto([3, 2, 4, 1, 3, 2])
+# Con un párrafo que no cabe en un fragmento: el corte cae dentro de él
+TEXTO_LARGO = _texto([2, 14, 3])
+# Con una oración que no cabe en un fragmento: el corte cae dentro de ella
+TEXTO_ORACION_LARGA = "\n\n".join([
+    _oracion(0, 0),
+    " ".join(f"palabra{n}" for n in range(80)) + ".",
+    _oracion(2, 0)
+])
+TEXTOS = pytest.mark.parametrize("texto", [TEXTO_CORTO, TEXTO_LARGO, TEXTO_ORACION_LARGA],
+                                 ids=["parrafos", "parrafo_largo", "oracion_larga"])
+
+
+def _unir(ternas, limpiar=lambda entrada: entrada) -> str:
+    texto = ""
+    for solape, fragmento, separador in ternas:
+        entrada = f"{solape}{separador}{fragmento}" if solape else fragmento
+        parte = quitar_solape(limpiar(entrada), solape)
+        texto = f"{texto}{separador}{parte}" if texto else parte
+    return texto
+
+
+@TEXTOS
+@pytest.mark.parametrize("solape_tokens", [0, 15, 40])
+def test_fragmentos_sin_cambios_reconstruyen_el_texto(texto, solape_tokens):
+    ternas = fragmentar_con_solape(texto, max_tokens=60, solape_tokens=solape_tokens)
+
+    assert len(ternas) > 2
+    assert _unir(ternas) == texto
+
+
+def _limpiador_que_edita(entrada: str) -> str:
+    """Simula al LLM: cambia espacios y mayúsculas también dentro del solape."""
+    return re.sub(r" (cómo|la) ", lambda m: f"  {m.group(1).upper()} ", entrada)
+
+
+@TEXTOS
+def test_solape_editado_no_duplica_parrafos(texto):
+    ternas = fragmentar_con_solape(texto, max_tokens=60, solape_tokens=20)
+
+    unido = _unir(ternas, _limpiador_que_edita)
+
+    assert unido == _limpiador_que_edita(texto)
+
+
+@pytest.fixture
+def procesador(monkeypatch):
+    monkeypatch.setattr(Config, "PDF_LIMPIEZA_TOKENS_FRAGMENTO", 60)
+    monkeypatch.setattr(Config, "PDF_LIMPIEZA_SOLAPE_TOKENS", 20)
+    procesador = PDFProcessor(limpieza="llm")
+    procesador.entradas = []
+
+    async def limpiar_fragmentos(entradas):
+        procesador.entradas.extend(entradas)
+        return [(SimpleNamespace(content=f"\n{_limpiador_que_edita(e)}\n"), {"nodo": "limpieza_pdf"})
+                for e in entradas]
+
+    procesador._alimpiar_fragmentos = limpiar_fragmentos
+    return procesador
+
+
+def test_limpiar_con_llm_une_los_fragmentos_sin_repetir_el_solape(procesador):
+    registros = []
+
+    limpios = procesador._limpiar_con_llm([TEXTO_CORTO, TEXTO_LARGO, ""], registros)
+
+    assert limpios == [_limpiador_que_edita(TEXTO_CORTO), _limpiador_que_edita(TEXTO_LARGO), ""]
+    assert len(registros) == len(procesador.entradas) > 4
+    for limpio in limpios[:2]:
+        parrafos = limpio.split("\n\n")
+        assert len(parrafos) == len(set(parrafos))
@@ -0,0 +1,62 @@
+"""
+Regresiones de la limpieza con reglas (app/utils/limpieza_texto.py): los
+encabezados y pies solo se buscan en los bordes de cada página y nunca se
+quita una línea del cuerpo de un párrafo.
+"""
+from app.utils.limpieza_texto import limpiar_con_reglas
+
+LINEA = "la inteligencia artificial transforma la educación y el acceso al conocimiento de"
+
+
+def _parrafo(inicio: str) -> str:
+    return "\n".join([
+        f"{inicio} {LINEA}",
+        LINEA,
+        f"{LINEA[:-3]} las comunidades que hoy viven en condiciones de",
+        "desigualdad.",
+    ])
+
+
+def test_linea_repetida_dentro_de_parrafos_no_se_quita():
+    texto = "\n".join(_parrafo(inicio) for inicio in ("Primero,", "Segundo,", "Tercero,"))
+
+    parrafos = limpiar_con_reglas(texto)
+
+    assert len(parrafos) == 3
+    assert all(parrafo.endswith("condiciones de desigualdad.") for parrafo in parrafos)
+
+
+def test_varias_paginas_conservan_el_cuerpo():
+    paginas = []
+    cuerpo = []
+    for numero in range(1, 6):
+        parrafos = [_parrafo(f"Sección {numero}.{i}:") for i in range(3)]
+        cuerpo.extend(parrafos)
+        paginas.append("\n".join(
+            ["Ensayo sobre IA y comunidad"] + parrafos + [f"Página {numero} de 5"]
+        ))
+
+    limpio = "\n\n".join(limpiar_con_reglas(paginas))
+
+    assert "Ensayo sobre IA" not in limpio
+    assert "Página" not in limpio
+    assert limpio.split() == "\n".join(cuerpo).split()
+    assert limpio.count("desigualdad.") == 15
+
+
+def test_texto_unido_con_saltos_de_pagina():
+    paginas = [f"Encabezado del concurso\n{_parrafo('Inicio')}\n{numero}" for numero in range(1, 4)]
+
+    parrafos = limpiar_con_reglas("\f".join(paginas))
+
+    assert len(parrafos) == 3
+    assert not any("Encabezado" in parrafo for parrafo in parrafos)
+
+
+def test_final_de_parrafo_al_pie_de_cada_pagina_no_es_pie():
+    paginas = [_parrafo(f"Página {numero}:") for numero in range(1, 5)]
+
+    parrafos = limpiar_con_reglas(paginas)
+
+    assert len(parrafos) == 4
+    assert all(parrafo.endswith("desigualdad.") for parrafo in parrafos)
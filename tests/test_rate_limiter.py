@@ -0,0 +1,54 @@
+"""
+Limitador de tasa: recarga de los buckets, backoff adaptativo ante 429 y
+recuperación gradual con cada éxito.
+"""
+import asyncio
+import time
+
+from app.core.rate_limiter import LimitadorTasa
+
+
+def _recarga_en_un_segundo(limitador: LimitadorTasa) -> float:
+    """Solicitudes que el bucket vacío recupera en un segundo."""
+    limitador._solicitudes = 0.0
+    limitador._ultima_recarga = 100.0
+    limitador._recargar(101.0)
+    return limitador._solicitudes
+
+
+def test_429_reduce_la_tasa_de_recarga_a_la_mitad():
+    normal = LimitadorTasa(rpm=60, tpm=60000)
+    penalizado = LimitadorTasa(rpm=60, tpm=60000)
+
+    penalizado.registrar_429(retry_after=0)
+
+    assert _recarga_en_un_segundo(normal) == 1.0
+    assert _recarga_en_un_segundo(penalizado) == 0.5
+    assert penalizado.total_429 == 1
+
+
+def test_429_repetidos_no_bajan_del_factor_minimo_y_los_exitos_lo_recuperan():
+    limitador = LimitadorTasa(rpm=60, tpm=60000, factor_minimo=0.2, incremento_por_exito=0.1)
+
+    for _ in range(5):
+        limitador.registrar_429(retry_after=0)
+    assert limitador.factor == 0.2
+
+    limitador.registrar_exito()
+    assert round(limitador.factor, 2) == 0.3
+    for _ in range(20):
+        limitador.registrar_exito()
+    assert limitador.factor == 1.0
+
+
+def test_429_pausa_las_solicitudes_durante_retry_after():
+    limitador = LimitadorTasa(rpm=6000, tpm=6000000)
+
+    async def ejecutar():
+        await limitador.adquirir(10)
+        limitador.registrar_429(retry_after=0.2)
+        inicio = time.monotonic()
+        await limitador.adquirir(10)
+        return time.monotonic() - inicio
+
+    assert asyncio.run(ejecutar()) >= 0.2